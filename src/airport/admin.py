@@ -1,4 +1,8 @@
+from django import forms
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
 from airport.models import (
     Airport,
@@ -6,25 +10,166 @@ from airport.models import (
     AirplaneType,
     Airplane,
     Crew,
+    Schedule,
     Flight,
     Order,
     Ticket,
 )
+from airport.schedules import expand_schedule
+from airport.validators import validate_airplane_change
+
+# Below this many rows an exact COUNT(*) is cheap enough.
+EXACT_COUNT_LIMIT = 100_000
+
+FLIGHT_RELATED = ("route__source", "route__destination", "airplane")
+
+
+class EstimatedCountPaginator(Paginator):
+    """Use the planner's row estimate for unfiltered large Postgres tables
+    instead of COUNT(*), which scans the whole table.
+
+    One query either way: Postgres only runs the COUNT(*) subquery when the
+    estimate is small, or -1 for a table never analyzed.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql" or queryset.query.where:
+            return super().count
+
+        table = connection.ops.quote_name(queryset.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT CASE WHEN reltuples > %s THEN reltuples::bigint "
+                f"ELSE (SELECT COUNT(*) FROM {table}) END "
+                "FROM pg_class WHERE oid = %s::regclass",
+                [EXACT_COUNT_LIMIT, queryset.model._meta.db_table],
+            )
+            return cursor.fetchone()[0]
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Skips the second, unfiltered COUNT(*) behind "N results (M total)".
+    show_full_result_count = False
 
 
 class TicketInLine(admin.TabularInline):
     model = Ticket
     extra = 1
+    autocomplete_fields = ("flight",)
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .select_related(*(f"flight__{field}" for field in FLIGHT_RELATED))
+        )
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        # The autocomplete widget renders the selected flight's __str__.
+        if db_field.name == "flight":
+            kwargs["queryset"] = Flight.objects.select_related(*FLIGHT_RELATED)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(LargeTableAdmin):
     inlines = (TicketInLine,)
+    list_display = ("id", "user", "created_at")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    # Range filters on the indexed column; date_hierarchy would run a
+    # DISTINCT DATE_TRUNC over the whole table on every page.
+    list_filter = (("created_at", admin.DateFieldListFilter),)
+    search_fields = ("=user__email",)
+
+
+@admin.register(Flight)
+class FlightAdmin(LargeTableAdmin):
+    list_display = ("id", "route", "airplane", "departure_date", "arrival_date")
+    autocomplete_fields = ("route", "airplane", "crew")
+    list_filter = (("departure_date", admin.DateFieldListFilter),)
+    # Walks flight_departure_id_idx backwards.
+    ordering = ("-departure_date", "-id")
+    search_fields = (
+        "route__source__closest_big_city",
+        "route__destination__closest_big_city",
+        "airplane__name",
+    )
+
+    def get_queryset(self, request):
+        # Also used by the flight autocomplete, which renders __str__.
+        return super().get_queryset(request).select_related(*FLIGHT_RELATED)
+
+
+class ScheduleForm(forms.ModelForm):
+    def clean(self):
+        data = super().clean()
+        if (
+            self.instance.pk
+            and "airplane" in self.changed_data
+            and data.get("airplane")
+        ):
+            validate_airplane_change(
+                Ticket.objects.filter(flight__schedule=self.instance), data["airplane"]
+            )
+        return data
+
+
+@admin.register(Schedule)
+class ScheduleAdmin(admin.ModelAdmin):
+    form = ScheduleForm
+    list_display = ("id", "route", "weekdays", "departure_time", "season_start")
+    list_select_related = ("route__source", "route__destination")
+    autocomplete_fields = ("route", "airplane", "crew")
+
+    def save_related(self, request, form, formsets, change):
+        # After the crew is saved, so new flights get the current crew.
+        super().save_related(request, form, formsets, change)
+        expand_schedule(form.instance)
+
+    def delete_model(self, request, obj):
+        expand_schedule(obj, remove=True)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        for schedule in queryset:
+            expand_schedule(schedule, remove=True)
+        super().delete_queryset(request, queryset)
+
+
+@admin.register(Route)
+class RouteAdmin(LargeTableAdmin):
+    list_display = ("id", "source", "destination", "distance")
+    autocomplete_fields = ("source", "destination")
+    search_fields = ("source__closest_big_city", "destination__closest_big_city")
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("source", "destination")
+
+
+@admin.register(Airport)
+class AirportAdmin(admin.ModelAdmin):
+    list_display = ("name", "closest_big_city")
+    search_fields = ("name", "closest_big_city")
+
+
+@admin.register(AirplaneType)
+class AirplaneTypeAdmin(admin.ModelAdmin):
+    search_fields = ("name",)
+
+
+@admin.register(Airplane)
+class AirplaneAdmin(admin.ModelAdmin):
+    list_display = ("name", "airplane_type", "rows", "seats_in_row")
+    list_select_related = ("airplane_type",)
+    autocomplete_fields = ("airplane_type",)
+    search_fields = ("name",)
 
 
-admin.site.register(Airport)
-admin.site.register(Route)
-admin.site.register(AirplaneType)
-admin.site.register(Airplane)
-admin.site.register(Crew)
-admin.site.register(Flight)
+@admin.register(Crew)
+class CrewAdmin(admin.ModelAdmin):
+    search_fields = ("first_name", "last_name")
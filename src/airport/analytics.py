@@ -0,0 +1,298 @@
+"""Load-factor summary tables, kept current without reading ``Ticket``.
+
+``FlightLoad`` holds sold seats per flight and ``RouteDailyLoad`` their
+totals per route and departure day. Orders add to both in their own
+transaction (``record_sales``), flight edits recompute the flights touched
+and add the difference to their route days (``refresh_flights``), and
+``refresh_load_factors`` rebuilds everything. Route days are only ever
+incremented or upserted in place, never deleted and re-inserted, so
+concurrent updates of the same day do not overwrite each other.
+Sold seats always come from ``seat_map``, so every path costs per flight,
+never per ticket.
+"""
+
+import operator
+from collections import Counter, defaultdict
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import (
+    BigIntegerField,
+    Case,
+    Count,
+    F,
+    IntegerField,
+    Q,
+    Sum,
+    When,
+)
+from django.utils import timezone
+
+from airport.models import ArchivedFlight, Flight, FlightLoad, RouteDailyLoad
+
+# RouteDailyLoad counters, in the order ``day_totals`` lists them.
+DAY_COLUMNS = ("flights", "capacity", "sold", "seat_km", "passenger_km")
+
+
+def flight_loads(queryset):
+    """Unsaved ``FlightLoad`` rows for a ``Flight`` or ``ArchivedFlight``
+    queryset, paired with their route's distance."""
+    rows = queryset.values(
+        "id",
+        "route_id",
+        "departure_date",
+        "seat_map",
+        capacity=F("airplane__rows") * F("airplane__seats_in_row"),
+        distance=F("route__distance"),
+    )
+    return [
+        (
+            FlightLoad(
+                flight_id=row["id"],
+                route_id=row["route_id"],
+                date=timezone.localdate(row["departure_date"]),
+                capacity=row["capacity"],
+                sold=Flight.count_seats(row["seat_map"]),
+            ),
+            row["distance"],
+        )
+        for row in rows
+    ]
+
+
+def build_flight_loads(queryset):
+    """Unsaved ``FlightLoad`` rows for a ``Flight`` or ``ArchivedFlight`` queryset."""
+    return [load for load, _ in flight_loads(queryset)]
+
+
+def save_flight_loads(loads) -> None:
+    FlightLoad.objects.bulk_create(
+        loads,
+        update_conflicts=True,
+        unique_fields=["flight_id"],
+        update_fields=["route", "date", "capacity", "sold"],
+    )
+
+
+def day_totals(loads):
+    """``DAY_COLUMNS`` totals per ``(route_id, date)`` of ``(FlightLoad,
+    distance)`` pairs."""
+    totals = defaultdict(lambda: [0] * len(DAY_COLUMNS))
+    for load, distance in loads:
+        day = totals[load.route_id, load.date]
+        amounts = (
+            1,
+            load.capacity,
+            load.sold,
+            load.capacity * distance,
+            load.sold * distance,
+        )
+        for index, amount in enumerate(amounts):
+            day[index] += amount
+    return totals
+
+
+def adjust_route_days(deltas) -> None:
+    """Add ``DAY_COLUMNS`` deltas per ``(route_id, date)`` to ``RouteDailyLoad``.
+
+    Increments, unlike recomputed totals, compose with concurrent
+    ``record_sales`` updates of the same rows.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+
+    RouteDailyLoad.objects.bulk_create(
+        [RouteDailyLoad(route_id=route_id, date=date) for route_id, date in deltas],
+        ignore_conflicts=True,
+    )
+    matches = {key: Q(route_id=key[0], date=key[1]) for key in deltas}
+    days = RouteDailyLoad.objects.filter(reduce(operator.or_, matches.values()))
+    days.update(
+        **{
+            column: increment(
+                column,
+                [(matches[key], delta[index]) for key, delta in deltas.items()],
+                BigIntegerField() if column.endswith("_km") else None,
+            )
+            for index, column in enumerate(DAY_COLUMNS)
+            if any(delta[index] for delta in deltas.values())
+        }
+    )
+    if any(delta[0] < 0 for delta in deltas.values()):
+        days.filter(flights=0).delete()
+
+
+def rebuild_route_days() -> int:
+    """Recompute every ``RouteDailyLoad`` row from ``FlightLoad``; returns
+    rows written.
+
+    The rows are locked first and upserted in place, so orders recording
+    sales meanwhile wait and then add to the rebuilt totals.
+    """
+    # Aliased so F("capacity") below still means the column.
+    totals = (
+        FlightLoad.objects.values("route_id", "date")
+        .annotate(
+            flight_count=Count("flight_id"),
+            capacity_sum=Sum("capacity"),
+            sold_sum=Sum("sold"),
+            seat_km=Sum(F("capacity") * F("route__distance")),
+            passenger_km=Sum(F("sold") * F("route__distance")),
+        )
+        .order_by()
+    )
+    with transaction.atomic(savepoint=False):
+        stale = {
+            (route_id, date): day_id
+            for day_id, route_id, date in RouteDailyLoad.objects.select_for_update()
+            .order_by("id")
+            .values_list("id", "route_id", "date")
+        }
+        days = [
+            RouteDailyLoad(
+                route_id=row["route_id"],
+                date=row["date"],
+                flights=row["flight_count"],
+                capacity=row["capacity_sum"],
+                sold=row["sold_sum"],
+                seat_km=row["seat_km"],
+                passenger_km=row["passenger_km"],
+            )
+            for row in totals
+        ]
+        RouteDailyLoad.objects.bulk_create(
+            days,
+            update_conflicts=True,
+            unique_fields=["route", "date"],
+            update_fields=list(DAY_COLUMNS),
+            batch_size=5_000,
+        )
+        for day in days:
+            stale.pop((day.route_id, day.date), None)
+        RouteDailyLoad.objects.filter(id__in=stale.values()).delete()
+        return len(days)
+
+
+def refresh_flights(flight_ids) -> None:
+    """Recompute the loads of ``flight_ids``, dropping rows of deleted flights,
+    and move the difference between route days."""
+    with transaction.atomic(savepoint=False):
+        current = FlightLoad.objects.filter(flight_id__in=flight_ids)
+        old = [
+            (load, load.distance)
+            for load in current.annotate(distance=F("route__distance"))
+        ]
+        new = flight_loads(Flight.objects.filter(id__in=flight_ids))
+
+        gone = {load.flight_id for load, _ in old}
+        gone.difference_update(load.flight_id for load, _ in new)
+        if gone:
+            current.filter(flight_id__in=gone).delete()
+        if new:
+            save_flight_loads([load for load, _ in new])
+
+        deltas = day_totals(new)
+        for key, totals in day_totals(old).items():
+            deltas[key] = [
+                amount - previous for amount, previous in zip(deltas[key], totals)
+            ]
+        adjust_route_days(deltas)
+
+
+def add_flight(flight) -> None:
+    """Add the load of a just-created ``flight`` from its cached relations."""
+    load = FlightLoad(
+        flight_id=flight.id,
+        route_id=flight.route_id,
+        date=timezone.localdate(flight.departure_date),
+        capacity=flight.airplane.capacity,
+        sold=Flight.count_seats(flight.seat_map),
+    )
+    with transaction.atomic(savepoint=False):
+        save_flight_loads([load])
+        adjust_route_days(day_totals([(load, flight.route.distance)]))
+
+
+def increment(column, amounts, output_field=None):
+    """``column`` plus a per-row amount, from ``(condition, amount)`` pairs."""
+    return F(column) + Case(
+        *(When(condition, then=amount) for condition, amount in amounts),
+        default=0,
+        output_field=output_field or IntegerField(),
+    )
+
+
+def record_sales(tickets, sold: int = 1) -> None:
+    """Add ``sold`` per ticket to its flight's and route day's counters.
+
+    Call it after the seat maps are updated, in the same transaction.
+    """
+    counts = Counter(ticket.flight_id for ticket in tickets)
+    with transaction.atomic(savepoint=False):
+        loads = {
+            row["flight_id"]: row
+            for row in FlightLoad.objects.filter(flight_id__in=counts).values(
+                "flight_id", "route_id", "date", distance=F("route__distance")
+            )
+        }
+        # Flights bulk-loaded since the last refresh have no row yet; their
+        # seat maps already include these tickets.
+        missing = [flight_id for flight_id in counts if flight_id not in loads]
+        if missing:
+            refresh_flights(missing)
+
+        if not loads:
+            return
+
+        days = defaultdict(lambda: [0, 0])
+        for flight_id, load in loads.items():
+            day = days[load["route_id"], load["date"]]
+            day[0] += counts[flight_id] * sold
+            day[1] += counts[flight_id] * sold * load["distance"]
+
+        # One UPDATE per table. The flights are already locked by the seat
+        # map update, so concurrent orders for them wait there.
+        FlightLoad.objects.filter(flight_id__in=loads).update(
+            sold=increment(
+                "sold",
+                [
+                    (Q(flight_id=flight_id), counts[flight_id] * sold)
+                    for flight_id in loads
+                ],
+            )
+        )
+        matches = {key: Q(route_id=key[0], date=key[1]) for key in days}
+        RouteDailyLoad.objects.filter(reduce(operator.or_, matches.values())).update(
+            sold=increment(
+                "sold", [(matches[key], count) for key, (count, _) in days.items()]
+            ),
+            passenger_km=increment(
+                "passenger_km",
+                [(matches[key], km) for key, (_, km) in days.items()],
+                BigIntegerField(),
+            ),
+        )
+
+
+def refresh_load_factors(batch_size: int = 5_000):
+    """Rebuild both tables from hot and archived flights.
+
+    Yields the ``FlightLoad`` rows written per batch.
+    """
+    for model in (Flight, ArchivedFlight):
+        last_id = 0
+        while True:
+            loads = build_flight_loads(
+                model.objects.filter(id__gt=last_id).order_by("id")[:batch_size]
+            )
+            if not loads:
+                break
+            save_flight_loads(loads)
+            last_id = loads[-1].flight_id
+            yield len(loads)
+
+    FlightLoad.objects.exclude(flight_id__in=Flight.objects.values("id")).exclude(
+        flight_id__in=ArchivedFlight.objects.values("id")
+    ).delete()
+    rebuild_route_days()
@@ -0,0 +1,83 @@
+"""Hot/archive split for departed flights.
+
+``archive_flights`` copies departed flights, their crew links and tickets
+into ``ArchivedFlight``/``ArchivedTicket`` and deletes them from the hot
+tables, one batch per transaction, so availability checks and the
+``Ticket`` unique index only cover flights that can still be sold.
+"""
+
+from django.db import connections, router, transaction
+
+from airport.itineraries import reset_connection_index
+from airport.models import ArchivedFlight, ArchivedTicket, Flight, SeatHold, Ticket
+
+FLIGHT_FIELDS = ("id", "route_id", "airplane_id", "departure_date", "arrival_date")
+TICKET_FIELDS = ("id", "row", "seat", "flight_id", "order_id")
+DELETE_BATCH_SIZE = 500
+
+
+def delete_rows(model, field, values) -> None:
+    """``DELETE`` rows of ``model`` whose ``field`` is in ``values``.
+
+    One plain statement per batch: rows are not collected first and no
+    delete signals are sent, so callers must keep dependent rows and
+    derived state in line themselves.
+    """
+    connection = connections[router.db_for_write(model)]
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.get_field(field).column)
+    values = list(values)
+    with connection.cursor() as cursor:
+        for start in range(0, len(values), DELETE_BATCH_SIZE):
+            batch = values[start : start + DELETE_BATCH_SIZE]
+            cursor.execute(
+                f"DELETE FROM {table} WHERE {column} IN "
+                f"({', '.join(['%s'] * len(batch))})",
+                batch,
+            )
+
+
+def archive_batch(flight_ids) -> int:
+    """Move ``flight_ids`` and their tickets to the archive; returns tickets moved."""
+    with transaction.atomic():
+        flights = Flight.objects.filter(id__in=flight_ids)
+        ArchivedFlight.objects.bulk_create(
+            ArchivedFlight(**{**row, "seat_map": bytes(row["seat_map"])})
+            for row in flights.select_for_update().values(*FLIGHT_FIELDS, "seat_map")
+        )
+        ArchivedFlight.crew.through.objects.bulk_create(
+            ArchivedFlight.crew.through(archivedflight_id=flight_id, crew_id=crew_id)
+            for flight_id, crew_id in Flight.crew.through.objects.filter(
+                flight_id__in=flight_ids
+            ).values_list("flight_id", "crew_id")
+        )
+        tickets = Ticket.objects.filter(flight_id__in=flight_ids)
+        moved = len(
+            ArchivedTicket.objects.bulk_create(
+                ArchivedTicket(**row) for row in tickets.values(*TICKET_FIELDS)
+            )
+        )
+
+        # Raw deletes: the seat map and itinerary signals are pointless for
+        # rows that are leaving, and would cost a query per ticket.
+        for model, field in (
+            (Ticket, "flight"),
+            (SeatHold, "flight"),
+            (Flight.crew.through, "flight"),
+            (Flight, "id"),
+        ):
+            delete_rows(model, field, flight_ids)
+    return moved
+
+
+def archive_flights(before, batch_size=500):
+    """Archive flights departed before ``before``, in batches.
+
+    Yields ``(flights, tickets)`` moved per batch.
+    """
+    departed = Flight.objects.filter(departure_date__lt=before).order_by("id")
+    try:
+        while flight_ids := list(departed.values_list("id", flat=True)[:batch_size]):
+            yield len(flight_ids), archive_batch(flight_ids)
+    finally:
+        reset_connection_index()
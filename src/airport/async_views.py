@@ -0,0 +1,281 @@
+"""Async read path for flights and catalog lists, for ASGI deployments.
+
+Mounted ahead of the router when ASYNC_READ_VIEWS is on. GET requests are
+served here with the async ORM and the viewsets' own serializers, so the
+JSON is the same; other methods, ``?format=`` and browsable API requests
+fall through to the sync viewsets.
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse
+from django.urls import path, re_path
+from django.utils.http import parse_etags
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException,
+    AuthenticationFailed,
+    NotAuthenticated,
+    NotFound,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from airport.caching import CACHE_ALIAS, aget_versions, response_cache_key
+from airport.fast_serializers import (
+    FlightListRowSerializer,
+    RouteListRowSerializer,
+    SeatMapRowSerializer,
+)
+from airport.models import Airplane, Airport, Crew, Flight
+from airport.pagination import FlightPagination, RoutePagination
+from airport.replicas import choose_replica, reading_from
+from airport.serializers import (
+    AirplaneListSerializer,
+    AirplaneTypeSerializer,
+    AirportSerializer,
+    CrewSerializer,
+    FlightDepartureFilterSerializer,
+    FlightRetrieveSerializer,
+)
+from airport.views import (
+    AirplaneTypeViewSet,
+    AirplaneViewSet,
+    AirportViewSet,
+    CrewViewSet,
+    FlightViewSet,
+    RouteViewSet,
+)
+
+_renderer = JSONRenderer()
+# The configured JWT class (JWT_AUTH_MODE), so both paths resolve users alike.
+_jwt = api_settings.DEFAULT_AUTHENTICATION_CLASSES[0]()
+
+
+def json_response(data, status_code=status.HTTP_200_OK, headers=None):
+    return HttpResponse(
+        _renderer.render(data),
+        status=status_code,
+        content_type=_renderer.media_type,
+        headers=headers,
+    )
+
+
+def error_response(exc):
+    """Same status, body and headers as DRF's exception handler."""
+    headers = {}
+    status_code = exc.status_code
+    if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+        headers["WWW-Authenticate"] = _jwt.authenticate_header(None)
+        status_code = status.HTTP_401_UNAUTHORIZED
+    data = (
+        exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+    )
+    return json_response(data, status_code, headers)
+
+
+async def aauthenticate(request):
+    """Async ``JWTAuthentication.authenticate``; returns the user or None."""
+    header = _jwt.get_header(request)
+    if header is None:
+        return None
+    raw_token = _jwt.get_raw_token(header)
+    if raw_token is None:
+        return None
+    token = _jwt.get_validated_token(raw_token)
+
+    aget_user = getattr(_jwt, "aget_user", None)
+    if aget_user is not None:
+        return await aget_user(token)
+    return await sync_to_async(_jwt.get_user)(token)
+
+
+def async_read(fallback):
+    """Serve authenticated GETs with the coroutine, the rest with ``fallback``."""
+    sync_fallback = sync_to_async(fallback)
+
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if (
+                request.method != "GET"
+                or "format" in request.GET
+                or "text/html" in request.headers.get("Accept", "")
+            ):
+                return await sync_fallback(request, *args, **kwargs)
+            try:
+                request.user = await aauthenticate(request)
+                if request.user is None:
+                    raise NotAuthenticated()
+                replica = await sync_to_async(choose_replica)(request.user)
+                with reading_from(replica):
+                    return await view(request, *args, **kwargs)
+            except APIException as exc:
+                return error_response(exc)
+
+        return wrapper
+
+    return decorator
+
+
+async def cached_json(request, models, build):
+    """``CachedResponseMixin.cached_response`` for async views; same keys."""
+    key, etag = response_cache_key(
+        _renderer.format, request.get_full_path(), await aget_versions(models)
+    )
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    cache = caches[CACHE_ALIAS]
+    cached = await cache.aget(key)
+    if cached is None:
+        cached = (_renderer.render(await build()), _renderer.media_type)
+        await cache.aset(key, cached)
+    content, content_type = cached
+    return HttpResponse(content, content_type=content_type, headers={"ETag": etag})
+
+
+def paginated(paginator, results):
+    return {
+        "next": paginator.get_next_link(),
+        "previous": paginator.get_previous_link(),
+        "results": results,
+    }
+
+
+def list_view(viewset, basename):
+    """The router's list route of ``viewset``, used as the sync fallback."""
+    return viewset.as_view(
+        {"get": "list", "post": "create"}, basename=basename, detail=False
+    )
+
+
+async def serialize_all(serializer_class, queryset):
+    return serializer_class([obj async for obj in queryset], many=True).data
+
+
+@async_read(list_view(AirportViewSet, "airports"))
+async def airport_list(request):
+    return await cached_json(
+        request,
+        (Airport,),
+        lambda: serialize_all(AirportSerializer, AirportViewSet.queryset.all()),
+    )
+
+
+@async_read(list_view(AirplaneViewSet, "airplane"))
+async def airplane_list(request):
+    return await cached_json(
+        request,
+        (Airplane,),
+        lambda: serialize_all(AirplaneListSerializer, AirplaneViewSet.queryset.all()),
+    )
+
+
+@async_read(list_view(AirplaneTypeViewSet, "airplanetype"))
+async def airplane_type_list(request):
+    return await cached_json(
+        request,
+        AirplaneTypeViewSet.cache_models,
+        lambda: serialize_all(
+            AirplaneTypeSerializer, AirplaneTypeViewSet.queryset.all()
+        ),
+    )
+
+
+@async_read(list_view(CrewViewSet, "crew"))
+async def crew_list(request):
+    return await cached_json(
+        request,
+        (Crew,),
+        lambda: serialize_all(CrewSerializer, CrewViewSet.queryset.all()),
+    )
+
+
+@async_read(list_view(RouteViewSet, "route"))
+async def route_list(request):
+    async def build():
+        paginator = RoutePagination()
+        rows = RouteListRowSerializer.values(RouteViewSet.queryset.all())
+        page = await paginator.apaginate_queryset(rows, Request(request))
+        return paginated(
+            paginator, [RouteListRowSerializer.to_representation(row) for row in page]
+        )
+
+    return await cached_json(request, RouteViewSet.cache_models, build)
+
+
+@async_read(list_view(FlightViewSet, "flight"))
+async def flight_list(request):
+    queryset = FlightViewSet.queryset.all()
+    source = request.GET.get("source")
+    destination = request.GET.get("destination")
+    airplane = request.GET.get("airplane")
+
+    if source:
+        queryset = queryset.filter(
+            route__source_id__in=await Airport.aids_by_city(source)
+        )
+    if destination:
+        queryset = queryset.filter(
+            route__destination_id__in=await Airport.aids_by_city(destination)
+        )
+    if airplane:
+        queryset = queryset.filter(airplane__name__icontains=airplane)
+
+    departure = FlightDepartureFilterSerializer(data=request.GET)
+    departure.is_valid(raise_exception=True)
+    queryset = departure.filter(queryset)
+
+    paginator = FlightPagination()
+    rows = FlightListRowSerializer.values(queryset)
+    page = await paginator.apaginate_queryset(rows, Request(request))
+    return json_response(
+        paginated(
+            paginator, [FlightListRowSerializer.to_representation(row) for row in page]
+        )
+    )
+
+
+@async_read(
+    FlightViewSet.as_view(
+        {
+            "get": "retrieve",
+            "put": "update",
+            "patch": "partial_update",
+            "delete": "destroy",
+        },
+        basename="flight",
+        detail=True,
+    )
+)
+async def flight_detail(request, pk):
+    encoding = SeatMapRowSerializer.requested_encoding(
+        request.GET, request.headers.get("Accept", "")
+    )
+    try:
+        if encoding is not None:
+            row = await SeatMapRowSerializer.values(Flight.objects.all()).aget(pk=pk)
+            return json_response(SeatMapRowSerializer.to_representation(row, encoding))
+        flight = await FlightViewSet.queryset.prefetch_related("tickets").aget(pk=pk)
+    except (Flight.DoesNotExist, TypeError, ValueError, ValidationError):
+        raise NotFound(f"No {Flight._meta.object_name} matches the given query.")
+    return json_response(FlightRetrieveSerializer(flight).data)
+
+
+# Same paths and names as the router's, so reverse() is unaffected.
+urlpatterns = [
+    path("airports/", airport_list, name="airports-list"),
+    path("routes/", route_list, name="route-list"),
+    path("airplane-types/", airplane_type_list, name="airplanetype-list"),
+    path("airplanes/", airplane_list, name="airplane-list"),
+    path("crews/", crew_list, name="crew-list"),
+    path("flights/", flight_list, name="flight-list"),
+    re_path(r"^flights/(?P<pk>[^/.]+)/$", flight_detail, name="flight-detail"),
+]
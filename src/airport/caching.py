@@ -0,0 +1,110 @@
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+CACHE_ALIAS = "catalog"
+
+
+def _version_key(model) -> str:
+    return f"version:{model._meta.label_lower}"
+
+
+def bump_version(model) -> None:
+    """Invalidate every cached response built from ``model``."""
+    cache = caches[CACHE_ALIAS]
+    try:
+        cache.incr(_version_key(model))
+    except ValueError:
+        cache.set(_version_key(model), time.time_ns(), timeout=None)
+
+
+def get_versions(models) -> list[int]:
+    cache = caches[CACHE_ALIAS]
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # A fresh, unique start value so an evicted counter can never
+            # collide with responses cached under its old values.
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(models) -> list[int]:
+    cache = caches[CACHE_ALIAS]
+    keys = [_version_key(model) for model in models]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def response_cache_key(renderer_format, full_path, versions) -> tuple[str, str]:
+    """Return the cache key and strong ETag of a cached response."""
+    key = f"response:{renderer_format}:{full_path}:{':'.join(map(str, versions))}"
+    return key, f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+
+class CachedResponseMixin:
+    """Serve safe catalog actions from the ``catalog`` cache with strong ETags.
+
+    Entries are keyed by the request path, the negotiated format and the
+    version counters of ``cache_models``, which signals bump once every save
+    or delete commits, so stale entries are never read and simply age out.
+    Only JSON is cached: keys are shared between users, and the browsable
+    API page embeds the user's email and CSRF token.
+    """
+
+    cache_models = ()
+
+    def get_cache_models(self):
+        return self.cache_models or (self.queryset.model,)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.accepted_renderer.format != "json":
+            return handler(request, *args, **kwargs)
+
+        key, etag = response_cache_key(
+            request.accepted_renderer.format,
+            request.get_full_path(),
+            get_versions(self.get_cache_models()),
+        )
+
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        cache = caches[CACHE_ALIAS]
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response["ETag"] = etag
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+            response.add_post_render_callback(
+                lambda rendered: cache.set(
+                    key, (rendered.content, rendered["Content-Type"])
+                )
+            )
+        return response
+
+
+class CachedListMixin(CachedResponseMixin):
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(CachedResponseMixin):
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
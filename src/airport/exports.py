@@ -0,0 +1,90 @@
+"""Streaming NDJSON/CSV exports over server-side cursors."""
+
+import csv
+import json
+from datetime import datetime
+from itertools import chain, islice
+
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+CHUNK_SIZE = 2_000
+
+_datetime = serializers.DateTimeField()
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=JSONEncoder).encode() + b"\n"
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = data if isinstance(data, list) else [data]
+        return "".join(_csv_lines(list(rows[0]) if rows else [], rows)).encode()
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(fields, rows):
+    writer = csv.writer(_Echo())
+    return chain(
+        [writer.writerow(fields)],
+        (writer.writerow([row[field] for field in fields]) for row in rows),
+    )
+
+
+def _ndjson_lines(rows):
+    return (json.dumps(row, cls=JSONEncoder) + "\n" for row in rows)
+
+
+def _plain(row, fields):
+    values = (row[field] for field in fields)
+    return {
+        field: (
+            _datetime.to_representation(value) if isinstance(value, datetime) else value
+        )
+        for field, value in zip(fields, values)
+    }
+
+
+def _batched(lines, size=CHUNK_SIZE):
+    lines = iter(lines)
+    while batch := "".join(islice(lines, size)):
+        yield batch
+
+
+def stream_export(rows, fields, export_format, filename):
+    """Stream dict ``rows`` as NDJSON or CSV without holding them in memory.
+
+    ``rows`` should come from ``QuerySet.iterator()`` so the database side is
+    read in chunks too.
+    """
+    rows = (_plain(row, fields) for row in rows)
+    if export_format == CSVRenderer.format:
+        lines = _csv_lines(fields, rows)
+        content_type = "text/csv; charset=utf-8"
+    else:
+        lines = _ndjson_lines(rows)
+        content_type = "application/x-ndjson; charset=utf-8"
+
+    response = StreamingHttpResponse(_batched(lines), content_type=content_type)
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename}.{export_format}"'
+    )
+    return response
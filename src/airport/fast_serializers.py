@@ -0,0 +1,155 @@
+"""Opt-in list serialization straight from ``.values()`` rows.
+
+Each row serializer renders exactly what its DRF counterpart renders, field
+for field, without instantiating models. Enabled by FAST_LIST_SERIALIZATION.
+"""
+
+import base64
+from itertools import groupby
+
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.http.request import MediaType
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from airport.models import Flight
+
+_datetime = serializers.DateTimeField()
+
+
+class FlightListRowSerializer:
+    """Same output as ``FlightListSerializer``."""
+
+    @staticmethod
+    def values(queryset):
+        return queryset.prefetch_related(None).values(
+            "id",
+            "departure_date",
+            "arrival_date",
+            "seat_map",
+            route_label=Concat(
+                "route__source__closest_big_city",
+                Value(" - "),
+                "route__destination__closest_big_city",
+            ),
+            airplane_name=F("airplane__name"),
+            airplane_capacity=F("airplane__rows") * F("airplane__seats_in_row"),
+        )
+
+    @staticmethod
+    def to_representation(row):
+        return {
+            "id": row["id"],
+            "route": row["route_label"],
+            "airplane": row["airplane_name"],
+            "tickets_available": row["airplane_capacity"]
+            - Flight.count_seats(row["seat_map"]),
+            "departure_date": _datetime.to_representation(row["departure_date"]),
+            "arrival_date": _datetime.to_representation(row["arrival_date"]),
+        }
+
+
+class RouteListRowSerializer:
+    """Same output as ``RouteListSerializer``."""
+
+    @staticmethod
+    def values(queryset):
+        return queryset.values(
+            "id",
+            "distance",
+            source_label=Concat(
+                "source__name", Value(" ("), "source__closest_big_city", Value(")")
+            ),
+            destination_label=Concat(
+                "destination__name",
+                Value(" ("),
+                "destination__closest_big_city",
+                Value(")"),
+            ),
+        )
+
+    @staticmethod
+    def to_representation(row):
+        return {
+            "id": row["id"],
+            "source": row["source_label"],
+            "destination": row["destination_label"],
+            "distance": row["distance"],
+        }
+
+
+class SeatMapRowSerializer:
+    """Compact occupancy of a flight, read from ``Flight.seat_map``.
+
+    ``bitmap`` is the base64 of one bit per seat, LSB first, in
+    ``(row - 1) * seats_in_row + (seat - 1)`` order. ``rle`` gives each row
+    as run lengths alternating free and taken seats, starting with free.
+    """
+
+    ENCODINGS = ("bitmap", "rle")
+
+    @classmethod
+    def requested_encoding(cls, query_params, accept):
+        """``?seats=`` or the ``seats`` parameter of an Accept media range."""
+        encoding = query_params.get("seats")
+        if encoding is None:
+            for media_range in accept.split(","):
+                encoding = MediaType(media_range).params.get("seats")
+                if encoding is not None:
+                    break
+        if encoding is not None and encoding not in cls.ENCODINGS:
+            raise serializers.ValidationError(
+                {"seats": f"Expected one of: {', '.join(cls.ENCODINGS)}."}
+            )
+        return encoding
+
+    @staticmethod
+    def values(queryset):
+        return queryset.values_list(
+            "id", "airplane__rows", "airplane__seats_in_row", "seat_map"
+        )
+
+    @staticmethod
+    def to_representation(row, encoding):
+        flight_id, rows, seats_in_row, seat_map = row
+        seat_map = bytes(seat_map)
+        if encoding == "bitmap":
+            size = -(-rows * seats_in_row // 8)
+            taken_place = base64.b64encode(seat_map[:size].ljust(size, b"\0")).decode()
+        else:
+            bits = int.from_bytes(seat_map, "little")
+            taken_place = []
+            for row_number in range(rows):
+                row_bits = bits >> row_number * seats_in_row
+                seats = [row_bits >> seat & 1 for seat in range(seats_in_row)]
+                runs = [] if seats[:1] == [0] else [0]
+                runs += [len(list(group)) for _, group in groupby(seats)]
+                taken_place.append(runs)
+        return {
+            "id": flight_id,
+            "rows": rows,
+            "seats_in_row": seats_in_row,
+            "encoding": encoding,
+            "taken_place": taken_place,
+        }
+
+
+class FastListMixin:
+    """Serve ``list`` through ``list_row_serializer`` when enabled."""
+
+    list_row_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_LIST_SERIALIZATION:
+            return super().list(request, *args, **kwargs)
+
+        row_serializer = self.list_row_serializer
+        rows = row_serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response([row_serializer.to_representation(row) for row in rows])
+        return self.get_paginated_response(
+            [row_serializer.to_representation(row) for row in page]
+        )
@@ -0,0 +1,307 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time as day_time, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from airport.models import Airport, Flight
+
+DAY = 24 * 60 * 60
+
+
+class ConnectionIndex:
+    """Flights as departure-sorted connection arrays for connection scan (CSA).
+
+    Every flight is one connection ``(flight_id, source airport, destination
+    airport, departure, arrival)`` with times in epoch seconds. The columns are
+    parallel ``array("q")`` so a million flights stay a few dozen megabytes.
+    """
+
+    def __init__(self, rows=()):
+        rows = sorted(rows, key=lambda row: (row[3], row[0]))
+        self.flight_ids = array("q", (row[0] for row in rows))
+        self.sources = array("q", (row[1] for row in rows))
+        self.destinations = array("q", (row[2] for row in rows))
+        self.departures = array("q", (row[3] for row in rows))
+        self.arrivals = array("q", (row[4] for row in rows))
+        # Flights found to be sold out; skipped until the index is rebuilt.
+        self.full_flights = set()
+
+    def __len__(self):
+        return len(self.flight_ids)
+
+    @property
+    def columns(self):
+        return (
+            self.flight_ids,
+            self.sources,
+            self.destinations,
+            self.departures,
+            self.arrivals,
+        )
+
+    def add(self, flight_id, source_id, destination_id, departure, arrival):
+        position = bisect_right(self.departures, departure)
+        for column, value in zip(
+            self.columns, (flight_id, source_id, destination_id, departure, arrival)
+        ):
+            column.insert(position, value)
+
+    def remove(self, flight_id, departure):
+        """Drop ``flight_id``, bisecting on the ``departure`` it was indexed at.
+
+        Falls back to a scan when the index holds another departure, as
+        after a change made by another process.
+        """
+        start = bisect_left(self.departures, departure)
+        end = bisect_right(self.departures, departure, start)
+        for position in range(start, end):
+            if self.flight_ids[position] == flight_id:
+                break
+        else:
+            try:
+                position = self.flight_ids.index(flight_id)
+            except ValueError:
+                return
+        for column in self.columns:
+            del column[position]
+
+    def earliest_arrival(
+        self,
+        sources,
+        destinations,
+        earliest_departure,
+        latest_departure,
+        min_connection,
+        max_duration,
+    ):
+        """Return flight ids of the earliest arriving journey, or ``None``.
+
+        The first leg departs from ``sources`` between ``earliest_departure``
+        and ``latest_departure``; every transfer keeps ``min_connection``
+        seconds between arrival and the next departure.
+        """
+        departures, arrivals = self.departures, self.arrivals
+        from_airports, to_airports = self.sources, self.destinations
+        flight_ids, full_flights = self.flight_ids, self.full_flights
+
+        reached = {}
+        via = {}
+        best_arrival = latest_departure + max_duration
+        best_destination = None
+
+        for i in range(bisect_left(departures, earliest_departure), len(departures)):
+            departure = departures[i]
+            if departure >= best_arrival:
+                break
+
+            source = from_airports[i]
+            if source in sources:
+                if departure > latest_departure:
+                    continue
+            elif source not in reached or reached[source] + min_connection > departure:
+                continue
+
+            destination = to_airports[i]
+            arrival = arrivals[i]
+            if (
+                destination in sources
+                or arrival >= reached.get(destination, best_arrival)
+                or flight_ids[i] in full_flights
+            ):
+                continue
+
+            reached[destination] = arrival
+            via[destination] = i
+            if destination in destinations:
+                best_arrival = arrival
+                best_destination = destination
+
+        if best_destination is None:
+            return None
+
+        legs = []
+        airport = best_destination
+        while airport not in sources:
+            legs.append(via[airport])
+            airport = from_airports[via[airport]]
+        return [flight_ids[i] for i in reversed(legs)]
+
+
+_index = None
+_index_built_at = 0.0
+_index_lock = threading.Lock()
+# Flight changes signalled while an index is being built, one log per build:
+# ``(flight_id, previous departure or None, connection or None)``, or
+# ``None`` for a reset. New flights have no previous departure.
+_change_logs = {}
+
+
+def _timestamp(value: datetime) -> int:
+    return int(value.timestamp())
+
+
+def build_connection_index() -> ConnectionIndex:
+    flights = (
+        Flight.objects.filter(
+            departure_date__gte=timezone.now() - settings.ITINERARY_MAX_DURATION
+        )
+        .values_list(
+            "id",
+            "route__source_id",
+            "route__destination_id",
+            "departure_date",
+            "arrival_date",
+        )
+        .iterator(chunk_size=10_000)
+    )
+    return ConnectionIndex(
+        (
+            flight_id,
+            source_id,
+            destination_id,
+            _timestamp(departure),
+            _timestamp(arrival),
+        )
+        for flight_id, source_id, destination_id, departure, arrival in flights
+    )
+
+
+def get_connection_index() -> ConnectionIndex:
+    """Return this process's index, rebuilding it after ITINERARY_INDEX_TTL.
+
+    Local flight changes are applied incrementally through signals; the
+    periodic rebuild picks up changes made by other processes. The rebuild
+    runs outside the lock, so searches and flight signals do not wait for
+    it; changes signalled meanwhile are replayed onto the new index.
+    """
+    global _index, _index_built_at
+
+    with _index_lock:
+        if (
+            _index is not None
+            and time.monotonic() - _index_built_at <= settings.ITINERARY_INDEX_TTL
+        ):
+            return _index
+        build = object()
+        changes = _change_logs[build] = []
+
+    try:
+        index = build_connection_index()
+    except Exception:
+        with _index_lock:
+            del _change_logs[build]
+        raise
+
+    with _index_lock:
+        del _change_logs[build]
+        if None in changes:
+            # Reset mid-build: the rows read may predate the reset's cause.
+            return index
+        for change in changes:
+            _apply_change(index, change)
+        _index, _index_built_at = index, time.monotonic()
+        return index
+
+
+def reset_connection_index() -> None:
+    """Drop this process's index; the next search rebuilds it."""
+    global _index
+
+    with _index_lock:
+        _index = None
+        for changes in _change_logs.values():
+            changes.append(None)
+
+
+def _apply_change(index: ConnectionIndex, change) -> None:
+    flight_id, previous_departure, connection = change
+    if previous_departure is not None:
+        index.remove(flight_id, previous_departure)
+    if connection is not None:
+        index.add(flight_id, *connection)
+
+
+def _record_change(change) -> None:
+    """Apply ``change`` to the index and to builds in progress; hold the lock."""
+    for changes in _change_logs.values():
+        changes.append(change)
+    if _index is not None:
+        _apply_change(_index, change)
+
+
+def update_flight(flight: Flight, previous_departure: datetime | None) -> None:
+    with _index_lock:
+        if _index is None and not _change_logs:
+            return
+        _record_change(
+            (
+                flight.id,
+                previous_departure and _timestamp(previous_departure),
+                (
+                    flight.route.source_id,
+                    flight.route.destination_id,
+                    _timestamp(flight.departure_date),
+                    _timestamp(flight.arrival_date),
+                ),
+            )
+        )
+
+
+def remove_flight(flight_id: int, departure: datetime) -> None:
+    with _index_lock:
+        _record_change((flight_id, _timestamp(departure), None))
+
+
+def find_itineraries(source: str, destination: str, date: date, limit: int) -> list:
+    """Up to ``limit`` journeys departing on ``date``, each the fastest to
+    leave after the previous one's first departure, with seats on every leg.
+    """
+    sources = set(Airport.ids_by_city(source))
+    destinations = set(Airport.ids_by_city(destination)) - sources
+    if not sources or not destinations:
+        return []
+
+    earliest = _timestamp(datetime.combine(date, day_time.min, tzinfo=dt_timezone.utc))
+    latest = earliest + DAY - 1
+    index = get_connection_index()
+    itineraries = []
+
+    while len(itineraries) < limit:
+        flight_ids = index.earliest_arrival(
+            sources,
+            destinations,
+            earliest,
+            latest,
+            int(settings.ITINERARY_MIN_CONNECTION.total_seconds()),
+            int(settings.ITINERARY_MAX_DURATION.total_seconds()),
+        )
+        if flight_ids is None:
+            break
+
+        flights = Flight.objects.select_related(
+            "route__source", "route__destination", "airplane"
+        ).in_bulk(flight_ids)
+        sold_out = [
+            flight_id
+            for flight_id in flight_ids
+            if flight_id not in flights or flights[flight_id].tickets_available <= 0
+        ]
+        if sold_out:
+            index.full_flights.update(sold_out)
+            continue
+
+        legs = [flights[flight_id] for flight_id in flight_ids]
+        itineraries.append(
+            {
+                "departure_date": legs[0].departure_date,
+                "arrival_date": legs[-1].arrival_date,
+                "legs": legs,
+            }
+        )
+        earliest = _timestamp(legs[0].departure_date) + 1
+
+    return itineraries
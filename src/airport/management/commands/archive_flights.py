@@ -0,0 +1,50 @@
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from airport.archive import archive_flights
+
+
+class Command(BaseCommand):
+    help = (
+        "Move departed flights, their crew links and tickets to the archive "
+        "tables in batches, one transaction per batch. Orders stay in place "
+        "and list archived tickets with ?archived=true."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=7,
+            help="Archive flights that departed more than this many days ago.",
+        )
+        parser.add_argument(
+            "--before",
+            type=datetime.fromisoformat,
+            help="Archive flights departed before this ISO datetime instead.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        before = options["before"] or timezone.now() - timedelta(days=options["days"])
+        if timezone.is_naive(before):
+            before = timezone.make_aware(before)
+
+        started = time.perf_counter()
+        flights = tickets = 0
+        for batch_flights, batch_tickets in archive_flights(
+            before, options["batch_size"]
+        ):
+            flights += batch_flights
+            tickets += batch_tickets
+            self.stdout.write(f"archived {flights} flights, {tickets} tickets")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Done: {flights} flights and {tickets} tickets departed before "
+            f"{before:%Y-%m-%d %H:%M} in {elapsed:.1f} s "
+            f"({tickets / max(elapsed, 1e-9):.0f} tickets/s)"
+        )
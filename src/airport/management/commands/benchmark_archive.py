@@ -0,0 +1,122 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Prefetch
+
+from airport.archive import archive_flights
+from airport.fast_serializers import FlightListRowSerializer
+from airport.models import ArchivedFlight, Flight, Order, Ticket
+
+
+class Command(BaseCommand):
+    help = (
+        "Time hot-table queries, archive the oldest --fraction of flights "
+        "with archive_flights, vacuum, and time them again. The archival is "
+        "committed: run it on a generate_dataset database, not real data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fraction",
+            type=float,
+            default=0.8,
+            help="Share of flights, by departure date, to archive.",
+        )
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not 0 < options["fraction"] < 1:
+            raise CommandError("--fraction must be between 0 and 1.")
+        if ArchivedFlight.objects.exists():
+            raise CommandError("The archive is not empty; regenerate the dataset.")
+
+        total = Flight.objects.count()
+        probe = Ticket.objects.values("flight_id", "row", "seat", "order__user_id")
+        if not total or not probe.exists():
+            raise CommandError("No sold flights; run generate_dataset first.")
+        cutoff = Flight.objects.order_by("departure_date", "id").values_list(
+            "departure_date", flat=True
+        )[int(total * options["fraction"])]
+        probe = probe.filter(flight__departure_date__gte=cutoff).first()
+        if probe is None:
+            raise CommandError("No sold flights after the cutoff; lower --fraction.")
+
+        queries = {
+            "ticket seat probe": lambda: Ticket.objects.filter(
+                flight_id=probe["flight_id"], row=probe["row"], seat=probe["seat"]
+            ).exists(),
+            "upcoming tickets": lambda: Ticket.objects.filter(
+                flight__departure_date__gte=cutoff
+            ).count(),
+            "flight list page": lambda: list(
+                FlightListRowSerializer.values(
+                    Flight.objects.filter(departure_date__gte=cutoff).order_by(
+                        "departure_date", "id"
+                    )
+                )[:20]
+            ),
+            "user orders": lambda: list(
+                Order.objects.filter(user_id=probe["order__user_id"])
+                .prefetch_related(
+                    Prefetch(
+                        "tickets",
+                        queryset=Ticket.objects.select_related("flight__route"),
+                    )
+                )
+                .order_by("-created_at", "-id")[:20]
+            ),
+            "flight count": lambda: Flight.objects.count(),
+        }
+
+        before = self.measure(queries, options["repeat"])
+        started = time.perf_counter()
+        archived = [0, 0]
+        for batch_flights, batch_tickets in archive_flights(
+            cutoff, options["batch_size"]
+        ):
+            archived[0] += batch_flights
+            archived[1] += batch_tickets
+        elapsed = time.perf_counter() - started
+        self.vacuum()
+        after = self.measure(queries, options["repeat"])
+
+        self.stdout.write(
+            f"Archived {archived[0]} of {total} flights and {archived[1]} tickets "
+            f"in {elapsed:.1f} s"
+        )
+        self.stdout.write(
+            f"{'query':<20}{'before ms':>11}{'after ms':>10}{'speedup':>9}"
+        )
+        for name in queries:
+            self.stdout.write(
+                f"{name:<20}{before[name]:>11.3f}{after[name]:>10.3f}"
+                f"{before[name] / max(after[name], 1e-9):>8.1f}x"
+            )
+
+    @staticmethod
+    def measure(queries, repeat):
+        """Median milliseconds per query."""
+        results = {}
+        for name, query in queries.items():
+            query()
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                query()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(timings)
+        return results
+
+    @staticmethod
+    def vacuum():
+        # Deleted rows stay in heap and indexes until vacuumed; measure the
+        # steady state, not the archival's leftovers.
+        tables = [model._meta.db_table for model in (Flight, Ticket)]
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(f"VACUUM ANALYZE {', '.join(tables)}")
+            elif connection.vendor == "sqlite":
+                cursor.execute("VACUUM")
@@ -0,0 +1,152 @@
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import include, path
+from rest_framework_simplejwt.tokens import AccessToken
+
+from airport import async_views
+from airport import urls as airport_urls
+from airport.models import Airport, Flight
+from core import urls as core_urls
+
+AIRPORT_URL = "/api/airports/"
+
+
+class AsyncURLConf:
+    """The project URLs with the async views mounted first, as
+    ASYNC_READ_VIEWS=true does, so both sides run in this process."""
+
+    urlpatterns = [
+        path(
+            "api/airports/",
+            include(
+                (async_views.urlpatterns + airport_urls.urlpatterns, "airport"),
+                namespace="airport",
+            ),
+        )
+    ] + core_urls.urlpatterns
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync viewsets on a threaded WSGI handler with the async "
+        "read views on the ASGI handler, at several client concurrencies. "
+        "Reads the existing database; run generate_dataset first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1_000)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            nargs="+",
+            default=[1, 10, 50],
+            help="Concurrent clients, one run per value.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=8,
+            help="Worker threads of the WSGI side, like gunicorn --threads.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        flight_ids = list(Flight.objects.values_list("id", flat=True)[:1_000])
+        cities = list(Airport.objects.values_list("closest_big_city", flat=True)[:200])
+        user = get_user_model().objects.order_by("id").first()
+        if not flight_ids or user is None:
+            raise CommandError("No flights or users; run generate_dataset first.")
+
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+        self.paths = [
+            rng.choice(
+                [
+                    (AIRPORT_URL + "flights/", {}),
+                    (AIRPORT_URL + "flights/", {"source": rng.choice(cities)[:4]}),
+                    (AIRPORT_URL + f"flights/{rng.choice(flight_ids)}/", {}),
+                    (AIRPORT_URL + f"flights/{rng.choice(flight_ids)}/", {}),
+                    (AIRPORT_URL + "airports/", {}),
+                    (AIRPORT_URL + "routes/", {}),
+                ]
+            )
+            for _ in range(options["requests"])
+        ]
+        setup_test_environment(debug=False)
+        try:
+            self.stdout.write(
+                f"{'handler':<8}{'clients':>8}{'p50 ms':>9}{'p95 ms':>9}"
+                f"{'p99 ms':>9}{'req/s':>9}"
+            )
+            for concurrency in options["concurrency"]:
+                for name, run in (("wsgi", self.run_wsgi), ("asgi", self.run_asgi)):
+                    started = time.perf_counter()
+                    timings = asyncio.run(run(concurrency, options["threads"]))
+                    self.report(name, concurrency, timings, started)
+        finally:
+            teardown_test_environment()
+
+    async def run_clients(self, concurrency, send):
+        """Split the request list over ``concurrency`` sequential clients."""
+        timings = []
+
+        async def client(paths):
+            for url, params in paths:
+                started = time.perf_counter()
+                response = await send(url, params)
+                timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(f"{url} answered {response.status_code}.")
+
+        await asyncio.gather(
+            *(client(self.paths[i::concurrency]) for i in range(concurrency))
+        )
+        return timings
+
+    async def run_wsgi(self, concurrency, threads):
+        loop = asyncio.get_running_loop()
+
+        def get(url, params):
+            # Like request_finished with CONN_MAX_AGE=0 on a real server.
+            try:
+                return Client().get(url, params, headers=self.headers)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(threads) as pool:
+            return await self.run_clients(
+                concurrency,
+                lambda url, params: loop.run_in_executor(pool, get, url, params),
+            )
+
+    async def run_asgi(self, concurrency, threads):
+        client = AsyncClient()
+
+        async def get(url, params):
+            # ASGIHandler gives each request its own thread-sensitive context.
+            async with ThreadSensitiveContext():
+                try:
+                    return await client.get(url, params, headers=self.headers)
+                finally:
+                    await sync_to_async(connections.close_all)()
+
+        with override_settings(ROOT_URLCONF=AsyncURLConf):
+            return await self.run_clients(concurrency, get)
+
+    def report(self, name, concurrency, timings, started):
+        elapsed = time.perf_counter() - started
+        quantiles = statistics.quantiles(timings, n=100, method="inclusive")
+        self.stdout.write(
+            f"{name:<8}{concurrency:>8}{quantiles[49]:>9.2f}{quantiles[94]:>9.2f}"
+            f"{quantiles[98]:>9.2f}{len(timings) / elapsed:>9.1f}"
+        )
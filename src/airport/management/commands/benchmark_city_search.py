@@ -0,0 +1,137 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from airport.models import Airplane, AirplaneType, Airport, Flight, Route
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the joined icontains flight search with the airport id "
+        "resolution path on a synthetic dataset. All rows are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--flights", type=int, default=1_000_000)
+        parser.add_argument("--airports", type=int, default=500)
+        parser.add_argument("--routes", type=int, default=5_000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        with transaction.atomic():
+            cities = self.seed(rng, options)
+            self.stdout.write("Running ANALYZE...")
+            self.analyze()
+
+            timings = {"icontains join": [], "airport id resolution": []}
+            for _ in range(options["repeat"]):
+                source, destination = rng.sample(cities, 2)
+                for name, build in (
+                    ("icontains join", self.legacy_queryset),
+                    ("airport id resolution", self.indexed_queryset),
+                ):
+                    started = time.perf_counter()
+                    list(build(source, destination)[: options["page_size"]])
+                    timings[name].append((time.perf_counter() - started) * 1000)
+
+            for name, samples in timings.items():
+                self.stdout.write(
+                    f"{name:>24}: median {statistics.median(samples):8.2f} ms, "
+                    f"max {max(samples):8.2f} ms"
+                )
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def legacy_queryset(source, destination):
+        return (
+            Flight.objects.select_related(
+                "route", "route__source", "route__destination", "airplane"
+            )
+            .annotate(
+                tickets_count=(
+                    F("airplane__rows") * F("airplane__seats_in_row")
+                    - Count("tickets")
+                )
+            )
+            .filter(
+                route__source__closest_big_city__icontains=source,
+                route__destination__closest_big_city__icontains=destination,
+            )
+            .order_by("departure_date", "id")
+            .distinct()
+        )
+
+    @staticmethod
+    def indexed_queryset(source, destination):
+        return (
+            Flight.objects.select_related(
+                "route", "route__source", "route__destination", "airplane"
+            )
+            .filter(
+                route__source_id__in=Airport.ids_by_city(source),
+                route__destination_id__in=Airport.ids_by_city(destination),
+            )
+            .order_by("departure_date", "id")
+        )
+
+    def seed(self, rng, options):
+        self.stdout.write(f"Seeding {options['flights']} flights...")
+        airports = Airport.objects.bulk_create(
+            Airport(name=f"Airport {i}", closest_big_city=f"Bench City {i}")
+            for i in range(options["airports"])
+        )
+        routes = Route.objects.bulk_create(
+            Route(
+                source=source,
+                destination=destination,
+                distance=rng.randint(200, 9000),
+            )
+            for source, destination in (
+                rng.sample(airports, 2) for _ in range(options["routes"])
+            )
+        )
+        airplane_type = AirplaneType.objects.create(name="Benchmark type")
+        airplanes = Airplane.objects.bulk_create(
+            Airplane(
+                name=f"Benchmark {i}",
+                rows=30,
+                seats_in_row=6,
+                airplane_type=airplane_type,
+            )
+            for i in range(50)
+        )
+
+        start = timezone.now()
+        batch_size = 10_000
+        for offset in range(0, options["flights"], batch_size):
+            flights = []
+            for _ in range(min(batch_size, options["flights"] - offset)):
+                departure = start + timedelta(minutes=rng.randint(0, 525_600))
+                flights.append(
+                    Flight(
+                        route=rng.choice(routes),
+                        airplane=rng.choice(airplanes),
+                        departure_date=departure,
+                        arrival_date=departure + timedelta(hours=3),
+                    )
+                )
+            Flight.objects.bulk_create(flights)
+
+        return [airport.closest_big_city for airport in airports]
+
+    @staticmethod
+    def analyze():
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
@@ -0,0 +1,91 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+QUERY = "SELECT 1"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the per-request cost of getting a database connection: a "
+        "new connection per request (CONN_MAX_AGE=0), a persistent one with "
+        "and without the health check, and a psycopg pool checkout when "
+        "psycopg_pool is installed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--queries", type=int, default=3, help="Per request.")
+
+    def handle(self, *args, **options):
+        params = connection.get_connection_params()
+        params.pop("pool", None)
+        database = connection.Database
+
+        def run(request):
+            timings = []
+            for _ in range(options["requests"]):
+                started = time.perf_counter()
+                request()
+                timings.append((time.perf_counter() - started) * 1000)
+            return timings
+
+        def queries(raw):
+            with raw.cursor() as cursor:
+                for _ in range(options["queries"]):
+                    cursor.execute(QUERY)
+                    cursor.fetchall()
+
+        def new_connection():
+            raw = database.connect(**params)
+            try:
+                queries(raw)
+            finally:
+                raw.close()
+
+        persistent = database.connect(**params)
+        persistent.autocommit = True
+
+        def health_checked():
+            # What CONN_HEALTH_CHECKS adds at the start of each request.
+            with persistent.cursor() as cursor:
+                cursor.execute(QUERY)
+            queries(persistent)
+
+        results = {
+            "new connection": run(new_connection),
+            "persistent": run(lambda: queries(persistent)),
+            "persistent + check": run(health_checked),
+        }
+        persistent.close()
+
+        try:
+            from psycopg_pool import ConnectionPool
+        except ImportError:
+            self.stdout.write("psycopg_pool not installed; skipping the pool.")
+        else:
+            with ConnectionPool(
+                kwargs=params,
+                min_size=1,
+                max_size=1,
+                check=ConnectionPool.check_connection,
+            ) as pool:
+
+                def pooled():
+                    with pool.connection() as raw:
+                        queries(raw)
+
+                results["pool (pre-ping)"] = run(pooled)
+
+        baseline = statistics.median(results["persistent"])
+        self.stdout.write(
+            f"{'strategy':<22}{'p50 ms':>9}{'p95 ms':>9}{'overhead ms':>13}"
+        )
+        for name, timings in results.items():
+            quantiles = statistics.quantiles(timings, n=100, method="inclusive")
+            self.stdout.write(
+                f"{name:<22}{quantiles[49]:>9.3f}{quantiles[94]:>9.3f}"
+                f"{quantiles[49] - baseline:>13.3f}"
+            )
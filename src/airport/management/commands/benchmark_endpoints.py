@@ -0,0 +1,351 @@
+import json
+import platform
+import random
+import statistics
+import time
+from datetime import timedelta
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from airport.models import Airport, Flight
+
+AIRPORT_URL = "/api/airports/"
+USER_URL = "/api/users/"
+
+# Scenario name and its share of --requests. Every route in airport/urls.py
+# and user/urls.py is driven by at least one scenario.
+SCENARIOS = (
+    ("api_root", 0.2),
+    ("airport_list", 0.5),
+    ("route_list", 0.5),
+    ("airplane_type_list", 0.2),
+    ("airplane_type_retrieve", 0.2),
+    ("airplane_list", 0.2),
+    ("crew_list", 0.2),
+    ("flight_list", 1),
+    ("flight_search", 2),
+    ("flight_retrieve", 2),
+    ("flight_hold", 0.5),
+    ("flight_export", 0.05),
+    ("flight_manifest", 0.2),
+    ("itinerary_search", 1),
+    ("order_list", 1),
+    ("order_create", 1),
+    ("order_export", 0.05),
+    ("user_register", 0.2),
+    ("user_login", 0.5),
+    ("token_refresh", 0.2),
+    ("token_verify", 0.2),
+    ("user_me", 0.5),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive every airport and user endpoint in-process against a dataset "
+        "seeded by generate_dataset (or one generated earlier with the same "
+        "--seed) and report p50/p95/p99 latency, throughput and SQL queries "
+        "per request. All rows written by the run are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Requests for a scenario of weight 1.",
+        )
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--flights", type=int, default=5_000)
+        parser.add_argument("--fill", type=float, default=0.6)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=[name for name, _ in SCENARIOS],
+            help="Run only these scenarios (repeatable).",
+        )
+        parser.add_argument("--output", help="Write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        scenarios = [
+            (name, weight)
+            for name, weight in SCENARIOS
+            if not options["scenario"] or name in options["scenario"]
+        ]
+
+        # Same environment as the test runner: DEBUG off (so the debug
+        # toolbar stays out of the timings), locmem email, testserver host.
+        setup_test_environment(debug=False)
+        try:
+            with transaction.atomic():
+                results = self.run(scenarios, options)
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+
+        self.report(results)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(
+                    {
+                        "created_at": timezone.now().isoformat(),
+                        "python": platform.python_version(),
+                        "django": django.get_version(),
+                        "database": connection.vendor,
+                        "options": {
+                            key: options[key]
+                            for key in ("requests", "warmup", "flights", "fill", "seed")
+                        },
+                        "results": results,
+                    },
+                    file,
+                    indent=2,
+                )
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def run(self, scenarios, options):
+        # Reuse a dataset generated earlier with the same seed, if any.
+        if not Airport.objects.filter(name__startswith=f"gen{options['seed']}-"):
+            call_command(
+                "generate_dataset",
+                flights=options["flights"],
+                fill=options["fill"],
+                seed=options["seed"],
+                stdout=self.stdout,
+            )
+        self.prepare(options["seed"])
+
+        results = []
+        for name, weight in scenarios:
+            build = getattr(self, f"request_{name}")
+            count = max(2, round(options["requests"] * weight))
+            for _ in range(options["warmup"]):
+                self.send(build())
+
+            timings = []
+            queries = []
+            errors = 0
+            started = time.perf_counter()
+            for _ in range(count):
+                timing, query_count, ok = self.send(build())
+                timings.append(timing)
+                queries.append(query_count)
+                errors += not ok
+            elapsed = time.perf_counter() - started
+
+            # Cut points 1..99, so quantiles[p - 1] is the p-th percentile.
+            quantiles = statistics.quantiles(timings, n=100, method="inclusive")
+            results.append(
+                {
+                    "scenario": name,
+                    "requests": count,
+                    "errors": errors,
+                    "p50_ms": round(quantiles[49], 3),
+                    "p95_ms": round(quantiles[94], 3),
+                    "p99_ms": round(quantiles[98], 3),
+                    "throughput_rps": round(count / elapsed, 1),
+                    "queries_avg": round(statistics.mean(queries), 2),
+                    "queries_max": max(queries),
+                }
+            )
+        return results
+
+    def send(self, request):
+        method, path, data, token = request
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        kwargs = {"content_type": "application/json"} if method == "post" else {}
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(self.client, method)(
+                path, data, headers=headers, **kwargs
+            )
+            if response.streaming:
+                b"".join(response.streaming_content)
+            timing = (time.perf_counter() - started) * 1000
+        return timing, len(queries), response.status_code < 400
+
+    def prepare(self, seed):
+        """Load ids, cities, tokens and free seats the scenarios draw from."""
+        User = get_user_model()
+        self.client = Client()
+        self.password = f"gen{seed}"
+        self.emails = list(
+            User.objects.filter(email__startswith=f"gen{seed}-")
+            .order_by("id")
+            .values_list("email", flat=True)[:100]
+        )
+        if not self.emails:
+            raise CommandError("The seeded dataset has no users.")
+
+        users = User.objects.filter(email__in=self.emails[:20])
+        self.tokens = [RefreshToken.for_user(user) for user in users]
+        staff = User.objects.create_user(
+            f"gen{seed}-benchmark-staff@example.com", self.password, is_staff=True
+        )
+        self.staff_token = str(RefreshToken.for_user(staff).access_token)
+        self.registered = 0
+
+        self.cities = list(
+            Airport.objects.values_list("closest_big_city", flat=True).distinct()
+        )
+        self.airplane_type_ids = list(
+            Flight.objects.values_list(
+                "airplane__airplane_type_id", flat=True
+            ).distinct()
+        )
+        self.flights = list(
+            Flight.objects.select_related("airplane").filter(
+                departure_date__gte=timezone.now() - timedelta(days=1)
+            )
+        )
+        if not self.flights:
+            raise CommandError("The seeded dataset has no upcoming flights.")
+        self.free_seats = {}
+
+    def token(self):
+        return str(self.rng.choice(self.tokens).access_token)
+
+    def flight(self):
+        return self.rng.choice(self.flights)
+
+    def take_seats(self, count):
+        """Pop ``count`` free ``(row, seat)`` pairs of one random flight."""
+        for _ in range(100):
+            flight = self.flight()
+            if flight.id not in self.free_seats:
+                seat_map = int.from_bytes(flight.seat_map, "little")
+                free = [
+                    divmod(index, flight.airplane.seats_in_row)
+                    for index in range(flight.airplane.capacity)
+                    if not seat_map >> index & 1
+                ]
+                self.rng.shuffle(free)
+                self.free_seats[flight.id] = free
+            free = self.free_seats[flight.id]
+            if len(free) >= count:
+                return flight, [
+                    {"row": row + 1, "seat": seat + 1}
+                    for row, seat in (free.pop() for _ in range(count))
+                ]
+        raise CommandError("No flight with enough free seats left.")
+
+    def request_api_root(self):
+        return "get", AIRPORT_URL, None, self.token()
+
+    def request_airport_list(self):
+        return "get", f"{AIRPORT_URL}airports/", None, self.token()
+
+    def request_route_list(self):
+        return "get", f"{AIRPORT_URL}routes/", None, self.token()
+
+    def request_airplane_type_list(self):
+        return "get", f"{AIRPORT_URL}airplane-types/", None, self.token()
+
+    def request_airplane_type_retrieve(self):
+        airplane_type = self.rng.choice(self.airplane_type_ids)
+        return (
+            "get",
+            f"{AIRPORT_URL}airplane-types/{airplane_type}/",
+            None,
+            self.token(),
+        )
+
+    def request_airplane_list(self):
+        return "get", f"{AIRPORT_URL}airplanes/", None, self.token()
+
+    def request_crew_list(self):
+        return "get", f"{AIRPORT_URL}crews/", None, self.token()
+
+    def request_flight_list(self):
+        return "get", f"{AIRPORT_URL}flights/", None, self.token()
+
+    def request_flight_search(self):
+        # Partial city names, as typed into a search box.
+        params = {"source": self.rng.choice(self.cities)[:4]}
+        if self.rng.random() < 0.7:
+            params["destination"] = self.rng.choice(self.cities)[:4]
+        return "get", f"{AIRPORT_URL}flights/", params, self.token()
+
+    def request_flight_retrieve(self):
+        return "get", f"{AIRPORT_URL}flights/{self.flight().id}/", None, self.token()
+
+    def request_flight_hold(self):
+        flight, seats = self.take_seats(self.rng.randint(1, 4))
+        path = f"{AIRPORT_URL}flights/{flight.id}/holds/"
+        return "post", path, {"seats": seats}, self.token()
+
+    def request_flight_export(self):
+        return "get", f"{AIRPORT_URL}flights/export/", None, self.staff_token
+
+    def request_flight_manifest(self):
+        path = f"{AIRPORT_URL}flights/{self.flight().id}/manifest/"
+        return "get", path, None, self.staff_token
+
+    def request_itinerary_search(self):
+        params = {
+            "source": self.rng.choice(self.cities),
+            "destination": self.rng.choice(self.cities),
+            "date": self.flight().departure_date.date(),
+        }
+        return "get", f"{AIRPORT_URL}itineraries/", params, self.token()
+
+    def request_order_list(self):
+        return "get", f"{AIRPORT_URL}orders/", None, self.token()
+
+    def request_order_create(self):
+        flight, seats = self.take_seats(self.rng.randint(1, 10))
+        tickets = [{"flight": flight.id, **seat} for seat in seats]
+        return "post", f"{AIRPORT_URL}orders/", {"tickets": tickets}, self.token()
+
+    def request_order_export(self):
+        return "get", f"{AIRPORT_URL}orders/export/", None, self.staff_token
+
+    def request_user_register(self):
+        self.registered += 1
+        data = {
+            "email": f"benchmark-{self.registered}@example.com",
+            "password": "benchmark",
+        }
+        return "post", f"{USER_URL}register/", data, None
+
+    def request_user_login(self):
+        data = {"email": self.rng.choice(self.emails), "password": self.password}
+        return "post", f"{USER_URL}login/", data, None
+
+    def request_token_refresh(self):
+        data = {"refresh": str(self.rng.choice(self.tokens))}
+        return "post", f"{USER_URL}token/refresh/", data, None
+
+    def request_token_verify(self):
+        return "post", f"{USER_URL}token/verify/", {"token": self.token()}, None
+
+    def request_user_me(self):
+        return "get", f"{USER_URL}me/", None, self.token()
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'scenario':<24}{'reqs':>6}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'p99 ms':>9}{'req/s':>9}{'queries':>9}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['scenario']:<24}{result['requests']:>6}"
+                f"{result['errors']:>5}{result['p50_ms']:>9.2f}"
+                f"{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+                f"{result['throughput_rps']:>9.1f}{result['queries_avg']:>9.1f}"
+            )
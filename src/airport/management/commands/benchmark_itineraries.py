@@ -0,0 +1,81 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from airport.itineraries import DAY, ConnectionIndex
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the connection scan itinerary engine on a synthetic "
+        "hub-and-spoke network held in memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--airports", type=int, default=5_000)
+        parser.add_argument("--hubs", type=int, default=50)
+        parser.add_argument("--flights", type=int, default=1_000_000)
+        parser.add_argument("--days", type=int, default=30)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--min-connection", type=int, default=45 * 60)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        airports = range(1, options["airports"] + 1)
+        hubs = airports[: options["hubs"]]
+
+        started = time.perf_counter()
+        rows = []
+        for flight_id in range(1, options["flights"] + 1):
+            # Half hub-to-hub trunk flights, half spokes to or from a hub.
+            if flight_id % 2:
+                source, destination = rng.sample(hubs, 2)
+            else:
+                source, destination = rng.choice(hubs), rng.choice(airports)
+                if rng.random() < 0.5:
+                    source, destination = destination, source
+                if source == destination:
+                    continue
+            departure = rng.randrange(options["days"] * DAY)
+            rows.append(
+                (
+                    flight_id,
+                    source,
+                    destination,
+                    departure,
+                    departure + rng.randint(45 * 60, 10 * 60 * 60),
+                )
+            )
+        index = ConnectionIndex(rows)
+        self.stdout.write(
+            f"Built index of {len(index)} connections in "
+            f"{time.perf_counter() - started:.1f} s"
+        )
+
+        timings = []
+        found = 0
+        for _ in range(options["queries"]):
+            source, destination = rng.sample(airports, 2)
+            day = rng.randrange(options["days"] - 2) * DAY
+            started = time.perf_counter()
+            journey = index.earliest_arrival(
+                {source},
+                {destination},
+                day,
+                day + DAY - 1,
+                options["min_connection"],
+                2 * DAY,
+            )
+            timings.append((time.perf_counter() - started) * 1000)
+            found += journey is not None
+
+        timings.sort()
+        self.stdout.write(
+            f"{options['queries']} queries, {found} with a journey: "
+            f"median {statistics.median(timings):.2f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms, "
+            f"max {timings[-1]:.2f} ms"
+        )
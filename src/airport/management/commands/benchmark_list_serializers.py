@@ -0,0 +1,105 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from airport.fast_serializers import FlightListRowSerializer, RouteListRowSerializer
+from airport.models import Airplane, AirplaneType, Airport, Flight, Route
+from airport.serializers import FlightListSerializer, RouteListSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-row cost of the DRF list serializers with the .values() "
+        "row serializers. All rows are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options["rows"])
+
+            flights = Flight.objects.select_related(
+                "route__source", "route__destination", "airplane"
+            ).order_by("departure_date", "id")
+            routes = Route.objects.select_related("source", "destination").order_by(
+                "id"
+            )
+            self.compare(
+                "flights",
+                lambda: FlightListSerializer(flights.all(), many=True).data,
+                lambda: [
+                    FlightListRowSerializer.to_representation(row)
+                    for row in FlightListRowSerializer.values(flights.all())
+                ],
+                options,
+            )
+            self.compare(
+                "routes",
+                lambda: RouteListSerializer(routes.all(), many=True).data,
+                lambda: [
+                    RouteListRowSerializer.to_representation(row)
+                    for row in RouteListRowSerializer.values(routes.all())
+                ],
+                options,
+            )
+
+            transaction.set_rollback(True)
+
+    def compare(self, name, serialize, serialize_rows, options):
+        renderer = JSONRenderer()
+        if renderer.render(serialize()) != renderer.render(serialize_rows()):
+            raise CommandError(f"Row serializer output differs for {name}.")
+
+        results = {}
+        for label, build in (("serializer", serialize), ("rows", serialize_rows)):
+            best = float("inf")
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                renderer.render(build())
+                best = min(best, time.perf_counter() - started)
+            results[label] = best
+
+        per_row = {
+            label: seconds / options["rows"] * 1_000_000
+            for label, seconds in results.items()
+        }
+        self.stdout.write(
+            f"{name}: serializer {per_row['serializer']:.1f} us/row, "
+            f"rows {per_row['rows']:.1f} us/row, "
+            f"speedup x{results['serializer'] / results['rows']:.1f}"
+        )
+
+    @staticmethod
+    def seed(count):
+        airports = Airport.objects.bulk_create(
+            Airport(name=f"Airport {i}", closest_big_city=f"Bench City {i}")
+            for i in range(count + 1)
+        )
+        routes = Route.objects.bulk_create(
+            Route(source=source, destination=destination, distance=1000)
+            for source, destination in zip(airports, airports[1:])
+        )
+        airplane = Airplane.objects.create(
+            name="Benchmark",
+            rows=30,
+            seats_in_row=6,
+            airplane_type=AirplaneType.objects.create(name="Benchmark type"),
+        )
+        start = timezone.now()
+        Flight.objects.bulk_create(
+            Flight(
+                route=route,
+                airplane=airplane,
+                departure_date=start + timedelta(minutes=i),
+                arrival_date=start + timedelta(minutes=i + 120),
+                seat_map=bytes([i % 256]),
+            )
+            for i, route in enumerate(routes)
+        )
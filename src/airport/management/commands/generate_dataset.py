@@ -0,0 +1,331 @@
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from airport.analytics import refresh_load_factors
+from airport.caching import bump_version
+from airport.itineraries import reset_connection_index
+from airport.models import (
+    Airplane,
+    AirplaneType,
+    Airport,
+    Crew,
+    Flight,
+    Order,
+    Route,
+    Ticket,
+)
+
+# name, rows, seats_in_row, cruise speed in km/h
+AIRPLANE_TYPES = (
+    ("Embraer E190", 25, 4, 820),
+    ("Airbus A320", 30, 6, 830),
+    ("Boeing 737-800", 32, 6, 840),
+    ("Airbus A321", 36, 6, 830),
+    ("Boeing 787-9", 40, 9, 900),
+)
+SYLLABLES = (
+    "ka mi ro sa na li ber to va den mar por lin gra ve so tal ni co ze "
+    "bur ham ost ri an el dor fu ga"
+).split()
+FIRST_NAMES = (
+    "Anna Olena Maria Iryna Sofia Kateryna Daria Yulia Nina Vira "
+    "Andrii Oleh Taras Ivan Petro Mykola Dmytro Serhii Yurii Bohdan"
+).split()
+LAST_NAMES = (
+    "Shevchenko Kovalenko Bondarenko Tkachenko Kravchenko Oliinyk Melnyk "
+    "Boiko Koval Lysenko Marchenko Rudenko Savchenko Ponomarenko Moroz"
+).split()
+
+
+def distance_km(a, b):
+    """Great-circle distance between two ``(lat, lon)`` points in degrees."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return round(2 * 6371 * math.asin(math.sqrt(h)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a reproducible synthetic dataset for load testing: a "
+        "hub-and-spoke route network, airplanes, crew, scheduled flights and "
+        "tickets filled to a target ratio, all written with batched bulk "
+        "inserts. The same --seed always produces the same rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--airports", type=int, default=300)
+        parser.add_argument("--hubs", type=int, default=12)
+        parser.add_argument("--routes", type=int, default=2_000)
+        parser.add_argument("--airplanes", type=int, default=400)
+        parser.add_argument("--crew", type=int, default=2_000)
+        parser.add_argument("--flights", type=int, default=10_000)
+        parser.add_argument("--users", type=int, default=5_000)
+        parser.add_argument(
+            "--fill",
+            type=float,
+            default=0.6,
+            help="Average share of seats sold per flight, 0..1.",
+        )
+        parser.add_argument(
+            "--start",
+            type=datetime.fromisoformat,
+            default=datetime(2030, 1, 1),
+            help="First day of the schedule (ISO date).",
+        )
+        parser.add_argument("--days", type=int, default=90)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        if not 0 <= options["fill"] <= 1:
+            raise CommandError("--fill must be between 0 and 1.")
+        if not 2 <= options["hubs"] <= options["airports"]:
+            raise CommandError("--hubs must be between 2 and --airports.")
+        if options["fill"] and not options["users"]:
+            raise CommandError("--users must be positive to sell tickets.")
+
+        self.rng = random.Random(options["seed"])
+        self.options = options
+        self.batch_size = options["batch_size"]
+        self.prefix = f"gen{options['seed']}"
+
+        for step in ("airports", "routes", "airplanes", "crew", "users", "flights"):
+            started = time.perf_counter()
+            count = getattr(self, f"generate_{step}")()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{step}: {count} rows in {elapsed:.1f} s "
+                f"({count / max(elapsed, 1e-9):.0f} rows/s)"
+            )
+
+        for model in (Airport, Route, Airplane, AirplaneType, Crew):
+            bump_version(model)
+        reset_connection_index()
+        # Bulk inserts skip the signals that keep load factors current.
+        for _ in refresh_load_factors(self.batch_size):
+            pass
+
+    def city_name(self):
+        return "".join(
+            self.rng.choice(SYLLABLES) for _ in range(self.rng.randint(2, 3))
+        ).capitalize()
+
+    def generate_airports(self):
+        self.coordinates = []
+        airports = []
+        for i in range(self.options["airports"]):
+            city = self.city_name()
+            # Unique names keep reruns with another seed from colliding.
+            airports.append(
+                Airport(name=f"{self.prefix}-{i:05d}", closest_big_city=city)
+            )
+            self.coordinates.append(
+                (self.rng.uniform(35, 70), self.rng.uniform(-10, 45))
+            )
+        self.airports = [
+            airport.id
+            for airport in Airport.objects.bulk_create(
+                airports, batch_size=self.batch_size
+            )
+        ]
+        return len(self.airports)
+
+    def generate_routes(self):
+        """Hub pairs in both directions first, then spokes to random hubs."""
+        hubs = range(self.options["hubs"])
+        spokes = range(self.options["hubs"], len(self.airports))
+        pairs = [(a, b) for a in hubs for b in hubs if a != b]
+        seen = set(pairs)
+
+        limit = self.options["routes"]
+        attempts = 0
+        while len(pairs) < limit and spokes and attempts < limit * 10:
+            attempts += 1
+            spoke, hub = self.rng.choice(spokes), self.rng.choice(hubs)
+            for pair in ((spoke, hub), (hub, spoke)):
+                if pair not in seen:
+                    seen.add(pair)
+                    pairs.append(pair)
+        pairs = pairs[:limit]
+
+        routes = Route.objects.bulk_create(
+            (
+                Route(
+                    source_id=self.airports[a],
+                    destination_id=self.airports[b],
+                    distance=distance_km(self.coordinates[a], self.coordinates[b]),
+                )
+                for a, b in pairs
+            ),
+            batch_size=self.batch_size,
+        )
+        # Trunk routes between hubs are flown far more often than spokes.
+        self.routes = [(route.id, route.distance) for route in routes]
+        self.route_weights = [
+            5 if a < self.options["hubs"] and b < self.options["hubs"] else 1
+            for a, b in pairs
+        ]
+        return len(routes)
+
+    def generate_airplanes(self):
+        types = {
+            airplane_type.name: airplane_type.id
+            for airplane_type in AirplaneType.objects.filter(
+                name__in=[name for name, *_ in AIRPLANE_TYPES]
+            )
+        }
+        for airplane_type in AirplaneType.objects.bulk_create(
+            AirplaneType(name=name) for name, *_ in AIRPLANE_TYPES if name not in types
+        ):
+            types[airplane_type.name] = airplane_type.id
+
+        specs = [
+            self.rng.choice(AIRPLANE_TYPES) for _ in range(self.options["airplanes"])
+        ]
+        airplanes = Airplane.objects.bulk_create(
+            (
+                Airplane(
+                    name=f"{self.prefix}-{name}-{i:05d}",
+                    rows=rows,
+                    seats_in_row=seats_in_row,
+                    airplane_type_id=types[name],
+                )
+                for i, (name, rows, seats_in_row, _) in enumerate(specs)
+            ),
+            batch_size=self.batch_size,
+        )
+        self.airplanes = [
+            (airplane.id, airplane.rows, airplane.seats_in_row, speed)
+            for airplane, (*_, speed) in zip(airplanes, specs)
+        ]
+        return len(airplanes)
+
+    def generate_crew(self):
+        crew = Crew.objects.bulk_create(
+            (
+                Crew(
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                )
+                for _ in range(self.options["crew"])
+            ),
+            batch_size=self.batch_size,
+        )
+        self.crew = [member.id for member in crew]
+        return len(self.crew)
+
+    def generate_users(self):
+        password = make_password(self.prefix)
+        User = get_user_model()
+        users = User.objects.bulk_create(
+            (
+                User(email=f"{self.prefix}-{i}@example.com", password=password)
+                for i in range(self.options["users"])
+            ),
+            batch_size=self.batch_size,
+        )
+        self.users = [user.id for user in users]
+        return len(self.users)
+
+    def generate_flights(self):
+        """Create flights in batches, each with its orders and tickets.
+
+        Seat maps are built alongside the tickets, so no signal or
+        ``update_seat_maps`` pass is needed afterwards.
+        """
+        start = self.options["start"]
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=dt_timezone.utc)
+        slots = self.options["days"] * 24 * 12
+        Membership = Flight.crew.through
+
+        total = 0
+        remaining = self.options["flights"]
+        while remaining > 0:
+            size = min(remaining, self.batch_size)
+            remaining -= size
+
+            flights = []
+            seats = []
+            crews = []
+            for route_id, distance in self.rng.choices(
+                self.routes, weights=self.route_weights, k=size
+            ):
+                airplane_id, rows, seats_in_row, speed = self.rng.choice(self.airplanes)
+                # Departures on 5 minute slots, mostly between 06:00 and 23:00.
+                slot = self.rng.randrange(slots)
+                day, minutes = divmod(slot * 5, 24 * 60)
+                departure = start + timedelta(
+                    days=day, minutes=6 * 60 + minutes * 17 // 24
+                )
+                duration = timedelta(minutes=30 + round(distance / speed * 60))
+
+                capacity = rows * seats_in_row
+                fill = min(1.0, max(0.0, self.rng.gauss(self.options["fill"], 0.15)))
+                taken = sorted(self.rng.sample(range(capacity), round(capacity * fill)))
+                seat_map = bytearray(-(-capacity // 8))
+                for index in taken:
+                    seat_map[index // 8] |= 1 << index % 8
+
+                flights.append(
+                    Flight(
+                        route_id=route_id,
+                        airplane_id=airplane_id,
+                        departure_date=departure,
+                        arrival_date=departure + duration,
+                        seat_map=bytes(seat_map),
+                    )
+                )
+                seats.append([divmod(index, seats_in_row) for index in taken])
+                crews.append(self.rng.sample(self.crew, min(4, len(self.crew))))
+
+            with transaction.atomic():
+                Flight.objects.bulk_create(flights, batch_size=self.batch_size)
+                Membership.objects.bulk_create(
+                    (
+                        Membership(flight_id=flight.id, crew_id=crew_id)
+                        for flight, crew_ids in zip(flights, crews)
+                        for crew_id in crew_ids
+                    ),
+                    batch_size=self.batch_size,
+                )
+                total += size + self.generate_tickets(flights, seats)
+        return total
+
+    def generate_tickets(self, flights, seats):
+        """Split each flight's sold seats into orders of 1-4 tickets."""
+        groups = []
+        for flight, flight_seats in zip(flights, seats):
+            i = 0
+            while i < len(flight_seats):
+                size = self.rng.randint(1, 4)
+                groups.append((flight.id, flight_seats[i : i + size]))
+                i += size
+        if not groups:
+            return 0
+
+        orders = Order.objects.bulk_create(
+            (Order(user_id=self.rng.choice(self.users)) for _ in groups),
+            batch_size=self.batch_size,
+        )
+        tickets = Ticket.objects.bulk_create(
+            (
+                Ticket(
+                    flight_id=flight_id, order_id=order.id, row=row + 1, seat=seat + 1
+                )
+                for order, (flight_id, group) in zip(orders, groups)
+                for row, seat in group
+            ),
+            batch_size=self.batch_size,
+        )
+        return len(orders) + len(tickets)
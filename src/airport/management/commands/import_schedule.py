@@ -0,0 +1,308 @@
+import csv
+import json
+import time
+from datetime import timezone as dt_timezone
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from airport.analytics import refresh_flights
+from airport.caching import bump_version
+from airport.itineraries import reset_connection_index
+from airport.models import Airplane, AirplaneType, Airport, Crew, Flight, Route
+
+COLUMNS = {
+    "airports": ("name", "closest_big_city"),
+    "routes": (
+        "source",
+        "source_city",
+        "destination",
+        "destination_city",
+        "distance",
+    ),
+    "airplanes": ("name", "rows", "seats_in_row", "airplane_type"),
+    "crew": ("first_name", "last_name"),
+    "flights": (
+        "source",
+        "source_city",
+        "destination",
+        "destination_city",
+        "airplane",
+        "departure_date",
+        "arrival_date",
+        "crew",
+    ),
+}
+
+
+INTEGER_COLUMNS = {"distance", "rows", "seats_in_row"}
+DATETIME_COLUMNS = {"departure_date", "arrival_date"}
+
+
+def read_rows(path: Path, columns):
+    """Yield dict rows from a CSV or NDJSON (``.ndjson``/``.jsonl``) file.
+
+    Rows are checked against ``columns`` and their integer and datetime
+    values parsed; errors name the file and line.
+    """
+    with path.open(newline="", encoding="utf-8") as file:
+        if path.suffix in (".ndjson", ".jsonl"):
+            records = (
+                (number, line) for number, line in enumerate(file, 1) if line.strip()
+            )
+        else:
+            reader = csv.DictReader(file)
+            missing = [c for c in columns if c not in (reader.fieldnames or ())]
+            if missing:
+                raise CommandError(f"{path}: missing columns {', '.join(missing)}.")
+            records = ((reader.line_num, row) for row in reader)
+
+        for number, record in records:
+            try:
+                row = parse_row(record, columns)
+            except (TypeError, ValueError) as error:
+                raise CommandError(f"{path}, line {number}: {error}") from error
+            yield row
+
+
+def parse_row(record, columns) -> dict:
+    """``record`` is a CSV row dict or an NDJSON line."""
+    if isinstance(record, str):
+        record = json.loads(record)
+    if not isinstance(record, dict):
+        raise ValueError("expected a JSON object.")
+    missing = [column for column in columns if record.get(column) is None]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}.")
+
+    row = {column: record[column] for column in columns}
+    for column in INTEGER_COLUMNS.intersection(row):
+        row[column] = int(row[column])
+    for column in DATETIME_COLUMNS.intersection(row):
+        row[column] = parse_date(row[column])
+    return row
+
+
+def parse_date(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"invalid datetime {value!r}.")
+    if timezone.is_naive(parsed):
+        parsed = parsed.replace(tzinfo=dt_timezone.utc)
+    return parsed
+
+
+def natural_key_map(pairs) -> dict:
+    """``{key: id}`` from ``(key, id)`` pairs; keys shared by several rows
+    map to ``None`` so they can't silently resolve to one of them."""
+    mapping = {}
+    for key, object_id in pairs:
+        mapping[key] = None if key in mapping else object_id
+    return mapping
+
+
+def resolve(mapping: dict, key, label: str) -> int:
+    if key not in mapping:
+        raise CommandError(f"Unknown {label} {key!r}.")
+    if mapping[key] is None:
+        raise CommandError(f"Ambiguous {label} {key!r}: several rows share it.")
+    return mapping[key]
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import airports, routes, airplanes, crew and flights from CSV or "
+        "NDJSON files. Foreign keys are resolved through natural keys: airports "
+        "by name and city, airplanes by name, airplane types by name and crew "
+        "by full name; flight crew is a ';'-separated list of full names. "
+        "Airplane and crew names shared by several rows are rejected."
+    )
+
+    def add_arguments(self, parser):
+        for model in COLUMNS:
+            parser.add_argument(f"--{model}", type=Path, metavar="FILE")
+        parser.add_argument("--batch-size", type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        if not any(options[model] for model in COLUMNS):
+            raise CommandError(
+                "Pass at least one of: " + ", ".join(f"--{m}" for m in COLUMNS)
+            )
+
+        self.batch_size = options["batch_size"]
+        self.airports = {
+            (name, city): airport_id
+            for airport_id, name, city in Airport.objects.values_list(
+                "id", "name", "closest_big_city"
+            )
+        }
+
+        # Dependency order: each step only needs maps filled by earlier ones.
+        for model in COLUMNS:
+            if options[model]:
+                started = time.perf_counter()
+                count = getattr(self, f"import_{model}")(
+                    read_rows(options[model], COLUMNS[model])
+                )
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{model}: {count} rows in {elapsed:.1f} s "
+                    f"({count / max(elapsed, 1e-9):.0f} rows/s)"
+                )
+
+        for model in (Airport, Route, Airplane, AirplaneType, Crew):
+            bump_version(model)
+        if options["flights"]:
+            # Bulk inserts send no signals; other processes pick the flights
+            # up on their next ITINERARY_INDEX_TTL rebuild.
+            reset_connection_index()
+
+    def airport_id(self, row, prefix):
+        key = (row[prefix], row[f"{prefix}_city"])
+        try:
+            return self.airports[key]
+        except KeyError:
+            raise CommandError(f"Unknown airport {key[0]} ({key[1]}).")
+
+    def import_airports(self, rows):
+        count = 0
+        for batch in batched(rows, self.batch_size):
+            Airport.objects.bulk_create(
+                (
+                    Airport(name=row["name"], closest_big_city=row["closest_big_city"])
+                    for row in batch
+                    if (row["name"], row["closest_big_city"]) not in self.airports
+                ),
+                ignore_conflicts=True,
+            )
+            count += len(batch)
+
+        self.airports = {
+            (name, city): airport_id
+            for airport_id, name, city in Airport.objects.values_list(
+                "id", "name", "closest_big_city"
+            )
+        }
+        return count
+
+    def import_routes(self, rows):
+        existing = set(Route.objects.values_list("source_id", "destination_id"))
+        count = 0
+        for batch in batched(rows, self.batch_size):
+            routes = []
+            for row in batch:
+                key = (
+                    self.airport_id(row, "source"),
+                    self.airport_id(row, "destination"),
+                )
+                if key not in existing:
+                    existing.add(key)
+                    routes.append(
+                        Route(
+                            source_id=key[0],
+                            destination_id=key[1],
+                            distance=row["distance"],
+                        )
+                    )
+            Route.objects.bulk_create(routes)
+            count += len(batch)
+        return count
+
+    def import_airplanes(self, rows):
+        airplane_types = dict(AirplaneType.objects.values_list("name", "id"))
+        count = 0
+        for batch in batched(rows, self.batch_size):
+            missing = {row["airplane_type"] for row in batch} - airplane_types.keys()
+            for airplane_type in AirplaneType.objects.bulk_create(
+                AirplaneType(name=name) for name in missing
+            ):
+                airplane_types[airplane_type.name] = airplane_type.id
+
+            Airplane.objects.bulk_create(
+                Airplane(
+                    name=row["name"],
+                    rows=row["rows"],
+                    seats_in_row=row["seats_in_row"],
+                    airplane_type_id=airplane_types[row["airplane_type"]],
+                )
+                for row in batch
+            )
+            count += len(batch)
+        return count
+
+    def import_crew(self, rows):
+        count = 0
+        for batch in batched(rows, self.batch_size):
+            Crew.objects.bulk_create(
+                Crew(first_name=row["first_name"], last_name=row["last_name"])
+                for row in batch
+            )
+            count += len(batch)
+        return count
+
+    def import_flights(self, rows):
+        routes = {
+            (source_id, destination_id): route_id
+            for route_id, source_id, destination_id in Route.objects.values_list(
+                "id", "source_id", "destination_id"
+            )
+        }
+        airplanes = natural_key_map(Airplane.objects.values_list("name", "id"))
+        crew = natural_key_map(
+            (f"{first_name} {last_name}", crew_id)
+            for crew_id, first_name, last_name in Crew.objects.values_list(
+                "id", "first_name", "last_name"
+            )
+        )
+        Membership = Flight.crew.through
+
+        count = 0
+        for batch in batched(rows, self.batch_size):
+            flights = []
+            flight_crew = []
+            for row in batch:
+                key = (
+                    self.airport_id(row, "source"),
+                    self.airport_id(row, "destination"),
+                )
+                if key not in routes:
+                    raise CommandError(f"Unknown route in {row}.")
+                flights.append(
+                    Flight(
+                        route_id=routes[key],
+                        airplane_id=resolve(airplanes, row["airplane"], "airplane"),
+                        departure_date=row["departure_date"],
+                        arrival_date=row["arrival_date"],
+                    )
+                )
+                flight_crew.append(self.crew_ids(row["crew"], crew))
+
+            with transaction.atomic():
+                Flight.objects.bulk_create(flights)
+                Membership.objects.bulk_create(
+                    Membership(flight_id=flight.id, crew_id=crew_id)
+                    for flight, crew_ids in zip(flights, flight_crew)
+                    for crew_id in crew_ids
+                )
+                refresh_flights([flight.id for flight in flights])
+            count += len(batch)
+        return count
+
+    @staticmethod
+    def crew_ids(names, crew):
+        """``names`` is a ';'-separated string (CSV) or a list (NDJSON)."""
+        if isinstance(names, str):
+            names = names.split(";")
+        return [
+            resolve(crew, name.strip(), "crew member") for name in names if name.strip()
+        ]
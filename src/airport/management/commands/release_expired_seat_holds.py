@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from airport.models import SeatHold
+
+
+class Command(BaseCommand):
+    help = "Delete expired seat holds in index-ordered batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        released = 0
+        while True:
+            ids = list(
+                SeatHold.objects.expired()
+                .order_by("expires_at")
+                .values_list("id", flat=True)[: options["batch_size"]]
+            )
+            if not ids:
+                break
+            released += SeatHold.objects.filter(id__in=ids).delete()[0]
+
+        self.stdout.write(f"Released {released} expired seat holds.")
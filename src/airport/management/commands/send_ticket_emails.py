@@ -0,0 +1,133 @@
+import select
+import time
+from datetime import timedelta
+
+from django.core import mail
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from airport.models import Ticket, TicketEmail
+from airport.notifications import TICKET_EMAIL_CHANNEL, build_ticket_email
+
+# Claimed jobs are hidden from other workers for this long.
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+class Command(BaseCommand):
+    help = "Render ticket PDFs and deliver queued ticket emails."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--max-attempts", type=int, default=5)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5.0,
+            help="Seconds to wait for new jobs when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Drain the queue and exit."
+        )
+
+    def handle(self, *args, **options):
+        listening = connection.vendor == "postgresql" and not options["once"]
+        if listening:
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {TICKET_EMAIL_CHANNEL}")
+
+        while True:
+            jobs = self.claim(options["batch_size"])
+            if jobs:
+                self.deliver(jobs, options["max_attempts"])
+                continue
+
+            if options["once"]:
+                return
+            self.wait(options["interval"], listening)
+
+    @staticmethod
+    def claim(batch_size: int) -> list[TicketEmail]:
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                TicketEmail.objects.select_for_update(skip_locked=True)
+                .filter(status=TicketEmail.Status.PENDING, next_attempt_at__lte=now)
+                .order_by("next_attempt_at")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            TicketEmail.objects.filter(id__in=ids).update(
+                next_attempt_at=now + CLAIM_LEASE
+            )
+
+        tickets = Ticket.objects.select_related(
+            "flight__airplane", "flight__route__source", "flight__route__destination"
+        )
+        return list(
+            TicketEmail.objects.filter(id__in=ids).prefetch_related(
+                Prefetch("order__tickets", queryset=tickets)
+            )
+        )
+
+    def deliver(self, jobs: list[TicketEmail], max_attempts: int) -> None:
+        smtp = mail.get_connection()
+        try:
+            smtp.open()
+        except Exception as error:
+            # SMTP is down or rejects us: back off every claimed job instead
+            # of leaving them leased and crashing the worker.
+            for job in jobs:
+                self.retry_later(job, error, max_attempts)
+            self.stderr.write(f"Could not connect to the mail server: {error!r}")
+            return
+
+        sent = 0
+        with smtp:
+            for job in jobs:
+                try:
+                    email_message = build_ticket_email(job.order, job.recipient)
+                    email_message.connection = smtp
+                    email_message.send()
+                except Exception as error:
+                    self.retry_later(job, error, max_attempts)
+                else:
+                    job.status = TicketEmail.Status.SENT
+                    job.sent_at = timezone.now()
+                    job.attempts += 1
+                    job.last_error = ""
+                    job.save(
+                        update_fields=["status", "sent_at", "attempts", "last_error"]
+                    )
+                    sent += 1
+
+        self.stdout.write(f"Sent {sent} of {len(jobs)} ticket emails.")
+
+    @staticmethod
+    def retry_later(job: TicketEmail, error: Exception, max_attempts: int) -> None:
+        job.attempts += 1
+        job.last_error = repr(error)
+        if job.attempts >= max_attempts:
+            job.status = TicketEmail.Status.FAILED
+        else:
+            job.next_attempt_at = timezone.now() + timedelta(
+                seconds=30 * 2 ** (job.attempts - 1)
+            )
+        job.save(
+            update_fields=["status", "attempts", "last_error", "next_attempt_at"]
+        )
+
+    @staticmethod
+    def wait(interval: float, listening: bool) -> None:
+        if not listening:
+            time.sleep(interval)
+            return
+
+        raw_connection = connection.connection
+        if not hasattr(raw_connection, "poll"):
+            # psycopg 3, installed for DB_POOL.
+            for _ in raw_connection.notifies(timeout=interval, stop_after=1):
+                pass
+        elif select.select([raw_connection], [], [], interval)[0]:
+            raw_connection.poll()
+            raw_connection.notifies.clear()
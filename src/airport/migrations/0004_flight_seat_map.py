@@ -0,0 +1,50 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:44
+
+from django.db import migrations, models
+
+
+def fill_seat_maps(apps, schema_editor):
+    Flight = apps.get_model("airport", "Flight")
+    Ticket = apps.get_model("airport", "Ticket")
+
+    flights = {
+        flight.id: flight
+        for flight in Flight.objects.select_related("airplane").filter(
+            tickets__isnull=False
+        ).distinct()
+    }
+    seat_maps = {
+        flight_id: bytearray(
+            -(-flight.airplane.rows * flight.airplane.seats_in_row // 8)
+        )
+        for flight_id, flight in flights.items()
+    }
+    for flight_id, row, seat in Ticket.objects.values_list(
+        "flight_id", "row", "seat"
+    ).iterator():
+        seats_in_row = flights[flight_id].airplane.seats_in_row
+        byte, bit = divmod((row - 1) * seats_in_row + seat - 1, 8)
+        seat_map = seat_maps[flight_id]
+        if byte >= len(seat_map):
+            seat_map.extend(bytes(byte + 1 - len(seat_map)))
+        seat_map[byte] |= 1 << bit
+
+    for flight_id, flight in flights.items():
+        flight.seat_map = bytes(seat_maps[flight_id])
+    Flight.objects.bulk_update(flights.values(), ["seat_map"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0003_flight_crew"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="flight",
+            name="seat_map",
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.RunPython(fill_seat_maps, migrations.RunPython.noop),
+    ]
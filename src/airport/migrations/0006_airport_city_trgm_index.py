@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-18 02:46
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0005_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.AddIndex(
+            model_name="airport",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper(
+                        django.db.models.functions.comparison.Cast(
+                            "closest_big_city", models.TextField()
+                        )
+                    ),
+                    name="gin_trgm_ops",
+                ),
+                name="airport_city_trgm_idx",
+            ),
+        ),
+    ]
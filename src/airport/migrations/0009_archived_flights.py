@@ -0,0 +1,76 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0008_seathold"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedFlight",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("departure_date", models.DateTimeField()),
+                ("arrival_date", models.DateTimeField()),
+                ("seat_map", models.BinaryField(default=bytes)),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "airplane",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_flights",
+                        to="airport.airplane",
+                    ),
+                ),
+                (
+                    "crew",
+                    models.ManyToManyField(
+                        related_name="archived_flights", to="airport.crew"
+                    ),
+                ),
+                (
+                    "route",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_flights",
+                        to="airport.route",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ArchivedTicket",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("row", models.IntegerField()),
+                ("seat", models.IntegerField()),
+                (
+                    "flight",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tickets",
+                        to="airport.archivedflight",
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_tickets",
+                        to="airport.order",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="archivedflight",
+            index=models.Index(
+                fields=["departure_date"], name="archived_flight_dep_idx"
+            ),
+        ),
+    ]
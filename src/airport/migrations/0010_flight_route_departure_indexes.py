@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0009_archived_flights"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="flight",
+            index=models.Index(
+                fields=["route", "departure_date"], name="flight_route_departure_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="route",
+            index=models.Index(
+                fields=["source", "destination"], name="route_source_destination_idx"
+            ),
+        ),
+    ]
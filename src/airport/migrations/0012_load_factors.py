@@ -0,0 +1,80 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0011_order_created_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FlightLoad",
+            fields=[
+                (
+                    "flight_id",
+                    models.BigIntegerField(primary_key=True, serialize=False),
+                ),
+                ("date", models.DateField()),
+                ("capacity", models.IntegerField()),
+                ("sold", models.IntegerField(default=0)),
+                (
+                    "route",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="flight_loads",
+                        to="airport.route",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["date", "flight_id"], name="flight_load_date_idx"
+                    ),
+                    models.Index(
+                        fields=["route", "date"], name="flight_load_route_date_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="RouteDailyLoad",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("flights", models.IntegerField(default=0)),
+                ("capacity", models.IntegerField(default=0)),
+                ("sold", models.IntegerField(default=0)),
+                ("seat_km", models.BigIntegerField(default=0)),
+                ("passenger_km", models.BigIntegerField(default=0)),
+                (
+                    "route",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_loads",
+                        to="airport.route",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["date", "id"], name="route_daily_load_date_idx"
+                    )
+                ],
+                "unique_together": {("route", "date")},
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.1.6 on 2026-10-18 03:27
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("airport", "0012_load_factors"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Schedule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "weekdays",
+                    models.CharField(
+                        max_length=7,
+                        validators=[
+                            django.core.validators.RegexValidator(
+                                "^[1-7]+$", "Use ISO weekday digits 1-7, e.g. 135."
+                            )
+                        ],
+                    ),
+                ),
+                ("departure_time", models.TimeField()),
+                ("duration", models.DurationField()),
+                ("season_start", models.DateField()),
+                ("season_end", models.DateField()),
+                (
+                    "airplane",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="schedules",
+                        to="airport.airplane",
+                    ),
+                ),
+                (
+                    "crew",
+                    models.ManyToManyField(
+                        blank=True, related_name="schedules", to="airport.crew"
+                    ),
+                ),
+                (
+                    "route",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="schedules",
+                        to="airport.route",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="flight",
+            name="schedule",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="flights",
+                to="airport.schedule",
+            ),
+        ),
+    ]
@@ -1,5 +1,9 @@
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.core.validators import RegexValidator
+from django.db import models, transaction
+from django.db.models.functions import Cast, Upper
+from django.utils import timezone
 
 
 class Airport(models.Model):
@@ -9,8 +13,36 @@ class Airport(models.Model):
     def __str__(self):
         return f"{self.name} ({self.closest_big_city})"
 
+    @classmethod
+    def ids_by_city(cls, city: str) -> list[int]:
+        """Resolve a city search string to airport ids via the trigram index."""
+        return list(
+            cls.objects.filter(closest_big_city__icontains=city).values_list(
+                "id", flat=True
+            )
+        )
+
+    @classmethod
+    async def aids_by_city(cls, city: str) -> list[int]:
+        return [
+            airport_id
+            async for airport_id in cls.objects.filter(
+                closest_big_city__icontains=city
+            ).values_list("id", flat=True)
+        ]
+
     class Meta:
         unique_together = ["name", "closest_big_city"]
+        indexes = [
+            # Matches the UPPER(col::text) LIKE UPPER(...) that icontains emits.
+            GinIndex(
+                OpClass(
+                    Upper(Cast("closest_big_city", models.TextField())),
+                    name="gin_trgm_ops",
+                ),
+                name="airport_city_trgm_idx",
+            ),
+        ]
 
 
 class Route(models.Model):
@@ -25,6 +57,13 @@ class Route(models.Model):
     def __str__(self):
         return f"{self.source.closest_big_city} - {self.destination.closest_big_city}"
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["source", "destination"], name="route_source_destination_idx"
+            ),
+        ]
+
 
 class AirplaneType(models.Model):
     name = models.CharField(max_length=255, unique=True)
@@ -61,6 +100,36 @@ class Crew(models.Model):
         return self.full_name
 
 
+class Schedule(models.Model):
+    """A weekly pattern of flights over a season, expanded by
+    ``airport.schedules.expand_schedule``.
+
+    ``weekdays`` holds ISO weekday digits, e.g. "135" for Monday, Wednesday
+    and Friday; ``departure_time`` is in ``TIME_ZONE``.
+    """
+
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name="schedules")
+    airplane = models.ForeignKey(
+        Airplane, on_delete=models.CASCADE, related_name="schedules"
+    )
+    crew = models.ManyToManyField(Crew, related_name="schedules", blank=True)
+    weekdays = models.CharField(
+        max_length=7,
+        validators=[
+            RegexValidator(r"^[1-7]+$", "Use ISO weekday digits 1-7, e.g. 135.")
+        ],
+    )
+    departure_time = models.TimeField()
+    duration = models.DurationField()
+    season_start = models.DateField()
+    season_end = models.DateField()
+
+    def __str__(self):
+        return (
+            f"{self.route} on {self.weekdays} ({self.season_start} - {self.season_end})"
+        )
+
+
 class Flight(models.Model):
     route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name="flights")
     airplane = models.ForeignKey(
@@ -69,10 +138,112 @@ class Flight(models.Model):
     crew = models.ManyToManyField(Crew, related_name="flights")
     departure_date = models.DateTimeField()
     arrival_date = models.DateTimeField()
+    # One bit per seat, (row - 1) * seats_in_row + (seat - 1), LSB first.
+    seat_map = models.BinaryField(default=bytes, editable=False)
+    # Set on flights generated from a schedule, so re-expansion can diff them.
+    schedule = models.ForeignKey(
+        Schedule,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="flights",
+    )
 
     def __str__(self):
         return f"{self.airplane.name} ({self.route.source} - {self.route.destination})"
 
+    @staticmethod
+    def count_seats(seat_map) -> int:
+        return int.from_bytes(seat_map, "little").bit_count()
+
+    @property
+    def seats_taken(self) -> int:
+        return self.count_seats(self.seat_map)
+
+    @property
+    def tickets_available(self) -> int:
+        return self.airplane.capacity - self.seats_taken
+
+    def seat_index(self, row: int, seat: int) -> int:
+        return (row - 1) * self.airplane.seats_in_row + seat - 1
+
+    def is_seat_taken(self, row: int, seat: int) -> bool:
+        byte, bit = divmod(self.seat_index(row, seat), 8)
+        seat_map = bytes(self.seat_map)
+        return byte < len(seat_map) and bool(seat_map[byte] & 1 << bit)
+
+    def mark_seats(self, seats, taken: bool = True) -> None:
+        """Set or clear seat map bits for ``(row, seat)`` pairs, without saving."""
+        seat_map = bytearray(self.seat_map)
+        seat_map.extend(bytes(-(-self.airplane.capacity // 8) - len(seat_map)))
+
+        for row, seat in seats:
+            byte, bit = divmod(self.seat_index(row, seat), 8)
+            if byte >= len(seat_map):
+                seat_map.extend(bytes(byte + 1 - len(seat_map)))
+            if taken:
+                seat_map[byte] |= 1 << bit
+            else:
+                seat_map[byte] &= ~(1 << bit)
+
+        self.seat_map = bytes(seat_map)
+
+    @classmethod
+    def update_seat_maps(cls, tickets, taken: bool = True) -> None:
+        """Sync seat maps of the flights ``tickets`` belong to.
+
+        Flight rows are locked, so call it in the transaction that
+        creates or deletes the tickets.
+        """
+        seats_by_flight = {}
+        for ticket in tickets:
+            seats_by_flight.setdefault(ticket.flight_id, []).append(
+                (ticket.row, ticket.seat)
+            )
+
+        with transaction.atomic():
+            flights = list(
+                cls.objects.select_for_update(of=("self",))
+                .select_related("airplane")
+                .filter(id__in=seats_by_flight)
+                .order_by("id")
+            )
+            for flight in flights:
+                flight.mark_seats(seats_by_flight[flight.id], taken=taken)
+            cls.objects.bulk_update(flights, ["seat_map"])
+
+    @classmethod
+    def rebuild_seat_maps(cls, flight_ids) -> None:
+        """Recompute seat maps of ``flight_ids`` from their tickets."""
+        with transaction.atomic():
+            flights = list(
+                cls.objects.select_for_update(of=("self",))
+                .select_related("airplane")
+                .filter(id__in=flight_ids)
+                .order_by("id")
+            )
+            seats = {}
+            for flight_id, row, seat in Ticket.objects.filter(
+                flight_id__in=flight_ids
+            ).values_list("flight_id", "row", "seat"):
+                seats.setdefault(flight_id, []).append((row, seat))
+
+            for flight in flights:
+                flight.seat_map = b""
+                flight.mark_seats(seats.get(flight.id, ()))
+            cls.objects.bulk_update(flights, ["seat_map"])
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["departure_date", "id"], name="flight_departure_id_idx"
+            ),
+            # "From X to Y on date D": route ids, then a departure range each.
+            models.Index(
+                fields=["route", "departure_date"], name="flight_route_departure_idx"
+            ),
+        ]
+
 
 class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
@@ -80,6 +251,47 @@ class Order(models.Model):
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="orders"
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "created_at", "id"], name="order_user_created_id_idx"
+            ),
+            # Admin date hierarchy.
+            models.Index(fields=["created_at"], name="order_created_idx"),
+        ]
+
+
+class TicketEmail(models.Model):
+    """Outbox row for the ticket PDF mail, written with the order."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        SENT = "sent"
+        FAILED = "failed"
+
+    order = models.OneToOneField(
+        Order, on_delete=models.CASCADE, related_name="ticket_email"
+    )
+    recipient = models.EmailField()
+    status = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"], name="ticket_email_queue_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Order {self.order_id} -> {self.recipient} ({self.status})"
+
 
 class Ticket(models.Model):
     row = models.IntegerField()
@@ -92,3 +304,145 @@ class Ticket(models.Model):
 
     class Meta:
         unique_together = ["flight", "row", "seat"]
+
+
+class SeatHoldQuerySet(models.QuerySet):
+    def for_seats(self, seats):
+        """Filter by ``(flight_id, row, seat)`` triples."""
+        lookup = models.Q(pk__in=[])
+        for flight_id, row, seat in seats:
+            lookup |= models.Q(flight_id=flight_id, row=row, seat=seat)
+        return self.filter(lookup)
+
+    def active(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+
+class SeatHold(models.Model):
+    """Temporary reservation of a seat until ``expires_at``."""
+
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name="holds")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="seat_holds"
+    )
+    row = models.IntegerField()
+    seat = models.IntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = SeatHoldQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.flight_id} (row:{self.row} seat:{self.seat}) until {self.expires_at}"
+
+    class Meta:
+        unique_together = ["flight", "row", "seat"]
+
+
+class ArchivedFlight(models.Model):
+    """A departed ``Flight`` moved out of the hot tables by ``archive_flights``.
+
+    Keeps the original id, so archived tickets and order history stay
+    addressable by the ids clients already know.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    route = models.ForeignKey(
+        Route, on_delete=models.CASCADE, related_name="archived_flights"
+    )
+    airplane = models.ForeignKey(
+        Airplane, on_delete=models.CASCADE, related_name="archived_flights"
+    )
+    crew = models.ManyToManyField(Crew, related_name="archived_flights")
+    departure_date = models.DateTimeField()
+    arrival_date = models.DateTimeField()
+    seat_map = models.BinaryField(default=bytes, editable=False)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.airplane.name} ({self.route.source} - {self.route.destination})"
+
+    @property
+    def tickets_available(self) -> int:
+        return self.airplane.capacity - Flight.count_seats(self.seat_map)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["departure_date"], name="archived_flight_dep_idx"),
+        ]
+
+
+class ArchivedTicket(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    row = models.IntegerField()
+    seat = models.IntegerField()
+    flight = models.ForeignKey(
+        ArchivedFlight, on_delete=models.CASCADE, related_name="tickets"
+    )
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="archived_tickets"
+    )
+
+    def __str__(self):
+        return f"{str(self.flight)} (row:{self.row} seat:{self.seat})"
+
+
+class FlightLoad(models.Model):
+    """Sold seats of one flight, kept current by ``airport.analytics``.
+
+    ``flight_id`` is not a foreign key so rows outlive archived flights.
+    """
+
+    flight_id = models.BigIntegerField(primary_key=True)
+    route = models.ForeignKey(
+        Route, on_delete=models.CASCADE, related_name="flight_loads"
+    )
+    date = models.DateField()
+    capacity = models.IntegerField()
+    sold = models.IntegerField(default=0)
+
+    @property
+    def load_factor(self) -> float:
+        return self.sold / self.capacity if self.capacity else 0.0
+
+    def __str__(self):
+        return f"Flight {self.flight_id}: {self.sold}/{self.capacity}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["date", "flight_id"], name="flight_load_date_idx"),
+            models.Index(fields=["route", "date"], name="flight_load_route_date_idx"),
+        ]
+
+
+class RouteDailyLoad(models.Model):
+    """Per route and departure day totals of ``FlightLoad``.
+
+    Seat and passenger kilometres are the usual revenue denominators
+    (ASK and RPK).
+    """
+
+    route = models.ForeignKey(
+        Route, on_delete=models.CASCADE, related_name="daily_loads"
+    )
+    date = models.DateField()
+    flights = models.IntegerField(default=0)
+    capacity = models.IntegerField(default=0)
+    sold = models.IntegerField(default=0)
+    seat_km = models.BigIntegerField(default=0)
+    passenger_km = models.BigIntegerField(default=0)
+
+    @property
+    def load_factor(self) -> float:
+        return self.sold / self.capacity if self.capacity else 0.0
+
+    def __str__(self):
+        return f"{self.route_id} on {self.date}: {self.sold}/{self.capacity}"
+
+    class Meta:
+        unique_together = ["route", "date"]
+        indexes = [
+            models.Index(fields=["date", "id"], name="route_daily_load_date_idx"),
+        ]
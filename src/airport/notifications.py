@@ -0,0 +1,46 @@
+from django.core.mail import EmailMessage
+from django.db import connection
+from fpdf import FPDF
+
+from airport.models import Order
+
+TICKET_EMAIL_CHANNEL = "ticket_emails"
+
+
+def render_ticket_pdf(order: Order) -> bytes:
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+    pdf.cell(200, 10, txt="Your Ticket", ln=True, align="C")
+
+    for ticket in order.tickets.all():
+        pdf.cell(200, 10, txt=f"Flight: {ticket.flight}", ln=True, align="L")
+        pdf.cell(
+            200,
+            10,
+            txt=f"Row: {ticket.row}, Seat: {ticket.seat}",
+            ln=True,
+            align="L",
+        )
+
+    return pdf.output(dest="S").encode("latin-1")
+
+
+def build_ticket_email(order: Order, recipient: str) -> EmailMessage:
+    email_message = EmailMessage(
+        subject="Your Ticket Confirmation",
+        body="Your ticket is attached.",
+        from_email="no-reply@example.com",
+        to=[recipient],
+    )
+    email_message.attach(
+        f"ticket_order_{order.id}.pdf", render_ticket_pdf(order), "application/pdf"
+    )
+    return email_message
+
+
+def wake_ticket_email_workers() -> None:
+    """Wake idle ``send_ticket_emails`` workers instead of waiting for a poll."""
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(f"NOTIFY {TICKET_EMAIL_CHANNEL}")
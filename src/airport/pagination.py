@@ -0,0 +1,155 @@
+import json
+import operator
+from functools import reduce
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+
+
+class KeysetPagination(CursorPagination):
+    """DRF cursor pagination whose page query can also be awaited.
+
+    ``paginate_queryset`` is split into building the page query and reading
+    its rows, so ``apaginate_queryset`` can fetch them with the async ORM.
+    Cursors hold the full ``ordering`` key of the row they continue from,
+    not DRF's first-field position plus offset, so any number of rows may
+    share a date. ``ordering`` must therefore end in a unique field.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([row async for row in queryset])
+
+    def get_page_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            self.reverse, self.current_position = False, None
+        else:
+            self.reverse = self.cursor.reverse
+            self.current_position = self.decode_position(self.cursor.position)
+
+        # Cursor pagination always enforces an ordering.
+        if self.reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if self.current_position is not None:
+            queryset = queryset.filter(self.keyset_filter(self.current_position))
+
+        # Always fetch an extra item to tell whether a page follows this one.
+        return queryset[: self.page_size + 1]
+
+    def keyset_filter(self, position):
+        """Rows strictly after ``position`` in the query's ordering.
+
+        Lexicographic ``(a, b) > (x, y)`` as ``a >= x AND (a > x OR (a = x
+        AND b > y))``; the leading bound keeps it an index range scan.
+        """
+        lookups = []
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip("-")
+            after = "lt" if field.startswith("-") != self.reverse else "gt"
+            lookups.append(Q(**equal, **{f"{name}__{after}": value}))
+            equal[name] = value
+
+        first = self.ordering[0]
+        after = "lte" if first.startswith("-") != self.reverse else "gte"
+        return Q(**{f"{first.lstrip('-')}__{after}": position[0]}) & reduce(
+            operator.or_, lookups
+        )
+
+    def decode_position(self, position):
+        try:
+            values = json.loads(position)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def encode_position(self, row) -> str:
+        return json.dumps(
+            [self._get_position_from_instance(row, [field]) for field in self.ordering]
+        )
+
+    def set_page(self, results):
+        self.page = list(results[: self.page_size])
+        has_following = len(results) > len(self.page)
+        if self.reverse:
+            # The query ordering was reversed, so reverse the items back.
+            self.page.reverse()
+            self.has_next = self.current_position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.current_position is not None
+
+        # Display page controls in the browsable API if there is more
+        # than one page.
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(
+            Cursor(
+                offset=0, reverse=False, position=self.encode_position(self.page[-1])
+            )
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=self.encode_position(self.page[0]))
+        )
+
+
+class FlightPagination(KeysetPagination):
+    ordering = ("departure_date", "id")
+
+
+class OrderPagination(KeysetPagination):
+    ordering = ("-created_at", "-id")
+
+
+class RoutePagination(KeysetPagination):
+    ordering = ("id",)
+
+
+class FlightLoadPagination(KeysetPagination):
+    ordering = ("date", "flight_id")
+
+
+class RouteDailyLoadPagination(KeysetPagination):
+    ordering = ("date", "id")
+
+
+class DailyLoadPagination(KeysetPagination):
+    ordering = ("date",)
@@ -0,0 +1,138 @@
+"""Read-replica routing for safe requests, with read-your-writes pinning.
+
+Viewsets opt in with ``ReplicaReadMixin``; their safe-method requests read
+from a healthy replica in ``settings.REPLICA_DATABASES`` unless the user
+wrote recently (``pin_to_primary``). Everything else uses ``default``.
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+_replica = ContextVar("replica", default=None)
+_lock = threading.Lock()
+_healthy = (float("-inf"), [])
+
+LAG_SQL = (
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+def _pin_key(user_id) -> str:
+    return f"primary-pin:{user_id}"
+
+
+def pin_to_primary(user) -> None:
+    """Send ``user``'s reads to the primary for ``REPLICA_PIN_SECONDS``."""
+    caches["default"].set(_pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user) -> bool:
+    return bool(user.is_authenticated and caches["default"].get(_pin_key(user.pk)))
+
+
+def replica_lag(alias) -> float:
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        return float(cursor.fetchone()[0] or 0)
+
+
+def healthy_replicas() -> list[str]:
+    """Replicas within ``REPLICA_MAX_LAG_SECONDS``, rechecked periodically."""
+    global _healthy
+
+    checked_at, replicas = _healthy
+    if time.monotonic() - checked_at < settings.REPLICA_LAG_CHECK_SECONDS:
+        return replicas
+
+    with _lock:
+        checked_at, replicas = _healthy
+        if time.monotonic() - checked_at < settings.REPLICA_LAG_CHECK_SECONDS:
+            return replicas
+
+        replicas = []
+        for alias in settings.REPLICA_DATABASES:
+            try:
+                lag = replica_lag(alias)
+            except DatabaseError:
+                continue
+            if lag <= settings.REPLICA_MAX_LAG_SECONDS:
+                replicas.append(alias)
+        _healthy = (time.monotonic(), replicas)
+        return replicas
+
+
+def reset_replica_health() -> None:
+    global _healthy
+    _healthy = (float("-inf"), [])
+
+
+def choose_replica(user):
+    """A healthy replica for ``user``'s reads, or None for the primary."""
+    if not settings.REPLICA_DATABASES or is_pinned(user):
+        return None
+    replicas = healthy_replicas()
+    return random.choice(replicas) if replicas else None
+
+
+@contextmanager
+def reading_from(alias):
+    """Route reads in the block to ``alias`` (None means the default)."""
+    token = _replica.set(alias)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.REPLICA_DATABASES
+
+
+class ReplicaReadMixin:
+    """Serve safe-method requests from a replica once the user is known."""
+
+    _replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            self._replica_token = _replica.set(choose_replica(request.user))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self._replica_token is not None:
+            if response.streaming and not response.is_async:
+                # Exports run their queries while the server iterates the body.
+                response.streaming_content = _streamed_from(
+                    _replica.get(), response.streaming_content
+                )
+            _replica.reset(self._replica_token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def _streamed_from(alias, content):
+    with reading_from(alias):
+        yield from content
@@ -0,0 +1,167 @@
+"""Expansion of weekly ``Schedule`` patterns into ``Flight`` rows.
+
+Departures are computed per weekday as a 7-day stride over the season,
+then diffed against the schedule's existing flights: only missing flights
+are bulk-inserted, with their crew links, and only flights no longer in
+the pattern are removed. Flights with sold tickets are never deleted or
+moved to another departure or route; when the pattern drops them they are
+detached from the schedule. Only departures still ahead are expanded:
+departed flights are left as they are, or may already have been moved out
+by ``archive_flights``, so they must not be recreated.
+"""
+
+from datetime import date, datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from airport import analytics
+from airport.archive import delete_rows
+from airport.itineraries import reset_connection_index
+from airport.models import Flight, SeatHold, Ticket
+
+BATCH_SIZE = 1_000
+
+
+def departures(schedule) -> list[datetime]:
+    """Aware departure datetimes of ``schedule`` over its season, sorted."""
+    start = schedule.season_start.toordinal()
+    end = schedule.season_end.toordinal()
+    first_weekday = schedule.season_start.isoweekday()
+
+    days = []
+    for weekday in {int(digit) for digit in schedule.weekdays}:
+        days.extend(range(start + (weekday - first_weekday) % 7, end + 1, 7))
+
+    return sorted(
+        timezone.make_aware(
+            datetime.combine(date.fromordinal(day), schedule.departure_time)
+        )
+        for day in days
+    )
+
+
+def delete_flights(flight_ids) -> None:
+    """Delete unsold flights in bulk, without the per-flight signals.
+
+    Their ``FlightLoad`` rows are left to ``analytics.refresh_flights``.
+    """
+    for model, field in (
+        (SeatHold, "flight"),
+        (Flight.crew.through, "flight"),
+        (Flight, "id"),
+    ):
+        delete_rows(model, field, flight_ids)
+
+
+def expand_schedule(schedule, remove: bool = False) -> dict:
+    """Bring the schedule's flights still to depart in line with its pattern.
+
+    Flights at departures still in the pattern are kept, and updated in
+    place when the schedule's route, airplane or duration changed. Callers
+    must check that sold seats exist on a new airplane. With ``remove``,
+    the pattern is treated as empty, as before deleting the schedule.
+    Returns counts of created, updated, deleted, detached and kept flights.
+    """
+    now = timezone.now()
+    wanted = set() if remove else {d for d in departures(schedule) if d > now}
+    crew_ids = set() if remove else set(schedule.crew.values_list("id", flat=True))
+
+    with transaction.atomic():
+        existing = list(
+            Flight.objects.select_for_update()
+            .filter(schedule=schedule, departure_date__gt=now)
+            .values_list(
+                "id", "route_id", "airplane_id", "departure_date", "arrival_date"
+            )
+        )
+        sold = set(
+            Ticket.objects.filter(flight_id__in=[row[0] for row in existing])
+            .values_list("flight_id", flat=True)
+            .distinct()
+        )
+
+        kept, stale, updated = {}, [], []
+        for flight_id, route_id, airplane_id, departure, arrival in existing:
+            if departure not in wanted or departure in kept:
+                stale.append(flight_id)
+            elif route_id != schedule.route_id and flight_id in sold:
+                # Its passengers booked the old route: keep it as a one-off.
+                stale.append(flight_id)
+            else:
+                kept[departure] = flight_id
+                if (route_id, airplane_id, arrival - departure) != (
+                    schedule.route_id,
+                    schedule.airplane_id,
+                    schedule.duration,
+                ):
+                    updated.append(
+                        Flight(
+                            id=flight_id,
+                            route_id=schedule.route_id,
+                            airplane_id=schedule.airplane_id,
+                            arrival_date=departure + schedule.duration,
+                        )
+                    )
+
+        detached = [flight_id for flight_id in stale if flight_id in sold]
+        deleted = [flight_id for flight_id in stale if flight_id not in sold]
+        Flight.objects.filter(id__in=detached).update(schedule=None)
+        delete_flights(deleted)
+
+        # Kept flights follow the schedule's airplane and duration in place;
+        # sold seats keep their rows and seats, laid out for the new airplane.
+        Flight.objects.bulk_update(
+            updated, ["route", "airplane", "arrival_date"], batch_size=BATCH_SIZE
+        )
+        resized = [flight.id for flight in updated if flight.id in sold]
+        if resized:
+            Flight.rebuild_seat_maps(resized)
+
+        created = Flight.objects.bulk_create(
+            (
+                Flight(
+                    route_id=schedule.route_id,
+                    airplane_id=schedule.airplane_id,
+                    departure_date=departure,
+                    arrival_date=departure + schedule.duration,
+                    schedule=schedule,
+                )
+                for departure in sorted(wanted - kept.keys())
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+        # Crew: drop links the schedule no longer has, add the missing ones.
+        Membership = Flight.crew.through
+        flight_ids = list(kept.values()) + [flight.id for flight in created]
+        Membership.objects.filter(flight_id__in=kept.values()).exclude(
+            crew_id__in=crew_ids
+        ).delete()
+        linked = set(
+            Membership.objects.filter(flight_id__in=kept.values()).values_list(
+                "flight_id", "crew_id"
+            )
+        )
+        Membership.objects.bulk_create(
+            (
+                Membership(flight_id=flight_id, crew_id=crew_id)
+                for flight_id in flight_ids
+                for crew_id in crew_ids
+                if (flight_id, crew_id) not in linked
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+        changed = [flight.id for flight in created + updated] + deleted
+        if changed:
+            analytics.refresh_flights(changed)
+            transaction.on_commit(reset_connection_index)
+
+    return {
+        "created": len(created),
+        "updated": len(updated),
+        "deleted": len(deleted),
+        "detached": len(detached),
+        "kept": len(kept),
+    }
@@ -1,17 +1,35 @@
-from django.db import transaction
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from rest_framework import serializers
 
+from airport import analytics
 from airport.models import (
+    ArchivedFlight,
+    ArchivedTicket,
+    FlightLoad,
+    RouteDailyLoad,
     Airport,
     Route,
     AirplaneType,
     Airplane,
     Crew,
+    Schedule,
     Flight,
     Order,
     Ticket,
+    SeatHold,
+)
+from airport.validators import (
+    validate_ticket_seat,
+    validate_ticket_seats,
+    validate_seat_hold,
+    validate_airplane_change,
+    validate_route,
+    validate_season,
 )
-from airport.validators import validate_ticket_seat, validate_route
 
 
 class AirportSerializer(serializers.ModelSerializer):
@@ -32,7 +50,8 @@ class RouteSerializer(serializers.ModelSerializer):
 
 
 class RouteListSerializer(RouteSerializer):
-    destination = source = serializers.StringRelatedField()
+    source = serializers.StringRelatedField()
+    destination = serializers.StringRelatedField()
 
 
 class AirplaneSerializer(serializers.ModelSerializer):
@@ -72,6 +91,42 @@ class FlightSerializer(serializers.ModelSerializer):
         model = Flight
         fields = ("id", "route", "airplane", "crew", "departure_date", "arrival_date")
 
+    def validate(self, data):
+        airplane = data.get("airplane")
+        if self.instance is not None and airplane is not None:
+            if airplane.id != self.instance.airplane_id:
+                validate_airplane_change(self.instance.tickets.all(), airplane)
+        return data
+
+
+class ScheduleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Schedule
+        fields = (
+            "id",
+            "route",
+            "airplane",
+            "crew",
+            "weekdays",
+            "departure_time",
+            "duration",
+            "season_start",
+            "season_end",
+        )
+
+    def validate(self, data):
+        validate_season(
+            data.get("season_start", getattr(self.instance, "season_start", None)),
+            data.get("season_end", getattr(self.instance, "season_end", None)),
+        )
+        airplane = data.get("airplane")
+        if self.instance is not None and airplane is not None:
+            if airplane.id != self.instance.airplane_id:
+                validate_airplane_change(
+                    Ticket.objects.filter(flight__schedule=self.instance), airplane
+                )
+        return data
+
 
 class FlightListSerializer(FlightSerializer):
     route = serializers.SerializerMethodField()
@@ -132,20 +187,196 @@ class FlightRetrieveSerializer(FlightListSerializer):
         )
 
 
+class OrderTicketSerializer(TicketSerializer):
+    """Ticket input whose seats are validated in bulk by ``OrderSerializer``."""
+
+    flight = serializers.IntegerField(source="flight_id")
+
+    class Meta(TicketSerializer.Meta):
+        validators = []
+
+    def validate(self, data):
+        return data
+
+
 class OrderSerializer(serializers.ModelSerializer):
-    tickets = TicketSerializer(many=True)
+    tickets = OrderTicketSerializer(many=True, allow_empty=False)
 
     class Meta:
         model = Order
         fields = ("id", "tickets", "created_at")
 
+    def validate_tickets(self, tickets):
+        validate_ticket_seats(tickets, user=self.context["request"].user)
+        return tickets
+
     def create(self, validated_data):
         with transaction.atomic():
             tickets_data = validated_data.pop("tickets")
             order = Order.objects.create(**validated_data)
             tickets = [Ticket(order=order, **ticket_data) for ticket_data in tickets_data]
             Ticket.objects.bulk_create(tickets)
+            Flight.update_seat_maps(tickets)
+            analytics.record_sales(tickets)
+            SeatHold.objects.for_seats(
+                (ticket.flight_id, ticket.row, ticket.seat) for ticket in tickets
+            ).filter(user=order.user).delete()
+
+        return order
 
 
 class OrderListSerializer(OrderSerializer):
     tickets = TicketListSerializer(many=True, read_only=True)
+
+
+class ArchivedFlightListSerializer(FlightListSerializer):
+    class Meta(FlightListSerializer.Meta):
+        model = ArchivedFlight
+
+
+class ArchivedTicketListSerializer(serializers.ModelSerializer):
+    flight = ArchivedFlightListSerializer(read_only=True)
+
+    class Meta:
+        model = ArchivedTicket
+        fields = ("id", "row", "seat", "flight")
+
+
+class OrderHistorySerializer(OrderListSerializer):
+    archived_tickets = ArchivedTicketListSerializer(many=True, read_only=True)
+
+    class Meta(OrderListSerializer.Meta):
+        fields = OrderListSerializer.Meta.fields + ("archived_tickets",)
+
+
+class SeatSerializer(serializers.Serializer):
+    row = serializers.IntegerField()
+    seat = serializers.IntegerField()
+
+
+class SeatHoldSerializer(serializers.Serializer):
+    seats = SeatSerializer(many=True, allow_empty=False)
+    expires_at = serializers.DateTimeField(read_only=True)
+
+    def validate_seats(self, seats):
+        validate_seat_hold(seats, self.context["flight"])
+        return seats
+
+    def create(self, validated_data):
+        flight = self.context["flight"]
+        user = self.context["request"].user
+        seats = validated_data["seats"]
+        expires_at = timezone.now() + settings.SEAT_HOLD_TTL
+
+        with transaction.atomic():
+            holds = SeatHold.objects.for_seats(
+                (flight.id, seat["row"], seat["seat"]) for seat in seats
+            )
+            # Expired holds and the caller's own holds are replaced.
+            (holds.expired() | holds.filter(user=user)).delete()
+            try:
+                with transaction.atomic():
+                    SeatHold.objects.bulk_create(
+                        SeatHold(flight=flight, user=user, expires_at=expires_at, **seat)
+                        for seat in seats
+                    )
+            except IntegrityError:
+                raise serializers.ValidationError(
+                    {"seats": ["Some of these seats are held by another customer."]}
+                )
+
+        return {"seats": seats, "expires_at": expires_at}
+
+
+class FlightDepartureFilterSerializer(serializers.Serializer):
+    departure_after = serializers.DateTimeField(required=False)
+    departure_before = serializers.DateTimeField(required=False)
+    date = serializers.DateField(required=False)
+
+    def filter(self, queryset):
+        """Apply the filters as half-open ``departure_date`` ranges, which
+        stay index range scans, unlike ``departure_date__date``."""
+        data = self.validated_data
+        if "departure_after" in data:
+            queryset = queryset.filter(departure_date__gte=data["departure_after"])
+        if "departure_before" in data:
+            queryset = queryset.filter(departure_date__lt=data["departure_before"])
+        if "date" in data:
+            queryset = queryset.filter(
+                departure_date__gte=self.start_of_day(data["date"]),
+                departure_date__lt=self.start_of_day(data["date"] + timedelta(days=1)),
+            )
+        return queryset
+
+    @staticmethod
+    def start_of_day(day):
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class LoadFactorFilterSerializer(serializers.Serializer):
+    route = serializers.IntegerField(required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def filter(self, queryset):
+        data = self.validated_data
+        if "route" in data:
+            queryset = queryset.filter(route_id=data["route"])
+        if "date_from" in data:
+            queryset = queryset.filter(date__gte=data["date_from"])
+        if "date_to" in data:
+            queryset = queryset.filter(date__lte=data["date_to"])
+        return queryset
+
+
+class FlightLoadSerializer(serializers.ModelSerializer):
+    load_factor = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = FlightLoad
+        fields = ("flight_id", "route", "date", "capacity", "sold", "load_factor")
+
+
+class RouteDailyLoadSerializer(serializers.ModelSerializer):
+    load_factor = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = RouteDailyLoad
+        fields = (
+            "route",
+            "date",
+            "flights",
+            "capacity",
+            "sold",
+            "load_factor",
+            "seat_km",
+            "passenger_km",
+        )
+
+
+class DailyLoadSerializer(serializers.Serializer):
+    """Totals of every route for one day, from ``RouteDailyLoad`` aggregates."""
+
+    date = serializers.DateField()
+    flights = serializers.IntegerField()
+    capacity = serializers.IntegerField()
+    sold = serializers.IntegerField()
+    load_factor = serializers.SerializerMethodField()
+    seat_km = serializers.IntegerField()
+    passenger_km = serializers.IntegerField()
+
+    def get_load_factor(self, row) -> float:
+        return row["sold"] / row["capacity"] if row["capacity"] else 0.0
+
+
+class ItinerarySearchSerializer(serializers.Serializer):
+    source = serializers.CharField()
+    destination = serializers.CharField()
+    date = serializers.DateField()
+    limit = serializers.IntegerField(min_value=1, max_value=20, default=5)
+
+
+class ItinerarySerializer(serializers.Serializer):
+    departure_date = serializers.DateTimeField()
+    arrival_date = serializers.DateTimeField()
+    legs = FlightListSerializer(many=True)
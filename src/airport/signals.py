@@ -0,0 +1,121 @@
+import threading
+from functools import partial
+from weakref import WeakKeyDictionary
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from airport import analytics, itineraries
+from airport.caching import bump_version
+from airport.models import Airplane, AirplaneType, Airport, Crew, Flight, Route, Ticket
+
+# Tickets being deleted, per delete() origin, so seats are released once
+# per delete rather than once per ticket.
+_deleting = threading.local()
+
+
+def _pending_releases():
+    if not hasattr(_deleting, "tickets"):
+        _deleting.tickets = WeakKeyDictionary()
+    return _deleting.tickets
+
+
+@receiver(pre_save, sender=Ticket)
+def remember_ticket_flight(sender, instance, **kwargs):
+    # An edit may move the ticket to another flight, which frees its seat on
+    # the previous one.
+    instance.previous_flight_id = (
+        Ticket.objects.filter(pk=instance.pk)
+        .values_list("flight_id", flat=True)
+        .first()
+        if instance.pk is not None
+        else None
+    )
+
+
+@receiver(post_save, sender=Ticket)
+def occupy_ticket_seat(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        Flight.update_seat_maps([instance])
+        analytics.record_sales([instance])
+    else:
+        flight_ids = {instance.flight_id, instance.previous_flight_id} - {None}
+        Flight.rebuild_seat_maps(flight_ids)
+        analytics.refresh_flights(flight_ids)
+
+
+@receiver(pre_delete, sender=Ticket)
+def count_deleted_ticket(sender, instance, origin=None, **kwargs):
+    # A delete sends every pre_delete before the first post_delete, so the
+    # tickets counted here are all deleted when the last post_delete comes.
+    if origin is not None:
+        pending = _pending_releases().get(origin)
+        if pending is None or pending[1]:
+            # First ticket, or left over from a delete that failed half way.
+            pending = _pending_releases()[origin] = [0, []]
+        pending[0] += 1
+
+
+@receiver(post_delete, sender=Ticket)
+def release_ticket_seat(sender, instance, origin=None, **kwargs):
+    pending = _pending_releases().get(origin) if origin is not None else None
+    if pending is None:
+        tickets = [instance]
+    else:
+        expected, tickets = pending
+        tickets.append(instance)
+        if len(tickets) < expected:
+            return
+        del _pending_releases()[origin]
+
+    # Cascades from an order or flight update each flight once.
+    Flight.update_seat_maps(tickets, taken=False)
+    analytics.record_sales(tickets, sold=-1)
+
+
+@receiver(pre_save, sender=Flight)
+def remember_previous_flight(sender, instance, **kwargs):
+    # Seat map bits are laid out by the airplane's seats_in_row, and the
+    # itinerary index finds the flight by the departure it was indexed at.
+    instance.previous_airplane_id, instance.previous_departure = (
+        Flight.objects.filter(pk=instance.pk)
+        .values_list("airplane_id", "departure_date")
+        .first()
+        if instance.pk is not None
+        else None
+    ) or (None, None)
+
+
+@receiver(post_save, sender=Flight)
+def index_flight(sender, instance, created, raw, **kwargs):
+    if not raw:
+        itineraries.update_flight(instance, instance.previous_departure)
+        if created:
+            analytics.add_flight(instance)
+        else:
+            if instance.previous_airplane_id not in (None, instance.airplane_id):
+                Flight.rebuild_seat_maps([instance.id])
+            analytics.refresh_flights([instance.id])
+
+
+@receiver(post_delete, sender=Flight)
+def unindex_flight(sender, instance, **kwargs):
+    itineraries.remove_flight(instance.id, instance.departure_date)
+    analytics.refresh_flights([instance.id])
+
+
+@receiver(post_save, sender=Airport)
+@receiver(post_delete, sender=Airport)
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+@receiver(post_save, sender=AirplaneType)
+@receiver(post_delete, sender=AirplaneType)
+@receiver(post_save, sender=Airplane)
+@receiver(post_delete, sender=Airplane)
+@receiver(post_save, sender=Crew)
+@receiver(post_delete, sender=Crew)
+def bump_catalog_version(sender, using, **kwargs):
+    # After commit: a reader racing the write must not cache the old rows
+    # under the new version.
+    transaction.on_commit(partial(bump_version, sender), using=using)
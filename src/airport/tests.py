@@ -1,3 +1,1384 @@
-from django.test import TestCase
+import base64
+import json
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+from io import StringIO
+from pathlib import Path
+from datetime import date, datetime, timedelta, timezone
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from airport import async_views
+from airport import urls as airport_urls
+from airport.caching import CACHE_ALIAS
+from airport import exports, itineraries, replicas
+from airport.itineraries import (
+    ConnectionIndex,
+    get_connection_index,
+    reset_connection_index,
+)
+from airport.serializers import AirportSerializer, FlightDepartureFilterSerializer
+from airport.replicas import (
+    ReplicaRouter,
+    choose_replica,
+    reading_from,
+    reset_replica_health,
+)
+from airport.models import (
+    ArchivedFlight,
+    FlightLoad,
+    RouteDailyLoad,
+    Airport,
+    Route,
+    AirplaneType,
+    Airplane,
+    Crew,
+    Schedule,
+    Flight,
+    Order,
+    SeatHold,
+    Ticket,
+    TicketEmail,
+)
+
+AIRPORT_URL = "/api/airports/"
+FIRST_DEPARTURE = datetime(2030, 1, 1, 8, tzinfo=timezone.utc)
+
+
+def seed_dataset(user, flights=12, tickets_per_flight=4):
+    """Seed enough rows per endpoint that an N+1 shows up in query counts."""
+    airports = [
+        Airport.objects.create(name=f"Airport {i}", closest_big_city=f"City {i}")
+        for i in range(4)
+    ]
+    routes = [
+        Route.objects.create(source=source, destination=destination, distance=500)
+        for source, destination in zip(airports, airports[1:] + airports[:1])
+    ]
+    airplane_type = AirplaneType.objects.create(name="Narrow body")
+    airplanes = [
+        Airplane.objects.create(
+            name=f"Plane {i}", rows=20, seats_in_row=6, airplane_type=airplane_type
+        )
+        for i in range(3)
+    ]
+    crew = [
+        Crew.objects.create(first_name=f"First {i}", last_name=f"Last {i}")
+        for i in range(3)
+    ]
+
+    for i in range(flights):
+        departure = FIRST_DEPARTURE + timedelta(hours=3 * i)
+        flight = Flight.objects.create(
+            route=routes[i % len(routes)],
+            airplane=airplanes[i % len(airplanes)],
+            departure_date=departure,
+            arrival_date=departure + timedelta(hours=2),
+        )
+        flight.crew.set(crew)
+
+        order = Order.objects.create(user=user)
+        for seat in range(1, tickets_per_flight + 1):
+            Ticket.objects.create(flight=flight, order=order, row=1, seat=seat)
+
+
+class QueryBudgetTests(TestCase):
+    """Every router endpoint has a query budget independent of table sizes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("user@test.com", "pass12345")
+        cls.staff = get_user_model().objects.create_user(
+            "staff@test.com", "pass12345", is_staff=True
+        )
+        seed_dataset(cls.user)
+        cls.flight = Flight.objects.order_by("id").first()
+        cls.airplane_type = AirplaneType.objects.get()
+
+    def setUp(self):
+        caches[CACHE_ALIAS].clear()
+        reset_connection_index()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @contextmanager
+    def assertMaxQueries(self, budget):
+        with CaptureQueriesContext(connection) as queries:
+            yield
+        self.assertLessEqual(
+            len(queries),
+            budget,
+            "\n".join(query["sql"] for query in queries.captured_queries),
+        )
+
+    def get(self, path, budget, **params):
+        with self.assertMaxQueries(budget):
+            response = self.client.get(AIRPORT_URL + path, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def test_api_root(self):
+        self.get("", 0)
+
+    def test_airport_list(self):
+        self.get("airports/", 1)
+
+    def test_route_list(self):
+        self.get("routes/", 1)
+
+    def test_airplane_type_list(self):
+        self.get("airplane-types/", 1)
+
+    def test_airplane_type_retrieve(self):
+        self.get(f"airplane-types/{self.airplane_type.id}/", 2)
+
+    def test_airplane_list(self):
+        self.get("airplanes/", 1)
+
+    def test_crew_list(self):
+        self.get("crews/", 1)
+
+    def test_flight_list(self):
+        response = self.get("flights/", 2)
+        self.assertEqual(len(response.data["results"]), 12)
+
+    def test_flight_list_filtered(self):
+        self.get("flights/", 4, source="City 0", destination="City 1")
+
+    def test_flight_retrieve(self):
+        response = self.get(f"flights/{self.flight.id}/", 3)
+        self.assertEqual(len(response.data["taken_place"]), 4)
+
+    def test_flight_retrieve_seat_map(self):
+        path = f"flights/{self.flight.id}/"
+        response = self.get(path, 1, seats="rle")
+        self.assertEqual(response.data["taken_place"][:2], [[0, 4, 2], [6]])
+        self.assertEqual(len(response.data["taken_place"]), 20)
+
+        with self.assertMaxQueries(1):
+            response = self.client.get(
+                AIRPORT_URL + path, HTTP_ACCEPT="application/json; seats=bitmap"
+            )
+        bitmap = base64.b64decode(response.data["taken_place"])
+        self.assertEqual(bitmap, b"\x0f" + bytes(14))
+
+        response = self.client.get(AIRPORT_URL + path, {"seats": "png"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_itinerary_list(self):
+        response = self.get(
+            "itineraries/",
+            5,
+            source="City 0",
+            destination="City 2",
+            date=FIRST_DEPARTURE.date(),
+        )
+        self.assertEqual(len(response.data[0]["legs"]), 2)
+
+    def test_order_list(self):
+        response = self.get("orders/", 2)
+        self.assertEqual(len(response.data["results"]), 12)
+
+    def test_order_create(self):
+        tickets = [
+            {"flight": flight_id, "row": 5, "seat": seat}
+            for flight_id in Flight.objects.values_list("id", flat=True)[:3]
+            for seat in range(1, 5)
+        ]
+        # Load factors: one read and one UPDATE per summary table.
+        with self.assertMaxQueries(18):
+            response = self.client.post(
+                AIRPORT_URL + "orders/", {"tickets": tickets}, format="json"
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_seat_hold_create(self):
+        seats = [{"row": 6, "seat": seat} for seat in range(1, 7)]
+        with self.assertMaxQueries(8):
+            response = self.client.post(
+                f"{AIRPORT_URL}flights/{self.flight.id}/holds/",
+                {"seats": seats},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_flight_create(self):
+        self.client.force_authenticate(self.staff)
+        payload = {
+            "route": self.flight.route_id,
+            "airplane": self.flight.airplane_id,
+            "crew": list(self.flight.crew.values_list("id", flat=True)),
+            "departure_date": FIRST_DEPARTURE,
+            "arrival_date": FIRST_DEPARTURE + timedelta(hours=2),
+        }
+        # Load factors: the flight's row, then its route day created if
+        # missing and incremented.
+        with self.assertMaxQueries(12):
+            response = self.client.post(
+                AIRPORT_URL + "flights/", payload, format="json"
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def test_flight_airplane_change_rebuilds_seat_map(self):
+        self.client.force_authenticate(self.staff)
+        Ticket.objects.create(
+            flight=self.flight, order=Order.objects.first(), row=2, seat=1
+        )
+        path = f"{AIRPORT_URL}flights/{self.flight.id}/"
+
+        narrow = Airplane.objects.create(
+            name="Narrow", rows=30, seats_in_row=3, airplane_type=self.airplane_type
+        )
+        response = self.client.patch(path, {"airplane": narrow.id})
+        self.assertEqual(response.status_code, 400)
+
+        regional = Airplane.objects.create(
+            name="Regional", rows=30, seats_in_row=4, airplane_type=self.airplane_type
+        )
+        response = self.client.patch(path, {"airplane": regional.id})
+        self.assertEqual(response.status_code, 200, response.content)
+        flight = Flight.objects.select_related("airplane").get(id=self.flight.id)
+        self.assertTrue(flight.is_seat_taken(2, 1))
+        self.assertFalse(flight.is_seat_taken(2, 3))
+        self.assertEqual(flight.seats_taken, 5)
+
+
+class OrderValidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("user@test.com", "pass12345")
+        seed_dataset(cls.user, flights=2, tickets_per_flight=1)
+        cls.flight = Flight.objects.order_by("id").first()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def order(self, *tickets):
+        orders = Order.objects.count()
+        response = self.client.post(
+            AIRPORT_URL + "orders/",
+            {
+                "tickets": [
+                    {"flight": flight_id, "row": row, "seat": seat}
+                    for flight_id, row, seat in tickets
+                ]
+            },
+            format="json",
+        )
+        if response.status_code != 201:
+            self.assertEqual(Order.objects.count(), orders)
+        return response
+
+    def assertRejected(self, response, message):
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(message, str(response.data["tickets"]))
+
+    def test_empty_order_is_rejected(self):
+        self.assertRejected(self.order(), "This list may not be empty.")
+
+    def test_duplicate_seats_are_rejected(self):
+        self.assertRejected(
+            self.order((self.flight.id, 2, 1), (self.flight.id, 2, 1)),
+            f"Seat 1 in row 2 of flight {self.flight.id} is requested twice.",
+        )
+
+    def test_unknown_flight_is_rejected(self):
+        self.assertRejected(
+            self.order((self.flight.id, 2, 1), (0, 2, 1)), "Flight 0 does not exist."
+        )
+
+    def test_invalid_and_taken_seats_are_rejected(self):
+        self.assertRejected(self.order((self.flight.id, 21, 1)), "Row 21 exceeds")
+        self.assertRejected(
+            self.order((self.flight.id, 1, 1)), "Seat 1 in row 1 is already occupied."
+        )
+
+    def test_valid_order_spans_flights(self):
+        other = Flight.objects.exclude(id=self.flight.id).get()
+        response = self.order((self.flight.id, 2, 1), (other.id, 2, 1))
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Order.objects.get(id=response.data["id"]).tickets.count(), 2)
+
+
+class SeatHoldTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("a@test.com", "pass12345")
+        cls.other = get_user_model().objects.create_user("b@test.com", "pass12345")
+        seed_dataset(cls.user, flights=1, tickets_per_flight=0)
+        cls.flight = Flight.objects.get()
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def hold(self, user, *seats):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            f"{AIRPORT_URL}flights/{self.flight.id}/holds/",
+            {"seats": [{"row": row, "seat": seat} for row, seat in seats]},
+            format="json",
+        )
+
+    def order(self, user, row, seat):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            AIRPORT_URL + "orders/",
+            {"tickets": [{"flight": self.flight.id, "row": row, "seat": seat}]},
+            format="json",
+        )
+
+    def test_holds_of_two_users_conflict(self):
+        self.assertEqual(self.hold(self.user, (2, 1), (2, 2)).status_code, 201)
+
+        response = self.hold(self.other, (2, 2), (2, 3))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            set(SeatHold.objects.values_list("user_id", "row", "seat")),
+            {(self.user.id, 2, 1), (self.user.id, 2, 2)},
+        )
+        self.assertEqual(self.hold(self.other, (2, 3)).status_code, 201)
+        # Holding again extends the user's own holds.
+        self.assertEqual(self.hold(self.user, (2, 2)).status_code, 201)
+
+    def test_held_seat_is_sold_only_to_its_holder(self):
+        self.hold(self.user, (2, 1), (2, 2))
+
+        response = self.order(self.other, 2, 1)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("held by another customer", str(response.data))
+
+        self.assertEqual(self.order(self.user, 2, 1).status_code, 201)
+        self.assertEqual(list(SeatHold.objects.values_list("row", "seat")), [(2, 2)])
+
+    def test_expired_holds_are_released(self):
+        self.hold(self.user, (2, 1), (2, 2), (2, 3))
+        SeatHold.objects.filter(seat__lt=3).update(
+            expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)
+        )
+
+        self.assertEqual(self.order(self.other, 2, 1).status_code, 201)
+        self.assertEqual(self.hold(self.other, (2, 2)).status_code, 201)
+        self.assertEqual(self.order(self.other, 2, 3).status_code, 400)
+
+        SeatHold.objects.filter(user=self.other).update(
+            expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)
+        )
+        out = StringIO()
+        call_command("release_expired_seat_holds", batch_size=1, stdout=out)
+        self.assertIn("Released 2 expired seat holds.", out.getvalue())
+        self.assertEqual(
+            list(SeatHold.objects.values_list("user_id", "row", "seat")),
+            [(self.user.id, 2, 3)],
+        )
+
+
+class CatalogCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("a@test.com", "pass12345")
+        cls.other = get_user_model().objects.create_user("b@test.com", "pass12345")
+        seed_dataset(cls.user, flights=1, tickets_per_flight=0)
+
+    def setUp(self):
+        caches[CACHE_ALIAS].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get(AIRPORT_URL + "airports/")
+        etag = response["ETag"]
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(AIRPORT_URL + "airports/")
+        self.assertEqual(cached["ETag"], etag)
+        self.assertEqual(cached.content, response.content)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                AIRPORT_URL + "airports/", HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_writes_invalidate_once_committed(self):
+        etag = self.client.get(AIRPORT_URL + "airports/")["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Airport.objects.create(name="Airport new", closest_big_city="City new")
+            response = self.client.get(
+                AIRPORT_URL + "airports/", HTTP_IF_NONE_MATCH=etag
+            )
+            self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(AIRPORT_URL + "airports/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIn("Airport new", response.content.decode())
+
+    def test_browsable_api_is_not_cached(self):
+        self.client.get(AIRPORT_URL + "airports/", HTTP_ACCEPT="text/html")
+
+        self.client.force_authenticate(self.other)
+        response = self.client.get(AIRPORT_URL + "airports/", HTTP_ACCEPT="text/html")
+        self.assertNotIn("ETag", response)
+        self.assertIn("b@test.com", response.content.decode())
+        self.assertNotIn("a@test.com", response.content.decode())
+
+
+class ConnectionIndexTests(TestCase):
+    def test_flight_saved_during_rebuild_is_replayed(self):
+        user = get_user_model().objects.create_user("user@test.com", "pass12345")
+        seed_dataset(user, flights=2, tickets_per_flight=0)
+        reset_connection_index()
+        self.addCleanup(reset_connection_index)
+        flight = Flight.objects.order_by("id").first()
+        build = itineraries.build_connection_index
+
+        def build_while_saving():
+            index = build()
+            self.assertFalse(itineraries._index_lock.locked())
+            flight.departure_date += timedelta(hours=1)
+            flight.arrival_date += timedelta(hours=1)
+            flight.save()
+            return index
+
+        with mock.patch.object(
+            itineraries, "build_connection_index", build_while_saving
+        ):
+            index = get_connection_index()
+
+        self.assertEqual(len(index), 2)
+        position = index.flight_ids.index(flight.id)
+        self.assertEqual(
+            index.departures[position], int(flight.departure_date.timestamp())
+        )
+        self.assertIs(get_connection_index(), index)
+
+    def test_remove_bisects_on_departure(self):
+        class NoScan(list):
+            def index(self, *args):
+                raise AssertionError("flight_ids scanned")
+
+        index = ConnectionIndex(
+            (flight_id, 1, 2, 100 * (flight_id // 3), 0) for flight_id in range(30)
+        )
+        columns = [list(column) for column in index.columns]
+        index.flight_ids = NoScan(index.flight_ids)
+
+        index.remove(13, 400)
+        index.remove(12, 400)
+        self.assertNotIn(12, index.flight_ids)
+        self.assertNotIn(13, index.flight_ids)
+        self.assertEqual(index.departures.count(400), 1)
+        self.assertEqual(len(index), 28)
+
+        # A stale departure falls back to the scan.
+        index.flight_ids = list(index.flight_ids)
+        index.remove(20, 100)
+        index.remove(99, 100)
+        self.assertEqual(len(index), 27)
+        for column, expected in zip(index.columns, columns):
+            del expected[12:14]
+            del expected[18]
+            self.assertEqual(list(column), expected)
+
+
+class FlightDepartureFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("user@test.com", "pass12345")
+        seed_dataset(cls.user, flights=12, tickets_per_flight=0)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def departures(self, **params):
+        response = self.client.get(AIRPORT_URL + "flights/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [flight["departure_date"] for flight in response.data["results"]]
+
+    def test_filters(self):
+        self.assertEqual(len(self.departures(date="2030-01-01")), 6)
+        self.assertEqual(
+            self.departures(
+                departure_after="2030-01-02T00:00:00Z",
+                departure_before="2030-01-02T08:00:00Z",
+            ),
+            ["2030-01-02T02:00:00Z", "2030-01-02T05:00:00Z"],
+        )
+        self.assertEqual(
+            self.departures(date="2030-01-02", departure_after="2030-01-02T15:00"),
+            ["2030-01-02T17:00:00Z"],
+        )
+
+    def test_invalid_date_is_rejected(self):
+        response = self.client.get(AIRPORT_URL + "flights/", {"date": "tomorrow"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("date", response.data)
+
+    def test_route_and_date_search_is_index_range_scan(self):
+        departure = FlightDepartureFilterSerializer(data={"date": "2030-01-01"})
+        departure.is_valid(raise_exception=True)
+        queryset = departure.filter(
+            Flight.objects.filter(
+                route__source_id__in=Airport.ids_by_city("City 0"),
+                route__destination_id__in=Airport.ids_by_city("City 1"),
+            )
+        ).order_by("departure_date", "id")[:20]
+
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # Fresh statistics, whichever tests ran before; small test
+                # tables would still be seq scanned.
+                cursor.execute("ANALYZE airport_flight")
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+        # Any index will do, as long as departures are a range within it.
+        self.assertNotRegex(plan, r"(Seq Scan on|SCAN) airport_flight\b")
+        self.assertRegex(
+            plan, r"(Index Cond: |SEARCH airport_flight USING ).*departure_date ?[<>]"
+        )
+
+
+class FastListSerializationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("user@test.com", "pass12345")
+        seed_dataset(cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertSameContent(self, path, **params):
+        caches[CACHE_ALIAS].clear()
+        with override_settings(FAST_LIST_SERIALIZATION=False):
+            expected = self.client.get(AIRPORT_URL + path, params).content
+        caches[CACHE_ALIAS].clear()
+        with override_settings(FAST_LIST_SERIALIZATION=True):
+            actual = self.client.get(AIRPORT_URL + path, params).content
+        self.assertEqual(actual, expected)
+
+    def test_flight_list_is_byte_identical(self):
+        self.assertSameContent("flights/")
+        self.assertSameContent("flights/", source="City 1", page_size=5)
+
+    def test_route_list_is_byte_identical(self):
+        self.assertSameContent("routes/")
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("user@test.com", "pass12345")
+        cls.staff = get_user_model().objects.create_user(
+            "staff@test.com", "pass12345", is_staff=True
+        )
+        seed_dataset(cls.user, flights=3, tickets_per_flight=2)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def test_flight_export_streams_csv(self):
+        response = self.client.get(AIRPORT_URL + "flights/export/", {"format": "csv"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            lines[0], "id,route,airplane,tickets_available,departure_date,arrival_date"
+        )
+        self.assertEqual(len(lines), 4)
+
+    def test_flight_manifest_streams_ndjson(self):
+        flight = Flight.objects.order_by("id").first()
+        response = self.client.get(f"{AIRPORT_URL}flights/{flight.id}/manifest/")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('"passenger": "user@test.com"', lines[0])
+
+    def test_order_export_is_staff_only(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(AIRPORT_URL + "orders/export/")
+        self.assertEqual(response.status_code, 403)
+
+
+class ImportScheduleTests(TestCase):
+    def test_ambiguous_airplane_name_is_rejected(self):
+        user = get_user_model().objects.create_user("user@test.com", "pass12345")
+        seed_dataset(user, flights=1, tickets_per_flight=0)
+        airplane = Airplane.objects.get(name="Plane 0")
+        route = Route.objects.select_related("source", "destination").first()
+        row = {
+            "source": route.source.name,
+            "source_city": route.source.closest_big_city,
+            "destination": route.destination.name,
+            "destination_city": route.destination.closest_big_city,
+            "airplane": "Plane 0",
+            "departure_date": "2031-01-01T08:00:00",
+            "arrival_date": "2031-01-01T10:00:00",
+            "crew": "First 0 Last 0",
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "flights.ndjson"
+            path.write_text(json.dumps(row))
+            call_command("import_schedule", flights=path, stdout=StringIO())
+            self.assertEqual(Flight.objects.filter(airplane=airplane).count(), 2)
+
+            Airplane.objects.create(
+                name="Plane 0",
+                rows=10,
+                seats_in_row=4,
+                airplane_type=airplane.airplane_type,
+            )
+            with self.assertRaisesMessage(CommandError, "Ambiguous airplane"):
+                call_command("import_schedule", flights=path, stdout=StringIO())
+
+    def test_invalid_rows_name_file_and_line(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "airplanes.csv"
+            path.write_text("name,rows,airplane_type\nPlane,20,Narrow body\n")
+            with self.assertRaisesMessage(
+                CommandError, f"{path}: missing columns seats_in_row."
+            ):
+                call_command("import_schedule", airplanes=path, stdout=StringIO())
+
+            path.write_text(
+                "name,rows,seats_in_row,airplane_type\n"
+                "Plane 1,20,6,Narrow body\n"
+                "Plane 2,twenty,6,Narrow body\n"
+            )
+            with self.assertRaisesMessage(CommandError, f"{path}, line 3: invalid"):
+                call_command("import_schedule", airplanes=path, stdout=StringIO())
+
+            path = Path(directory) / "crew.ndjson"
+            path.write_text(
+                '{"first_name": "Ann", "last_name": "Lee"}\n{"first_name": "Bo"}\n'
+            )
+            with self.assertRaisesMessage(
+                CommandError, f"{path}, line 2: missing last_name."
+            ):
+                call_command("import_schedule", crew=path, stdout=StringIO())
+
+    def test_imported_flights_reach_the_itinerary_index(self):
+        user = get_user_model().objects.create_user("user@test.com", "pass12345")
+        seed_dataset(user, flights=1, tickets_per_flight=0)
+        route = Route.objects.select_related("source", "destination").first()
+        departure = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "flights.csv"
+            path.write_text(
+                "source,source_city,destination,destination_city,airplane,"
+                "departure_date,arrival_date,crew\n"
+                f"{route.source.name},{route.source.closest_big_city},"
+                f"{route.destination.name},{route.destination.closest_big_city},"
+                f"Plane 0,{departure.isoformat()},"
+                f"{(departure + timedelta(hours=2)).isoformat()},\n"
+            )
+            get_connection_index()
+            call_command("import_schedule", flights=path, stdout=StringIO())
+
+        flight = Flight.objects.get(departure_date=departure)
+        self.assertIn(flight.id, get_connection_index().flight_ids)
+
+
+class TicketEmailWorkerTests(TestCase):
+    def test_smtp_outage_backs_off_claimed_jobs(self):
+        user = get_user_model().objects.create_user("user@test.com", "pass12345")
+        job = TicketEmail.objects.create(
+            order=Order.objects.create(user=user), recipient=user.email
+        )
+
+        with mock.patch("django.core.mail.get_connection") as get_connection:
+            get_connection.return_value.open.side_effect = OSError("refused")
+            call_command("send_ticket_emails", once=True, stderr=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (TicketEmail.Status.PENDING, 1))
+        self.assertIn("refused", job.last_error)
+        self.assertGreater(job.next_attempt_at, datetime.now(timezone.utc))
+
+
+class AdminTests(TestCase):
+    """Admin pages run a fixed number of queries, whatever the row count."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser(
+            "admin@test.com", "pass12345"
+        )
+        seed_dataset(cls.admin, flights=12, tickets_per_flight=3)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get(self, url, budget, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(queries),
+            budget,
+            "\n".join(query["sql"] for query in queries.captured_queries),
+        )
+        return response
+
+    def test_change_lists(self):
+        self.get(reverse("admin:airport_flight_changelist"), 6)
+        self.get(
+            reverse("admin:airport_flight_changelist"),
+            6,
+            departure_date__gte="2030-01-01",
+            departure_date__lt="2031-01-01",
+        )
+        self.get(reverse("admin:airport_route_changelist"), 4)
+        self.get(reverse("admin:airport_order_changelist"), 6)
+
+    def test_order_change_form(self):
+        order = Order.objects.order_by("id").first()
+        url = reverse("admin:airport_order_change", args=[order.id])
+        # One autocomplete label per ticket of the order, no flight <select>.
+        response = self.get(url, 8 + order.tickets.count())
+        self.assertEqual(response.content.count(b"<option "), order.tickets.count())
+
+    def test_flight_autocomplete(self):
+        self.get(
+            reverse("admin:autocomplete"),
+            4,
+            term="City",
+            app_label="airport",
+            model_name="ticket",
+            field_name="flight",
+        )
+
+
+class LoadFactorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("user@test.com", "pass12345")
+        cls.staff = get_user_model().objects.create_user(
+            "staff@test.com", "pass12345", is_staff=True
+        )
+        seed_dataset(cls.user, flights=4, tickets_per_flight=2)
+        cls.flight = Flight.objects.order_by("id").first()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def snapshot(self):
+        return (
+            list(FlightLoad.objects.order_by("flight_id").values()),
+            list(
+                RouteDailyLoad.objects.order_by("route_id", "date").values(
+                    "route_id",
+                    "date",
+                    "flights",
+                    "capacity",
+                    "sold",
+                    "seat_km",
+                    "passenger_km",
+                )
+            ),
+        )
+
+    def test_orders_update_load_factors(self):
+        self.client.force_authenticate(self.user)
+        self.client.post(
+            AIRPORT_URL + "orders/",
+            {"tickets": [{"flight": self.flight.id, "row": 2, "seat": 1}]},
+            format="json",
+        )
+
+        load = FlightLoad.objects.get(flight_id=self.flight.id)
+        self.assertEqual((load.sold, load.capacity), (3, 120))
+        day = RouteDailyLoad.objects.get(route=self.flight.route, date=load.date)
+        self.assertEqual((day.flights, day.sold, day.passenger_km), (1, 3, 1500))
+
+        expected = self.snapshot()
+        FlightLoad.objects.all().delete()
+        RouteDailyLoad.objects.all().delete()
+        call_command("refresh_load_factors", stdout=StringIO())
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_deleted_tickets_and_flights_are_subtracted(self):
+        Ticket.objects.filter(flight=self.flight).first().delete()
+        self.assertEqual(FlightLoad.objects.get(flight_id=self.flight.id).sold, 1)
+
+        self.flight.delete()
+        self.assertFalse(FlightLoad.objects.filter(flight_id=self.flight.id).exists())
+        self.assertEqual(
+            RouteDailyLoad.objects.aggregate(Sum("flights")), {"flights__sum": 3}
+        )
+
+    def test_moved_ticket_frees_previous_flight(self):
+        other = Flight.objects.exclude(id=self.flight.id).order_by("id").first()
+        ticket = Ticket.objects.filter(flight=self.flight).first()
+        ticket.flight = other
+        ticket.row = 3
+        ticket.save()
+
+        self.flight.refresh_from_db()
+        self.assertFalse(self.flight.is_seat_taken(1, ticket.seat))
+        self.assertEqual(FlightLoad.objects.get(flight_id=self.flight.id).sold, 1)
+        self.assertEqual(FlightLoad.objects.get(flight_id=other.id).sold, 3)
+
+    def test_flight_edits_move_route_day_totals(self):
+        day = RouteDailyLoad.objects.get(route=self.flight.route)
+        self.flight.departure_date += timedelta(days=1)
+        self.flight.arrival_date += timedelta(days=1)
+        self.flight.save()
+
+        self.assertFalse(RouteDailyLoad.objects.filter(id=day.id).exists())
+        moved = RouteDailyLoad.objects.get(route=self.flight.route)
+        self.assertEqual((moved.flights, moved.sold), (1, 2))
+
+        expected = self.snapshot()
+        call_command("refresh_load_factors", stdout=StringIO())
+        self.assertEqual(self.snapshot(), expected)
+        # Rebuilt in place: concurrent record_sales updates are not lost.
+        self.assertEqual(
+            RouteDailyLoad.objects.get(route=self.flight.route).id, moved.id
+        )
+
+    def test_cascade_deletes_update_each_flight_once(self):
+        flights = list(Flight.objects.order_by("id")[:2])
+
+        def order(tickets):
+            order = Order.objects.create(user=self.user)
+            for i in range(tickets):
+                Ticket.objects.create(
+                    flight=flights[i % 2],
+                    order=order,
+                    row=3 + i // 12,
+                    seat=1 + i // 2 % 6,
+                )
+            return order
+
+        small = order(2)
+        with CaptureQueriesContext(connection) as queries:
+            small.delete()
+        large = order(24)
+        self.assertEqual(FlightLoad.objects.get(flight_id=flights[0].id).sold, 2 + 12)
+        budget = len(queries)
+        with CaptureQueriesContext(connection) as queries:
+            large.delete()
+        self.assertEqual(len(queries), budget)
+
+        for flight in flights:
+            flight.refresh_from_db()
+            self.assertEqual(flight.seats_taken, 2)
+            self.assertEqual(FlightLoad.objects.get(flight_id=flight.id).sold, 2)
+        expected = self.snapshot()
+        call_command("refresh_load_factors", stdout=StringIO())
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_endpoints(self):
+        for path, rows in (
+            ("load-factors/flights/", 4),
+            ("load-factors/routes/", 4),
+            ("load-factors/days/", 1),
+        ):
+            with self.assertNumQueries(1):
+                response = self.client.get(
+                    AIRPORT_URL + path, {"date_to": "2030-01-01"}
+                )
+            self.assertEqual(len(response.data["results"]), rows)
+
+        day = response.data["results"][0]
+        self.assertEqual((day["sold"], day["capacity"]), (8, 480))
+        self.assertAlmostEqual(day["load_factor"], 8 / 480)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(AIRPORT_URL + "load-factors/days/")
+        self.assertEqual(response.status_code, 403)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = get_user_model().objects.create_user(
+            "staff@test.com", "pass12345", is_staff=True
+        )
+        seed_dataset(cls.staff, flights=4, tickets_per_flight=0)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def walk(self, url, params, key):
+        pages, seen = [], []
+        response = self.client.get(url, params)
+        while True:
+            pages.append([row[key] for row in response.data["results"]])
+            seen.extend(pages[-1])
+            if response.data["next"] is None:
+                break
+            self.assertLess(len(pages), 30)
+            response = self.client.get(response.data["next"])
+        return pages, seen, response
+
+    def test_many_rows_on_one_date(self):
+        route = Route.objects.first()
+        FlightLoad.objects.bulk_create(
+            FlightLoad(
+                flight_id=10_000 + i, route=route, date=date(2031, 1, 1), capacity=10
+            )
+            for i in range(1_500)
+        )
+        expected = list(
+            FlightLoad.objects.filter(date=date(2031, 1, 1))
+            .order_by("flight_id")
+            .values_list("flight_id", flat=True)
+        )
+
+        pages, seen, last = self.walk(
+            AIRPORT_URL + "load-factors/flights/",
+            {"date_from": "2031-01-01", "page_size": 100},
+            "flight_id",
+        )
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 15)
+
+        # Walking back from the last page returns the same pages in reverse.
+        back = []
+        response = self.client.get(last.data["previous"])
+        while True:
+            back.append([row["flight_id"] for row in response.data["results"]])
+            if response.data["previous"] is None:
+                break
+            response = self.client.get(response.data["previous"])
+        self.assertEqual(back, pages[-2::-1])
+
+    def test_flights_departing_together(self):
+        route = Route.objects.first()
+        airplane = Airplane.objects.first()
+        departure = FIRST_DEPARTURE + timedelta(days=30)
+        Flight.objects.bulk_create(
+            Flight(
+                route=route,
+                airplane=airplane,
+                departure_date=departure,
+                arrival_date=departure + timedelta(hours=2),
+            )
+            for _ in range(25)
+        )
+        expected = list(
+            Flight.objects.order_by("departure_date", "id").values_list("id", flat=True)
+        )
+
+        _, seen, _ = self.walk(AIRPORT_URL + "flights/", {"page_size": 7}, "id")
+        self.assertEqual(seen, expected)
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("user@test.com", "pass12345")
+        seed_dataset(cls.user, flights=4, tickets_per_flight=2)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def archive(self):
+        call_command(
+            "archive_flights",
+            before=FIRST_DEPARTURE + timedelta(hours=4),
+            batch_size=1,
+            stdout=StringIO(),
+        )
+
+    def test_departed_flights_move_to_archive(self):
+        departed = list(Flight.objects.order_by("id")[:2])
+        self.archive()
+
+        self.assertEqual(Flight.objects.count(), 2)
+        self.assertEqual(Ticket.objects.count(), 4)
+        archived = ArchivedFlight.objects.get(id=departed[0].id)
+        self.assertEqual(bytes(archived.seat_map), bytes(departed[0].seat_map))
+        self.assertEqual(archived.crew.count(), 3)
+        self.assertEqual(archived.tickets.count(), 2)
+
+    def test_order_list_reads_archive_on_request(self):
+        expected = self.client.get(AIRPORT_URL + "orders/").data["results"]
+        self.archive()
+
+        orders = self.client.get(AIRPORT_URL + "orders/").data["results"]
+        self.assertEqual(sum(bool(order["tickets"]) for order in orders), 2)
+
+        with self.assertNumQueries(3):
+            history = self.client.get(AIRPORT_URL + "orders/", {"archived": "true"})
+        for before, after in zip(expected, history.data["results"]):
+            self.assertEqual(
+                before["tickets"], after["tickets"] + after["archived_tickets"]
+            )
+
+
+class ScheduleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("user@test.com", "pass12345")
+        cls.staff = get_user_model().objects.create_user(
+            "staff@test.com", "pass12345", is_staff=True
+        )
+        seed_dataset(cls.user, flights=1, tickets_per_flight=0)
+        cls.route = Route.objects.first()
+        cls.airplane = Airplane.objects.first()
+        cls.crew = list(Crew.objects.values_list("id", flat=True))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def create(self, season_end="2031-01-31", weekdays="135"):
+        return self.client.post(
+            AIRPORT_URL + "schedules/",
+            {
+                "route": self.route.id,
+                "airplane": self.airplane.id,
+                "crew": self.crew,
+                "weekdays": weekdays,
+                "departure_time": "09:30",
+                "duration": "02:15:00",
+                "season_start": "2031-01-01",
+                "season_end": season_end,
+            },
+            format="json",
+        )
+
+    def test_create_expands_in_bulk(self):
+        with CaptureQueriesContext(connection) as month:
+            response = self.create()
+        self.assertEqual(response.status_code, 201)
+
+        # January 2031 starts on a Wednesday: 4 Mondays, 5 Wednesdays and Fridays.
+        flights = Flight.objects.filter(schedule_id=response.data["id"])
+        self.assertEqual(flights.count(), 14)
+        self.assertEqual(
+            {flight.departure_date.isoweekday() for flight in flights}, {1, 3, 5}
+        )
+        self.assertEqual(
+            Flight.crew.through.objects.filter(flight__in=flights).count(), 42
+        )
+        self.assertEqual(FlightLoad.objects.filter(flight_id__in=flights).count(), 14)
+
+        # Queries grow with insert batches, not per flight; both seasons
+        # fit one batch.
+        with CaptureQueriesContext(connection) as half_year:
+            self.create(season_end="2031-06-30")
+        self.assertEqual(len(half_year), len(month))
+
+        response = self.create(season_end="2030-12-31")
+        self.assertEqual(response.status_code, 400)
+
+    def test_update_keeps_unchanged_and_sold_flights(self):
+        schedule_id = self.create().data["id"]
+        flights = Flight.objects.filter(schedule_id=schedule_id)
+        mondays = set(
+            flights.filter(departure_date__week_day=2).values_list("id", flat=True)
+        )
+        sold = flights.filter(departure_date__week_day=6).first()
+        Ticket.objects.create(
+            flight=sold, order=Order.objects.create(user=self.user), row=1, seat=1
+        )
+
+        response = self.client.patch(
+            AIRPORT_URL + f"schedules/{schedule_id}/", {"weekdays": "13"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(flights.count(), 9)
+        self.assertTrue(mondays <= set(flights.values_list("id", flat=True)))
+        sold.refresh_from_db()
+        self.assertIsNone(sold.schedule_id)
+
+        response = self.client.post(AIRPORT_URL + f"schedules/{schedule_id}/expand/")
+        self.assertEqual(
+            response.data,
+            {"created": 0, "updated": 0, "deleted": 0, "detached": 0, "kept": 9},
+        )
+
+    def test_airplane_change_updates_sold_flights_in_place(self):
+        schedule_id = self.create().data["id"]
+        flights = Flight.objects.filter(schedule_id=schedule_id)
+        sold = flights.order_by("departure_date").first()
+        Ticket.objects.create(
+            flight=sold, order=Order.objects.create(user=self.user), row=2, seat=4
+        )
+        path = AIRPORT_URL + f"schedules/{schedule_id}/"
+        airplane_type = self.airplane.airplane_type
+
+        narrow = Airplane.objects.create(
+            name="Narrow", rows=30, seats_in_row=3, airplane_type=airplane_type
+        )
+        response = self.client.patch(path, {"airplane": narrow.id})
+        self.assertEqual(response.status_code, 400)
+
+        regional = Airplane.objects.create(
+            name="Regional", rows=30, seats_in_row=4, airplane_type=airplane_type
+        )
+        response = self.client.patch(
+            path, {"airplane": regional.id, "duration": "03:00:00"}
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(flights.count(), 14)
+        self.assertEqual(flights.exclude(airplane=regional).count(), 0)
+        sold = Flight.objects.select_related("airplane").get(id=sold.id)
+        self.assertEqual(sold.schedule_id, schedule_id)
+        self.assertEqual(sold.arrival_date - sold.departure_date, timedelta(hours=3))
+        self.assertTrue(sold.is_seat_taken(2, 4))
+        self.assertEqual(sold.seats_taken, 1)
+        self.assertEqual(FlightLoad.objects.get(flight_id=sold.id).capacity, 120)
+
+    def test_expand_skips_departed_and_archived_flights(self):
+        schedule_id = self.create().data["id"]
+        flights = Flight.objects.filter(schedule_id=schedule_id)
+        call_command(
+            "archive_flights",
+            before=datetime(2031, 1, 15, tzinfo=timezone.utc),
+            stdout=StringIO(),
+        )
+        self.assertEqual(flights.count(), 8)
+
+        with mock.patch(
+            "airport.schedules.timezone.now",
+            return_value=datetime(2031, 1, 20, tzinfo=timezone.utc),
+        ):
+            response = self.client.post(
+                AIRPORT_URL + f"schedules/{schedule_id}/expand/"
+            )
+            self.assertEqual(
+                response.data,
+                {"created": 0, "updated": 0, "deleted": 0, "detached": 0, "kept": 6},
+            )
+            self.client.patch(
+                AIRPORT_URL + f"schedules/{schedule_id}/", {"weekdays": "5"}
+            )
+        # Departed flights are neither recreated nor dropped with the pattern.
+        self.assertEqual(flights.count(), 4)
+        self.assertEqual(flights.filter(departure_date__week_day=6).count(), 3)
+
+    def test_delete_keeps_sold_flights(self):
+        schedule_id = self.create().data["id"]
+        sold = Flight.objects.filter(schedule_id=schedule_id).first()
+        Ticket.objects.create(
+            flight=sold, order=Order.objects.create(user=self.user), row=1, seat=1
+        )
+
+        self.client.delete(AIRPORT_URL + f"schedules/{schedule_id}/")
+        self.assertFalse(Schedule.objects.exists())
+        self.assertEqual(
+            list(Flight.objects.filter(route=self.route, departure_date__year=2031)),
+            [sold],
+        )
+        self.assertEqual(
+            FlightLoad.objects.filter(date__year=2031)
+            .values_list("flight_id", flat=True)
+            .get(),
+            sold.id,
+        )
+
+
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("user@test.com", "pass12345")
+        seed_dataset(cls.user, flights=2, tickets_per_flight=1)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_header(self):
+        response = self.client.get(AIRPORT_URL + "flights/")
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^db;dur=[\d.]+;desc="\d+ queries", view;dur=[\d.]+, '
+            r"render;dur=[\d.]+, total;dur=[\d.]+$",
+        )
+
+    def test_serialization_counts_as_view_time(self):
+        caches[CACHE_ALIAS].clear()
+        to_representation = AirportSerializer.to_representation
+
+        def slow(serializer, instance):
+            time.sleep(0.05)
+            return to_representation(serializer, instance)
+
+        with mock.patch.object(AirportSerializer, "to_representation", slow):
+            response = self.client.get(AIRPORT_URL + "airports/")
+        timings = dict(
+            re.match(r"(\w+);dur=([\d.]+)", entry).groups()
+            for entry in response["Server-Timing"].split(", ")
+        )
+        self.assertGreaterEqual(float(timings["view"]), 50 * len(response.data))
+        self.assertLess(float(timings["render"]), 50)
+
+    @override_settings(METRICS_TOKEN="scrape-secret")
+    def test_metrics_endpoint_aggregates_per_view(self):
+        self.client.get(AIRPORT_URL + "flights/")
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong-secret")
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.get(
+            "/metrics", HTTP_AUTHORIZATION="Bearer scrape-secret"
+        )
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn("# TYPE http_request_duration_seconds histogram", body)
+        self.assertIn(
+            'http_request_db_queries_bucket{view="airport:flight-list",'
+            'method="GET",le="+Inf"}',
+            body,
+        )
+        self.assertIn(
+            'http_responses_total{view="airport:flight-list",method="GET",'
+            'status="200"}',
+            body,
+        )
+
+
+@override_settings(REPLICA_DATABASES=["default"])
+class ReplicaRoutingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("user@test.com", "pass12345")
+        seed_dataset(cls.user, flights=1, tickets_per_flight=1)
+        cls.flight = Flight.objects.get()
+
+    def setUp(self):
+        caches["default"].clear()
+        reset_replica_health()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_reads_are_routed_to_the_chosen_replica(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Flight))
+        with reading_from(choose_replica(self.user)):
+            self.assertEqual(router.db_for_read(Flight), "default")
+        self.assertEqual(router.db_for_write(Flight), "default")
+
+    def test_user_is_pinned_to_primary_after_ordering(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                AIRPORT_URL + "orders/",
+                {"tickets": [{"flight": self.flight.id, "row": 2, "seat": 1}]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertIsNone(choose_replica(self.user))
+
+    def test_streamed_exports_read_from_the_replica(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(
+                "staff@test.com", "pass12345", is_staff=True
+            )
+        )
+        aliases = []
+        plain = exports._plain
+
+        def record_alias(row, fields):
+            aliases.append(replicas._replica.get())
+            return plain(row, fields)
+
+        with mock.patch.object(
+            replicas, "choose_replica", return_value="default"
+        ), mock.patch.object(exports, "_plain", record_alias):
+            response = self.client.get(
+                AIRPORT_URL + "flights/export/", {"format": "csv"}
+            )
+            b"".join(response.streaming_content)
+
+        self.assertEqual(aliases, ["default"])
+        self.assertIsNone(replicas._replica.get())
+
+    def test_lagging_replica_is_dropped(self):
+        with mock.patch("airport.replicas.replica_lag", return_value=60):
+            self.assertIsNone(choose_replica(self.user))
+
+
+# Router URLs with the async read views mounted first, as ASYNC_READ_VIEWS does.
+urlpatterns = [
+    path(
+        "api/airports/",
+        include(
+            (async_views.urlpatterns + airport_urls.urlpatterns, "airport"),
+            namespace="airport",
+        ),
+    ),
+]
+
+
+class AsyncReadViewTests(TestCase):
+    """The async views answer exactly like the sync viewsets."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("user@test.com", "pass12345")
+        seed_dataset(cls.user, flights=5, tickets_per_flight=2)
+        cls.flight = Flight.objects.order_by("id").first()
+
+    def setUp(self):
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+    async def assertSameResponse(self, path, params=None, headers=None):
+        headers = self.headers if headers is None else headers
+        await caches[CACHE_ALIAS].aclear()
+        expected = await AsyncClient().get(AIRPORT_URL + path, params, headers=headers)
+        await caches[CACHE_ALIAS].aclear()
+        with override_settings(ROOT_URLCONF=__name__):
+            actual = await AsyncClient().get(
+                AIRPORT_URL + path, params, headers=headers
+            )
+        self.assertEqual(actual.status_code, expected.status_code)
+        self.assertEqual(actual.content, expected.content)
+        return actual
+
+    async def test_flight_list(self):
+        await self.assertSameResponse("flights/")
+        await self.assertSameResponse(
+            "flights/", {"source": "City 1", "destination": "City", "page_size": 2}
+        )
+        await self.assertSameResponse(
+            "flights/", {"date": "2030-01-01", "departure_after": "2030-01-01T10:00"}
+        )
+        await self.assertSameResponse("flights/", {"departure_before": "soon"})
+
+    async def test_flight_retrieve(self):
+        response = await self.assertSameResponse(f"flights/{self.flight.id}/")
+        self.assertEqual(len(response.json()["taken_place"]), 2)
+        await self.assertSameResponse("flights/0/")
+
+    async def test_flight_seat_map(self):
+        path = f"flights/{self.flight.id}/"
+        await self.assertSameResponse(path, {"seats": "rle"})
+        await self.assertSameResponse(path, {"seats": "png"})
+        await self.assertSameResponse(
+            path,
+            headers={**self.headers, "Accept": "application/json; seats=bitmap"},
+        )
+        await self.assertSameResponse("flights/0/", {"seats": "bitmap"})
+
+    async def test_catalog_lists(self):
+        for path in ("airports/", "routes/", "airplane-types/", "airplanes/", "crews/"):
+            await self.assertSameResponse(path)
+
+    async def test_authentication_errors(self):
+        await self.assertSameResponse("flights/", headers={})
+        await self.assertSameResponse(
+            "flights/", headers={"Authorization": "Bearer invalid"}
+        )
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
@@ -8,7 +9,12 @@ from airport.views import (
     AirplaneViewSet,
     CrewViewSet,
     FlightViewSet,
+    ScheduleViewSet,
+    ItineraryViewSet,
     OrderViewSet,
+    FlightLoadViewSet,
+    RouteDailyLoadViewSet,
+    DailyLoadViewSet,
 )
 
 router = DefaultRouter()
@@ -18,10 +24,20 @@ router.register("airplane-types", AirplaneTypeViewSet)
 router.register("airplanes", AirplaneViewSet)
 router.register("crews", CrewViewSet)
 router.register("flights", FlightViewSet)
+router.register("schedules", ScheduleViewSet)
+router.register("itineraries", ItineraryViewSet, basename="itineraries")
 router.register("orders", OrderViewSet)
+router.register("load-factors/flights", FlightLoadViewSet)
+router.register("load-factors/routes", RouteDailyLoadViewSet)
+router.register("load-factors/days", DailyLoadViewSet, basename="dailyload")
 
 urlpatterns = [
     path("", include(router.urls)),
 ]
 
+if settings.ASYNC_READ_VIEWS:
+    from airport.async_views import urlpatterns as async_urlpatterns
+
+    urlpatterns = async_urlpatterns + urlpatterns
+
 app_name = "airport"
@@ -1,5 +1,9 @@
+from collections import Counter
+
 from django.core.exceptions import ValidationError
-from airport.models import Ticket, Flight, Airport, Route
+from django.db.models import Q
+
+from airport.models import Flight, Airport, Airplane, Route, SeatHold
 
 
 def validate_ticket_seat(row: int, seat: int, flight: Flight) -> None:
@@ -15,13 +19,85 @@ def validate_ticket_seat(row: int, seat: int, flight: Flight) -> None:
             f"Seat {seat} exceeds the airplane's limits (1-{airplane.seats_in_row})."
         )
 
-    if Ticket.objects.filter(flight=flight, row=row, seat=seat).exists():
+    if flight.is_seat_taken(row, seat):
         raise ValidationError(f"Seat {seat} in row {row} is already occupied.")
 
 
+def validate_unique_seats(seats: list[tuple]) -> None:
+    duplicates = [seat for seat, count in Counter(seats).items() if count > 1]
+    if duplicates:
+        flight_id, row, seat = duplicates[0]
+        raise ValidationError(
+            f"Seat {seat} in row {row} of flight {flight_id} is requested twice."
+        )
+
+
+def validate_not_held(seats: list[tuple], user) -> None:
+    holds = SeatHold.objects.for_seats(seats).active()
+    if user is not None:
+        holds = holds.exclude(user=user)
+
+    held = holds.values_list("row", "seat").first()
+    if held:
+        raise ValidationError(
+            f"Seat {held[1]} in row {held[0]} is held by another customer."
+        )
+
+
+def validate_seat_hold(seats: list[dict], flight: Flight) -> None:
+    validate_unique_seats([(flight.id, seat["row"], seat["seat"]) for seat in seats])
+    for seat in seats:
+        validate_ticket_seat(seat["row"], seat["seat"], flight)
+
+
+def validate_ticket_seats(tickets: list[dict], user=None) -> None:
+    """Validate all seats of an order with a single flight/airplane query.
+
+    Seats held by ``user`` are allowed, holds of anyone else are not.
+    """
+    seats = [(ticket["flight_id"], ticket["row"], ticket["seat"]) for ticket in tickets]
+    validate_unique_seats(seats)
+
+    flights = Flight.objects.select_related("airplane").in_bulk(
+        {flight_id for flight_id, _, _ in seats}
+    )
+    for flight_id, row, seat in seats:
+        if flight_id not in flights:
+            raise ValidationError(f"Flight {flight_id} does not exist.")
+        validate_ticket_seat(row, seat, flights[flight_id])
+
+    validate_not_held(seats, user)
+
+
+def validate_airplane_change(tickets, airplane: Airplane) -> None:
+    """Seats of sold ``tickets`` must exist on the airplane they move to."""
+    outside = (
+        tickets.filter(Q(row__gt=airplane.rows) | Q(seat__gt=airplane.seats_in_row))
+        .values_list("row", "seat")
+        .first()
+    )
+    if outside:
+        raise ValidationError(
+            f"Seat {outside[1]} in row {outside[0]} is sold and does not exist "
+            f"on {airplane.name}."
+        )
+
+
 def validate_route(source: Airport, destination: Airport) -> None:
     if source.name == destination.name:
         raise ValidationError("You can`t create this route.")
 
     if Route.objects.filter(source=source, destination=destination).exists():
         raise ValidationError("This route already exists.")
+
+
+# Longest season a schedule may expand into flights at once.
+MAX_SEASON_DAYS = 400
+
+
+def validate_season(season_start, season_end) -> None:
+    if season_end < season_start:
+        raise ValidationError("The season can't end before it starts.")
+
+    if (season_end - season_start).days >= MAX_SEASON_DAYS:
+        raise ValidationError(f"Seasons are limited to {MAX_SEASON_DAYS} days.")
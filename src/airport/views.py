@@ -1,32 +1,78 @@
-import os
-
-from django.core.mail import EmailMessage
-from django.db.models import F, Count
+from django.db import transaction
+from django.db.models import F, Prefetch, Sum
 from drf_spectacular.utils import extend_schema, OpenApiParameter
-from fpdf import FPDF
-from rest_framework import viewsets, mixins
-from rest_framework.permissions import IsAuthenticated
+from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
-from airport.models import Airport, Route, AirplaneType, Crew, Flight, Order, Airplane
+from airport.caching import CachedListMixin, CachedRetrieveMixin
+from airport.exports import CHUNK_SIZE, CSVRenderer, NDJSONRenderer, stream_export
+from airport.fast_serializers import (
+    FastListMixin,
+    FlightListRowSerializer,
+    RouteListRowSerializer,
+    SeatMapRowSerializer,
+)
+from airport.itineraries import find_itineraries
+from airport.models import (
+    ArchivedTicket,
+    FlightLoad,
+    RouteDailyLoad,
+    Airport,
+    Route,
+    AirplaneType,
+    Crew,
+    Schedule,
+    Flight,
+    Order,
+    Airplane,
+    Ticket,
+    TicketEmail,
+)
+from airport.notifications import wake_ticket_email_workers
+from airport.pagination import (
+    DailyLoadPagination,
+    FlightLoadPagination,
+    FlightPagination,
+    OrderPagination,
+    RouteDailyLoadPagination,
+    RoutePagination,
+)
+from airport.replicas import ReplicaReadMixin, pin_to_primary
+from airport.schedules import expand_schedule
 from airport.serializers import (
     AirportSerializer,
     RouteSerializer,
     AirplaneSerializer,
     AirplaneTypeSerializer,
     CrewSerializer,
+    ScheduleSerializer,
     FlightSerializer,
     OrderSerializer,
     AirplaneListSerializer,
     AirplaneTypeRetrieveSerializer,
+    FlightDepartureFilterSerializer,
     FlightListSerializer,
     FlightRetrieveSerializer,
     OrderListSerializer,
+    OrderHistorySerializer,
     RouteListSerializer,
+    SeatHoldSerializer,
+    ItinerarySearchSerializer,
+    ItinerarySerializer,
+    LoadFactorFilterSerializer,
+    FlightLoadSerializer,
+    RouteDailyLoadSerializer,
+    DailyLoadSerializer,
 )
 
 
 class AirportViewSet(
+    ReplicaReadMixin,
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
@@ -36,11 +82,17 @@ class AirportViewSet(
 
 
 class RouteViewSet(
+    ReplicaReadMixin,
+    CachedListMixin,
+    FastListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
 ):
     queryset = Route.objects.select_related("source", "destination")
+    cache_models = (Route, Airport)
+    list_row_serializer = RouteListRowSerializer
+    pagination_class = RoutePagination
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -50,6 +102,8 @@ class RouteViewSet(
 
 
 class AirplaneViewSet(
+    ReplicaReadMixin,
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
@@ -63,12 +117,16 @@ class AirplaneViewSet(
 
 
 class AirplaneTypeViewSet(
+    ReplicaReadMixin,
+    CachedListMixin,
+    CachedRetrieveMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     GenericViewSet,
 ):
     queryset = AirplaneType.objects.all()
+    cache_models = (AirplaneType, Airplane)
 
     def get_serializer_class(self):
         if self.action == "retrieve":
@@ -77,6 +135,8 @@ class AirplaneTypeViewSet(
 
 
 class CrewViewSet(
+    ReplicaReadMixin,
+    CachedListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
@@ -85,18 +145,32 @@ class CrewViewSet(
     serializer_class = CrewSerializer
 
 
-class FlightViewSet(viewsets.ModelViewSet):
-    queryset = (
-        Flight.objects.select_related(
-            "route", "route__source", "route__destination", "airplane"
-        )
-        .prefetch_related("crew")
-        .annotate(
-            tickets_available=(
-                F("airplane__rows") * F("airplane__seats_in_row") - Count("tickets")
-            )
-        )
-    )
+FLIGHT_EXPORT_FIELDS = (
+    "id",
+    "route",
+    "airplane",
+    "tickets_available",
+    "departure_date",
+    "arrival_date",
+)
+MANIFEST_FIELDS = ("id", "row", "seat", "order_id", "passenger")
+ORDER_EXPORT_FIELDS = (
+    "order_id",
+    "created_at",
+    "passenger",
+    "ticket_id",
+    "flight_id",
+    "row",
+    "seat",
+)
+
+
+class FlightViewSet(ReplicaReadMixin, FastListMixin, viewsets.ModelViewSet):
+    queryset = Flight.objects.select_related(
+        "route", "route__source", "route__destination", "airplane"
+    ).prefetch_related("crew")
+    pagination_class = FlightPagination
+    list_row_serializer = FlightListRowSerializer
 
     def get_queryset(self):
         source = self.request.query_params.get("source")
@@ -105,22 +179,23 @@ class FlightViewSet(viewsets.ModelViewSet):
 
         queryset = self.queryset
         if source:
-            queryset = queryset.filter(
-                route__source__closest_big_city__icontains=source
-            )
+            queryset = queryset.filter(route__source_id__in=Airport.ids_by_city(source))
 
         if destination:
             queryset = queryset.filter(
-                route__destination__closest_big_city__icontains=destination
+                route__destination_id__in=Airport.ids_by_city(destination)
             )
 
         if airplane:
             queryset = queryset.filter(airplane__name__icontains=airplane)
 
-        return queryset.distinct()
+        departure = FlightDepartureFilterSerializer(data=self.request.query_params)
+        departure.is_valid(raise_exception=True)
+        return departure.filter(queryset)
 
     @extend_schema(
         parameters=[
+            FlightDepartureFilterSerializer,
             OpenApiParameter(
                 "source",
                 type={"type": "list", "items": {"type": "number"}},
@@ -141,77 +216,283 @@ class FlightViewSet(viewsets.ModelViewSet):
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "seats",
+                type=str,
+                enum=SeatMapRowSerializer.ENCODINGS,
+                description=(
+                    "Return only the seat occupancy, as a base64 bitmap or "
+                    "run-length encoded rows (ex. ?seats=rle). Also accepted "
+                    "as an Accept parameter: application/json; seats=rle"
+                ),
+            ),
+        ]
+    )
+    def retrieve(self, request, *args, **kwargs):
+        encoding = SeatMapRowSerializer.requested_encoding(
+            request.query_params, request.headers.get("Accept", "")
+        )
+        if encoding is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        row = get_object_or_404(
+            SeatMapRowSerializer.values(Flight.objects.all()), pk=kwargs["pk"]
+        )
+        return Response(SeatMapRowSerializer.to_representation(row, encoding))
+
     def get_serializer_class(self):
         if self.action == "list":
             return FlightListSerializer
         elif self.action == "retrieve":
             return FlightRetrieveSerializer
+        elif self.action == "holds":
+            return SeatHoldSerializer
         return FlightSerializer
 
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path="holds",
+        permission_classes=[IsAuthenticated],
+    )
+    def holds(self, request, pk=None):
+        """Hold seats on this flight for SEAT_HOLD_TTL before ordering them"""
+        serializer = self.get_serializer(
+            data=request.data,
+            context={**self.get_serializer_context(), "flight": self.get_object()},
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        methods=["GET"],
+        detail=False,
+        permission_classes=[IsAdminUser],
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+        pagination_class=None,
+    )
+    def export(self, request):
+        """Stream all (filtered) flights as NDJSON or CSV (?format=ndjson|csv)"""
+        rows = FlightListRowSerializer.values(
+            self.get_queryset().order_by("departure_date", "id")
+        ).iterator(chunk_size=CHUNK_SIZE)
+        return stream_export(
+            (FlightListRowSerializer.to_representation(row) for row in rows),
+            FLIGHT_EXPORT_FIELDS,
+            request.accepted_renderer.format,
+            "flights",
+        )
+
+    @action(
+        methods=["GET"],
+        detail=True,
+        permission_classes=[IsAdminUser],
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+    )
+    def manifest(self, request, pk=None):
+        """Stream the passenger manifest of a flight as NDJSON or CSV"""
+        flight = self.get_object()
+        rows = (
+            Ticket.objects.filter(flight=flight)
+            .order_by("row", "seat")
+            .values("id", "row", "seat", "order_id", passenger=F("order__user__email"))
+            .iterator(chunk_size=CHUNK_SIZE)
+        )
+        return stream_export(
+            rows,
+            MANIFEST_FIELDS,
+            request.accepted_renderer.format,
+            f"flight_{flight.id}_manifest",
+        )
+
+
+class ScheduleViewSet(viewsets.ModelViewSet):
+    """Weekly flight patterns; saving one regenerates its flights"""
+
+    queryset = Schedule.objects.prefetch_related("crew")
+    serializer_class = ScheduleSerializer
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            expand_schedule(serializer.save())
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            expand_schedule(serializer.save())
+
+    def perform_destroy(self, instance):
+        # Flights with sold tickets are detached and stay.
+        with transaction.atomic():
+            expand_schedule(instance, remove=True)
+            instance.delete()
+
+    @action(methods=["POST"], detail=True)
+    def expand(self, request, pk=None):
+        """Regenerate missing flights, e.g. after some were deleted by hand"""
+        return Response(expand_schedule(self.get_object()))
+
+
+class ItineraryViewSet(viewsets.ViewSet):
+    @extend_schema(
+        parameters=[ItinerarySearchSerializer],
+        responses=ItinerarySerializer(many=True),
+    )
+    def list(self, request):
+        """Direct and connecting flights between two cities on a given date"""
+        search = ItinerarySearchSerializer(data=request.query_params)
+        search.is_valid(raise_exception=True)
+        itineraries = find_itineraries(**search.validated_data)
+        return Response(ItinerarySerializer(itineraries, many=True).data)
+
 
 class OrderViewSet(
+    ReplicaReadMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     GenericViewSet,
 ):
     queryset = Order.objects.prefetch_related(
-        "tickets__flight__route",
-        "tickets__flight__airplane",
+        Prefetch(
+            "tickets",
+            queryset=Ticket.objects.select_related(
+                "flight__route__source",
+                "flight__route__destination",
+                "flight__airplane",
+            ),
+        )
     )
 
     permission_classes = (IsAuthenticated,)
+    pagination_class = OrderPagination
+
+    def include_archived(self):
+        return self.request.query_params.get("archived") in ("true", "1")
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action == "list" and self.include_archived():
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "archived_tickets",
+                    queryset=ArchivedTicket.objects.select_related(
+                        "flight__route__source",
+                        "flight__route__destination",
+                        "flight__airplane",
+                    ),
+                )
+            )
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
+            if self.include_archived():
+                return OrderHistorySerializer
             return OrderListSerializer
 
         return OrderSerializer
 
-    def perform_create(self, serializer):
-        order = serializer.save(user=self.request.user)
-        file_path = self.generate_ticket_pdf(order)
-
-        email_message = EmailMessage(
-            subject="Your Ticket Confirmation",
-            body="Your ticket is attached.",
-            from_email="no-reply@example.com",
-            to=[self.request.user.email],
-        )
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "archived",
+                type=bool,
+                description=(
+                    "Also list tickets of departed flights moved to the "
+                    "archive, as archived_tickets (ex. ?archived=true)"
+                ),
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
-        with open(file_path, "rb") as file:
-            email_message.attach(
-                f"ticket_order_{order.id}.pdf", file.read(), "application/pdf"
+    @action(
+        methods=["GET"],
+        detail=False,
+        permission_classes=[IsAdminUser],
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+        pagination_class=None,
+    )
+    def export(self, request):
+        """Stream every ticket of every order as NDJSON or CSV (staff only)"""
+        rows = (
+            Ticket.objects.order_by("order_id", "id")
+            .values(
+                "order_id",
+                "flight_id",
+                "row",
+                "seat",
+                created_at=F("order__created_at"),
+                passenger=F("order__user__email"),
+                ticket_id=F("id"),
             )
+            .iterator(chunk_size=CHUNK_SIZE)
+        )
+        return stream_export(
+            rows, ORDER_EXPORT_FIELDS, request.accepted_renderer.format, "orders"
+        )
 
-        email_message.send()
-        os.remove(file_path)
-
-    def generate_ticket_pdf(self, order) -> str:
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        pdf.cell(200, 10, txt="Your Ticket", ln=True, align="C")
-
-        for ticket in order.tickets.all():
-            pdf.cell(
-                200,
-                10,
-                txt=f"Flight: {ticket.flight}",
-                ln=True,
-                align="L"
-            )
-            pdf.cell(
-                200,
-                10,
-                txt=f"Row: {ticket.row}, Seat: {ticket.seat}",
-                ln=True,
-                align="L",
-            )
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            order = serializer.save(user=self.request.user)
+            TicketEmail.objects.create(order=order, recipient=self.request.user.email)
+            transaction.on_commit(wake_ticket_email_workers)
+            # Read-your-writes: replicas may not have the new tickets yet.
+            transaction.on_commit(lambda: pin_to_primary(self.request.user))
+
+
+class LoadFactorViewSet(ReplicaReadMixin, GenericViewSet):
+    """Staff-only reads of the load-factor summary tables."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get_queryset(self):
+        filters = LoadFactorFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        return filters.filter(self.queryset)
+
+
+@extend_schema(parameters=[LoadFactorFilterSerializer])
+class FlightLoadViewSet(
+    LoadFactorViewSet, mixins.ListModelMixin, mixins.RetrieveModelMixin
+):
+    """Sold seats and load factor per flight, including archived flights"""
+
+    queryset = FlightLoad.objects.all()
+    serializer_class = FlightLoadSerializer
+    pagination_class = FlightLoadPagination
+
+
+@extend_schema(parameters=[LoadFactorFilterSerializer])
+class RouteDailyLoadViewSet(LoadFactorViewSet, mixins.ListModelMixin):
+    """Load factor, seat-km and passenger-km per route and departure day"""
+
+    queryset = RouteDailyLoad.objects.all()
+    serializer_class = RouteDailyLoadSerializer
+    pagination_class = RouteDailyLoadPagination
 
-        file_path = f"ticket_order_{order.id}.pdf"
-        pdf.output(file_path)
 
-        return file_path
+@extend_schema(parameters=[LoadFactorFilterSerializer])
+class DailyLoadViewSet(LoadFactorViewSet, mixins.ListModelMixin):
+    """Network-wide load factor per departure day"""
+
+    queryset = RouteDailyLoad.objects.all()
+    serializer_class = DailyLoadSerializer
+    pagination_class = DailyLoadPagination
+
+    def get_queryset(self):
+        return (
+            super()
+            .get_queryset()
+            .values("date")
+            .annotate(
+                flights=Sum("flights"),
+                capacity=Sum("capacity"),
+                sold=Sum("sold"),
+                seat_km=Sum("seat_km"),
+                passenger_km=Sum("passenger_km"),
+            )
+        )
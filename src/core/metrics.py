@@ -0,0 +1,294 @@
+"""Per-view request metrics, exposed as Server-Timing and Prometheus text.
+
+Series live in process memory, like the default ``prometheus_client``
+registry, so each worker process is scraped on its own.
+"""
+
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1_024, 4_096, 16_384, 65_536, 262_144, 1_048_576)
+
+_lock = threading.Lock()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _labels(names, values) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class Histogram:
+    def __init__(self, name, description, buckets, label_names=("view", "method")):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.label_names = label_names
+        # labels -> [count per bucket..., count above the last bucket, sum]
+        self.series = {}
+
+    def observe(self, labels, value) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series.setdefault(labels, [0] * (len(self.buckets) + 2))
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def expose(self):
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in sorted(self.series.items()):
+            label_text = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}'
+            count = cumulative + series[-2]
+            yield f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}'
+            yield f"{self.name}_sum{{{label_text}}} {series[-1]}"
+            yield f"{self.name}_count{{{label_text}}} {count}"
+
+
+class Counter:
+    def __init__(self, name, description, label_names):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.series = {}
+
+    def inc(self, labels) -> None:
+        self.series[labels] = self.series.get(labels, 0) + 1
+
+    def expose(self):
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self.series.items()):
+            yield f"{self.name}{{{_labels(self.label_names, labels)}}} {value}"
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling the request, rendering included.",
+    DURATION_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL queries executed per request.",
+    QUERY_BUCKETS,
+)
+DB_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent executing SQL per request.",
+    DURATION_BUCKETS,
+)
+VIEW_DURATION = Histogram(
+    "http_request_view_duration_seconds",
+    "Time spent in the view outside SQL, serializer to_representation included.",
+    DURATION_BUCKETS,
+)
+RENDER_DURATION = Histogram(
+    "http_request_render_duration_seconds",
+    "Time spent rendering the response body (DRF renderers, templates).",
+    DURATION_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Size of non-streaming response bodies.",
+    SIZE_BUCKETS,
+)
+RESPONSES = Counter(
+    "http_responses_total",
+    "Responses by view, method and status code.",
+    ("view", "method", "status"),
+)
+DB_CONNECTIONS = Counter(
+    "db_connections_opened_total",
+    "Database connections opened (or checked out of the pool) by Django.",
+    ("alias",),
+)
+METRICS = (
+    REQUEST_DURATION,
+    DB_QUERIES,
+    DB_DURATION,
+    VIEW_DURATION,
+    RENDER_DURATION,
+    RESPONSE_SIZE,
+    RESPONSES,
+    DB_CONNECTIONS,
+)
+
+
+def _count_connection(sender, connection, **kwargs):
+    with _lock:
+        DB_CONNECTIONS.inc((connection.alias,))
+
+
+connection_created.connect(_count_connection)
+
+
+def pool_metrics():
+    """Gauges from ``psycopg_pool`` stats of every pooled database."""
+    stats = {
+        connection.alias: connection.pool.get_stats()
+        for connection in connections.all()
+        if connection.settings_dict.get("OPTIONS", {}).get("pool")
+    }
+    names = sorted({name for alias_stats in stats.values() for name in alias_stats})
+    for name in names:
+        yield f"# TYPE db_pool_{name} gauge"
+        for alias, alias_stats in sorted(stats.items()):
+            if name in alias_stats:
+                yield f'db_pool_{name}{{alias="{alias}"}} {alias_stats[name]}'
+
+
+class RequestTimings:
+    """SQL execute wrapper and view and render timers for a single request.
+
+    DRF serializes in the view (``serializer.data``), so serialization is
+    part of the view time; renderers only encode the serialized data.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.view_started = None
+        self.view_db_time = 0.0
+        self.view_time = None
+        self.render_started = None
+        self.render_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+    def view_called(self):
+        self.view_started = time.perf_counter()
+        self.view_db_time = self.db_time
+
+    def view_returned(self):
+        if self.view_started is not None and self.view_time is None:
+            elapsed = time.perf_counter() - self.view_started
+            self.view_time = elapsed - (self.db_time - self.view_db_time)
+
+    def rendered(self, response):
+        self.render_time = time.perf_counter() - self.render_started
+
+
+class RequestMetricsMiddleware:
+    """Record duration, SQL count and time, view and render time and size
+    per view.
+
+    Place it first in ``MIDDLEWARE`` so the timings cover the whole stack.
+    Works in both sync and async mode, so it never forces async views
+    under ASGI onto a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings = request.timings = RequestTimings()
+        started = time.perf_counter()
+        with self.wrap_connections(timings):
+            response = self.get_response(request)
+        return self.record(request, response, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        timings = request.timings = RequestTimings()
+        started = time.perf_counter()
+        with self.wrap_connections(timings):
+            response = await self.get_response(request)
+        return self.record(request, response, time.perf_counter() - started)
+
+    @staticmethod
+    def wrap_connections(timings):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timings))
+        return stack
+
+    @staticmethod
+    def record(request, response, duration):
+        timings = request.timings
+        # Responses without a render step, or from middleware short cuts.
+        timings.view_returned()
+        view_time = timings.view_time or 0.0
+        match = request.resolver_match
+        labels = (match.view_name if match else "<unmatched>", request.method)
+        with _lock:
+            REQUEST_DURATION.observe(labels, duration)
+            DB_QUERIES.observe(labels, timings.queries)
+            DB_DURATION.observe(labels, timings.db_time)
+            VIEW_DURATION.observe(labels, view_time)
+            RENDER_DURATION.observe(labels, timings.render_time)
+            if not response.streaming:
+                RESPONSE_SIZE.observe(labels, len(response.content))
+            RESPONSES.inc((*labels, response.status_code))
+
+        response["Server-Timing"] = (
+            f'db;dur={timings.db_time * 1000:.1f};desc="{timings.queries} queries", '
+            f"view;dur={view_time * 1000:.1f}, "
+            f"render;dur={timings.render_time * 1000:.1f}, "
+            f"total;dur={duration * 1000:.1f}"
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timings.view_called()
+
+    def process_template_response(self, request, response):
+        # Called right before response.render(); the callback runs after it.
+        request.timings.view_returned()
+        request.timings.render_started = time.perf_counter()
+        response.add_post_render_callback(request.timings.rendered)
+        return response
+
+
+def may_read_metrics(request) -> bool:
+    """Prometheus with ``METRICS_TOKEN`` as bearer token, or a staff session."""
+    if settings.METRICS_TOKEN and hmac.compare_digest(
+        request.headers.get("Authorization", "").encode(),
+        f"Bearer {settings.METRICS_TOKEN}".encode(),
+    ):
+        return True
+    return request.user.is_staff
+
+
+def metrics_view(request):
+    if not may_read_metrics(request):
+        return HttpResponseForbidden()
+
+    with _lock:
+        lines = [line for metric in METRICS for line in metric.expose()]
+    lines.extend(pool_metrics())
+    return HttpResponse(
+        "\n".join(lines) + "\n", content_type="text/plain; version=0.0.4"
+    )
@@ -11,8 +11,11 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 import os
+from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -49,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.metrics.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -93,6 +97,89 @@ DATABASES = {
     }
 }
 
+# Connection reuse. DB_POOL=true uses Django's psycopg 3 pool, which is not
+# in requirements.txt (it pins psycopg2): install psycopg[binary,pool]
+# first. Sizes are per worker process, so keep workers * DB_POOL_MAX_SIZE
+# below PostgreSQL's max_connections.
+# Without the pool, DB_CONN_MAX_AGE_SECONDS keeps per-thread connections.
+if os.environ.get("DB_POOL", "").lower() == "true":
+    try:
+        from psycopg_pool import ConnectionPool
+    except ImportError as error:
+        raise ImproperlyConfigured(
+            "DB_POOL=true needs psycopg 3 with its pool: "
+            "pip install 'psycopg[binary,pool]'"
+        ) from error
+
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.environ.get("DB_POOL_MIN_SIZE") or 2),
+            "max_size": int(os.environ.get("DB_POOL_MAX_SIZE") or 10),
+            "max_idle": int(os.environ.get("DB_POOL_MAX_IDLE_SECONDS") or 300),
+            "timeout": int(os.environ.get("DB_POOL_TIMEOUT_SECONDS") or 10),
+            # Pre-ping: test each connection before handing it out.
+            "check": ConnectionPool.check_connection,
+        },
+    }
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = int(
+        os.environ.get("DB_CONN_MAX_AGE_SECONDS") or 0
+    )
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+# Read replicas as comma-separated host[:port], same credentials as default.
+# Safe requests to the catalog, flight and order viewsets read from them.
+REPLICA_DATABASES = []
+for number, replica in enumerate(
+    filter(None, (os.environ.get("POSTGRES_REPLICA_HOSTS") or "").split(",")), 1
+):
+    host, _, port = replica.strip().partition(":")
+    alias = f"replica_{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": int(port or DATABASES["default"]["PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ["airport.replicas.ReplicaRouter"]
+# Replicas further behind than this are left out until they catch up.
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get("REPLICA_MAX_LAG_SECONDS") or 5)
+REPLICA_LAG_CHECK_SECONDS = float(os.environ.get("REPLICA_LAG_CHECK_SECONDS") or 5)
+# After creating an order, the user's reads stay on the primary this long.
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS") or 30)
+
+CACHES = {
+    # Also holds read-your-writes pins; share it between workers with replicas.
+    "default": {
+        "BACKEND": os.environ.get("DEFAULT_CACHE_BACKEND")
+        or "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": os.environ.get("DEFAULT_CACHE_LOCATION") or "",
+    },
+    # Catalog responses; use a shared backend (file, redis) with several workers.
+    "catalog": {
+        "BACKEND": os.environ.get("CATALOG_CACHE_BACKEND")
+        or "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": os.environ.get("CATALOG_CACHE_LOCATION") or "catalog",
+        "TIMEOUT": int(os.environ.get("CATALOG_CACHE_TIMEOUT_SECONDS") or 3600),
+    },
+}
+
+# Serve flight and route lists from .values() rows instead of model instances.
+FAST_LIST_SERIALIZATION = (
+    os.environ.get("FAST_LIST_SERIALIZATION", "").lower() == "true"
+)
+
+# Serve flight list/retrieve and catalog lists from async views (for ASGI).
+ASYNC_READ_VIEWS = os.environ.get("ASYNC_READ_VIEWS", "").lower() == "true"
+
+# Per-view Server-Timing headers and Prometheus histograms on /metrics.
+REQUEST_METRICS = os.environ.get("REQUEST_METRICS", "").lower() != "false"
+# /metrics is for Prometheus only: it must send this as a bearer token.
+# Staff users logged in to the admin can read it too; nobody else can.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -113,16 +200,29 @@ AUTH_PASSWORD_VALIDATORS = [
 
 AUTH_USER_MODEL = "user.User"
 
+# How JWT requests resolve their user: "cached" (short-lived LRU of users),
+# "stateless" (token claims only, no query) or "db" (a query per request).
+JWT_AUTH_MODE = os.environ.get("JWT_AUTH_MODE") or "cached"
+JWT_AUTHENTICATION_CLASSES = {
+    "cached": "user.authentication.CachedJWTAuthentication",
+    "stateless": "user.authentication.StatelessJWTAuthentication",
+    "db": "rest_framework_simplejwt.authentication.JWTAuthentication",
+}
+JWT_USER_CACHE_SIZE = int(os.environ.get("JWT_USER_CACHE_SIZE") or 10_000)
+JWT_USER_CACHE_TTL_SECONDS = int(os.environ.get("JWT_USER_CACHE_TTL_SECONDS") or 60)
+
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ),
+    "DEFAULT_AUTHENTICATION_CLASSES": (JWT_AUTHENTICATION_CLASSES[JWT_AUTH_MODE],),
     "DEFAULT_PERMISSION_CLASSES": (
         "airport.permissions.IsAdminOrIfAuthenticatedReadOnly",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
+SIMPLE_JWT = {
+    "TOKEN_OBTAIN_SERIALIZER": "user.serializers.TokenObtainPairWithClaimsSerializer",
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -150,3 +250,11 @@ EMAIL_PORT = os.environ["EMAIL_PORT"]
 EMAIL_USE_TLS = os.environ["EMAIL_USE_TLS"]
 EMAIL_HOST_USER = os.environ["EMAIL_HOST_USER"]
 EMAIL_HOST_PASSWORD = os.environ["EMAIL_HOST_PASSWORD"]
+
+SEAT_HOLD_TTL = timedelta(seconds=int(os.environ.get("SEAT_HOLD_TTL_SECONDS") or 600))
+
+ITINERARY_MIN_CONNECTION = timedelta(
+    minutes=int(os.environ.get("ITINERARY_MIN_CONNECTION_MINUTES") or 45)
+)
+ITINERARY_MAX_DURATION = timedelta(hours=48)
+ITINERARY_INDEX_TTL = int(os.environ.get("ITINERARY_INDEX_TTL_SECONDS") or 300)
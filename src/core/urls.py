@@ -24,9 +24,12 @@ from drf_spectacular.views import (
     SpectacularRedocView,
 )
 
+from core.metrics import metrics_view
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
     path("api/airports/", include("airport.urls", namespace="airport")),
     path("api/users/", include("user.urls", namespace="user")),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
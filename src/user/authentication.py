@@ -0,0 +1,121 @@
+"""JWT authentication without a user lookup on every request.
+
+``CachedJWTAuthentication`` keeps recently seen users in a small
+per-process LRU with a short TTL. Saving or deleting a user evicts it in
+this process; other processes pick the change up within the TTL.
+
+``StatelessJWTAuthentication`` builds the user from the token claims added
+by ``TokenObtainPairWithClaimsSerializer`` and never queries the database,
+so staff or account changes apply from the next token on.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+
+class UserCache:
+    """Thread-safe LRU of ``user_id -> (user, expires_at)``."""
+
+    def __init__(self):
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._users[user_id]
+                return None
+            self._users.move_to_end(user_id)
+            return user
+
+    def set(self, user_id, user) -> None:
+        expires_at = time.monotonic() + settings.JWT_USER_CACHE_TTL_SECONDS
+        with self._lock:
+            self._users[user_id] = (user, expires_at)
+            self._users.move_to_end(user_id)
+            while len(self._users) > settings.JWT_USER_CACHE_SIZE:
+                self._users.popitem(last=False)
+
+    def delete(self, user_id) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` that reuses users resolved in the last TTL.
+
+    Cached users are shared between requests; treat ``request.user`` as
+    read-only and reload it before saving.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = user_cache.get(user_id) if user_id is not None else None
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+        return user
+
+    async def aget_user(self, validated_token):
+        """``get_user`` for async views, with the lookup on the async ORM."""
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        user = user_cache.get(user_id)
+        if user is not None:
+            return user
+
+        try:
+            user = await get_user_model().objects.aget(
+                **{api_settings.USER_ID_FIELD: user_id}
+            )
+        except get_user_model().DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        user_cache.set(user_id, user)
+        return user
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """Build the user from token claims: id, email and is_staff only."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        # A model instance, not TokenUser, so it can be assigned to
+        # foreign keys such as Order.user.
+        user = self.user_model(
+            **{api_settings.USER_ID_FIELD: user_id},
+            email=validated_token.get("email", ""),
+            is_staff=validated_token.get("is_staff", False),
+        )
+        user._state.adding = False
+        user._state.db = "default"
+        return user
+
+    async def aget_user(self, validated_token):
+        return self.get_user(validated_token)
@@ -1,3 +1,74 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from user.authentication import (
+    CachedJWTAuthentication,
+    StatelessJWTAuthentication,
+    user_cache,
+)
+from user.serializers import TokenObtainPairWithClaimsSerializer
+
+
+class JWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("user@test.com", "pass12345")
+
+    def setUp(self):
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+
+    def request(self, token):
+        return APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_login_token_carries_claims(self):
+        response = APIClient().post(
+            reverse("user:token_obtain_pair"),
+            {"email": "user@test.com", "password": "pass12345"},
+        )
+        token = AccessToken(response.data["access"])
+        self.assertEqual(token["email"], "user@test.com")
+        self.assertIs(token["is_staff"], False)
+
+    def test_cached_user_is_resolved_without_query(self):
+        auth = CachedJWTAuthentication()
+        token = AccessToken.for_user(self.user)
+
+        with self.assertNumQueries(1):
+            auth.authenticate(self.request(token))
+        with self.assertNumQueries(0):
+            user, _ = auth.authenticate(self.request(token))
+        self.assertEqual(user, self.user)
+
+    def test_saving_user_evicts_cached_entry(self):
+        auth = CachedJWTAuthentication()
+        token = AccessToken.for_user(self.user)
+        auth.authenticate(self.request(token))
+
+        get_user_model().objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.user.refresh_from_db()
+        self.user.save()
+
+        with self.assertNumQueries(1):
+            user, _ = auth.authenticate(self.request(token))
+        self.assertTrue(user.is_staff)
+
+    def test_stateless_user_comes_from_claims(self):
+        self.user.is_staff = True
+        token = TokenObtainPairWithClaimsSerializer.get_token(self.user).access_token
+
+        with self.assertNumQueries(0):
+            user, _ = StatelessJWTAuthentication().authenticate(self.request(token))
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.email, "user@test.com")
+        self.assertTrue(user.is_staff)
+        self.assertFalse(user._state.adding)
+
+    def test_schema_documents_bearer_jwt(self):
+        for auth_class in (CachedJWTAuthentication, StatelessJWTAuthentication):
+            scheme = OpenApiAuthenticationExtension.get_match(auth_class())
+            self.assertEqual(scheme.name, "jwtAuth")